@@ -0,0 +1,320 @@
+import argparse
+import os
+import sys
+import time
+import random
+import collections
+import itertools
+from collections import defaultdict
+import logging
+import tempfile
+import pandas as pd
+
+# Add src directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, "src")))
+import gtf2event
+from lib import annotation
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+"""
+Benchmarks for gtf2event.py on a synthetic GTF file.
+"""
+
+def get_args():
+
+	parser = argparse.ArgumentParser(
+		formatter_class = argparse.ArgumentDefaultsHelpFormatter,
+		description = "Benchmark gtf2event.py on a synthetic GTF file"
+	)
+	parser.add_argument("-o", "--output", type = str, help = "Directory for the synthetic GTF file", default = "benchmark_output")
+	parser.add_argument("-n", "--num-genes", type = int, help = "Number of genes in the synthetic GTF file", default = 20000)
+	parser.add_argument("-s", "--seed", type = int, help = "Random seed", default = 0)
+	parser.add_argument("-v", "--verbose", action = "store_true", help = "Verbose output")
+	args = parser.parse_args()
+	return(args)
+
+def synthetic_gtf(path, num_genes, seed = 0) -> str:
+	"""
+	Writes a StringTie-like merged GTF file with alternatively spliced genes.
+
+	Args:
+		path (str): Path to the output GTF file.
+		num_genes (int): Number of genes.
+		seed (int): Random seed.
+
+	Returns:
+		str: Path to the output GTF file.
+	"""
+
+	rng = random.Random(seed)
+	chromosomes = ["1", "2", "3", "X", "chr10", "GL456354.1"]
+	position = defaultdict(lambda: 10000)
+	with open(path, "w") as gtf_file:
+		gtf_file.write("# synthetic GTF\n")
+		for gene_index in range(num_genes):
+			chr = rng.choice(chromosomes)
+			strand = rng.choice(["+", "-"])
+			gene_id = f"MSTRG.{gene_index + 1}"
+			ref_gene_id = f"ENSG{gene_index + 1:011d}" if rng.random() < 0.7 else None
+			gene_name = f"Gene{gene_index + 1}" if (ref_gene_id is not None) and (rng.random() < 0.9) else None
+			# Candidate exons
+			exon_num = rng.randint(2, 40) if rng.random() < 0.98 else rng.randint(80, 200)
+			start = position[chr] + rng.randint(1000, 50000)
+			exons = []
+			for i in range(exon_num):
+				end = start + rng.randint(50, 300)
+				exons.append([start, end])
+				start = end + rng.randint(100, 5000)
+			position[chr] = start
+			# Transcripts are subsets of candidate exons with alternative splice sites and retained introns
+			transcript_num = rng.randint(1, 8) if rng.random() < 0.98 else rng.randint(20, 60)
+			for transcript_index in range(transcript_num):
+				transcript_id = f"{gene_id}.{transcript_index + 1}"
+				# Alternative first and last exons
+				first = rng.randint(1, min(3, exon_num - 2)) if (exon_num > 3) and (rng.random() < 0.15) else 0
+				last = exon_num - 1 - (rng.randint(1, min(3, exon_num - 2 - first)) if (exon_num - first > 3) and (rng.random() < 0.15) else 0)
+				transcript_exons = [list(exons[first])] + [list(exon) for exon in exons[first + 1:last] if rng.random() < 0.8] + [list(exons[last])]
+				if rng.random() < 0.3:
+					transcript_exons[0][0] += rng.randint(-50, 50)
+				for exon in transcript_exons[1:-1]:
+					if rng.random() < 0.05:
+						exon[0] += rng.choice([-12, -3, 3, 12])
+					if rng.random() < 0.05:
+						exon[1] += rng.choice([-12, -3, 3, 12])
+				if (len(transcript_exons) > 3) and (rng.random() < 0.1):
+					i = rng.randint(0, len(transcript_exons) - 2)
+					transcript_exons[i:i + 2] = [[transcript_exons[i][0], transcript_exons[i + 1][1]]]
+				attributes = f'gene_id "{gene_id}"; transcript_id "{transcript_id}";'
+				if ref_gene_id is not None and rng.random() < 0.9:
+					attributes += f' ref_gene_id "{ref_gene_id}";'
+					if gene_name is not None:
+						attributes += f' gene_name "{gene_name}";'
+				gtf_file.write(f"{chr}\tStringTie\ttranscript\t{transcript_exons[0][0]}\t{transcript_exons[-1][1]}\t1000\t{strand}\t.\t{attributes}\n")
+				for exon_number, (exon_start, exon_end) in enumerate(transcript_exons):
+					gtf_file.write(f'{chr}\tStringTie\texon\t{exon_start}\t{exon_end}\t1000\t{strand}\t.\t{attributes} exon_number "{exon_number + 1}";\n')
+
+	return(path)
+
+def read_exons(gtf_path) -> pd.DataFrame:
+
+	gtf_df = pd.read_csv(
+		gtf_path,
+		sep = "\t",
+		usecols = [0, 2, 3, 4, 6, 8],
+		dtype = {0: "str", 2: "str", 3: "int32", 4: "int32", 6: "str", 8: "str"},
+		comment = "#",
+		header = None
+	)
+	gtf_df = gtf_df[gtf_df[2] == "exon"]
+	gtf_df = gtf_df.reset_index()
+	gtf_df = gtf_df[[0, 3, 4, 6, 8]]
+	gtf_df.columns = ["chr", "start", "end", "strand", "information"]
+	return(gtf_df)
+
+def row_wise_gtf_attributes(gtf_df) -> pd.DataFrame:
+	"""
+	The row-wise attribute parser that gtf2event.gtf() used before annotation.gtf_attributes(), kept as a reference.
+	"""
+
+	gtf_df = gtf_df.copy()
+	gtf_info = gtf_df.information.values
+	gene_id_list_dic = defaultdict(list)
+	gene_name_list_dic = defaultdict(list)
+	gene_id_col = []
+	gene_name_col = []
+	transcript_id_col = []
+
+	for index in range(gtf_df.shape[0]):
+		dic = {}
+		l = gtf_info[index].split(";")[0:-1]
+		for i in l:
+			if '"' in i:
+				key = i.split('"')[0].strip(" ")
+				value = i.split('"')[1]
+			else:
+				key = i.strip(" ").split(" ")[0]
+				value = i.strip(" ").split(" ")[1]
+			dic[key] = value
+		if "ref_gene_id" in dic:
+			gene_id = dic["ref_gene_id"]
+			gene_id_list_dic[dic["gene_id"]] += [dic["ref_gene_id"]]
+		else:
+			gene_id = dic["gene_id"]
+		if "gene_name" in dic:
+			gene_name = dic["gene_name"]
+			gene_name_list_dic[dic["gene_id"]] += [dic["gene_name"]]
+		else:
+			if "ref_gene_id" in dic:
+				gene_name = dic["ref_gene_id"]
+			else:
+				gene_name = dic["gene_id"]
+		gene_id_col += [gene_id]
+		gene_name_col += [gene_name]
+		transcript_id_col += [dic["transcript_id"]]
+
+	gtf_df["gene_id"] = gene_id_col
+	gtf_df["gene_name"] = gene_name_col
+	gtf_df["transcript_id"] = transcript_id_col
+
+	gtf_gene_id = gtf_df.gene_id.values
+	gtf_gene_name = gtf_df.gene_name.values
+	gtf_chr = gtf_df.chr.values
+
+	for index in range(gtf_df.shape[0]):
+		if gtf_gene_id[index] in gene_id_list_dic:
+			gtf_df.at[index, "gene_id"] = collections.Counter(gene_id_list_dic[gtf_gene_id[index]]).most_common()[0][0]
+		if gtf_gene_name[index] in gene_name_list_dic:
+			gtf_df.at[index, "gene_name"] = collections.Counter(gene_name_list_dic[gtf_gene_name[index]]).most_common()[0][0]
+		if ~(gtf_chr[index].startswith("chr")) and (len(gtf_chr[index]) <= 2):
+			gtf_df.at[index, "chr"] = "chr" + gtf_chr[index]
+
+	return(gtf_df)
+
+def column_wise_gtf_attributes(gtf_df) -> pd.DataFrame:
+	"""
+	The column-wise attribute parser as used in annotation.read_gtf().
+	"""
+
+	gtf_df = pd.concat([gtf_df, annotation.gtf_attributes(gtf_df["information"])], axis = 1)
+	gtf_df.loc[(~(gtf_df["chr"].str.startswith("chr")) & (gtf_df["chr"].str.len() <= 2)), "chr"] = "chr" + gtf_df["chr"]
+	return(gtf_df)
+
+def rescan_mse(gtf_dic, max_mse_n = 500) -> list:
+	'''
+	The multi-skipped exon search that gtf2event.mse() used before the sliding window, kept as a reference.
+	It rescans all transcripts for every number of skipped exons.
+	'''
+
+	event_l = []
+	for gene in gtf_dic.keys():
+		if len(gtf_dic[gene]["intron"]) == 0:
+			continue
+		chr = gtf_dic[gene]["chr"]
+		strand = gtf_dic[gene]["strand"]
+		gene_name = gtf_dic[gene]["gene_name"]
+		intron_set, intron_start_dict, intron_end_dict = gtf2event.gene_introns(gtf_dic[gene])
+		gene_exon_start = gtf_dic[gene]["exon_start"].tolist()
+		gene_exon_end = gtf_dic[gene]["exon_end"].tolist()
+		# Exons of each transcript sorted by start position, ascending order
+		exon_dic = gtf2event.gene_transcripts(gtf_dic[gene])
+
+		# Identify multi-skipped exon events until max_mse_n exon skipping
+		for mse_n in range(2, max_mse_n + 1):
+			# Get transcript with at least mse_n+2 exons
+			transcript_list = [transcript for transcript in exon_dic.keys() if len(exon_dic[transcript]) >= mse_n + 2]
+			if len(transcript_list) == 0:
+				break
+			for transcript in transcript_list:
+				exon_start_in_transcript = [gene_exon_start[i] for i in exon_dic[transcript]]
+				exon_end_in_transcript = [gene_exon_end[i] for i in exon_dic[transcript]]
+				intron_in_transcript = {gtf2event.pack(exon_end_in_transcript[i], exon_start_in_transcript[i + 1]) for i in range(len(exon_start_in_transcript) - 1)}
+
+				# Get combinations of n adjuscent index
+				# e.g. (1, 2) when mse_n = 2 and exon number = 3, first and last exons are excluded
+				# e.g. (1, 2), (2, 3) when mse_n = 2 and exon number = 4, first and last exons are excluded
+				# e.g. (1, 2, 3), (2, 3, 4) when mse_n = 3 and exon number = 6, first and last exons are excluded
+				# e.g. (1, 2, 3), (2, 3, 4), (3, 4, 5) when mse_n = 3 and exon number = 7, first and last exons are excluded
+				idx_number_list = [i for i in range(len(exon_start_in_transcript) - mse_n)] # e.g. [0, 1] when mse_n = 2 and exon number = 4
+				idx_list_list = [list(range(i + 1, i + 1 + mse_n)) for i in idx_number_list] # e.g. [[1, 2], [2, 3]] when mse_n = 2 and exon number = 4
+				for idx_list in idx_list_list:
+
+					# (inc_1)[exon_1](inc_2)[exon_2]...[exon_(mse_n-1)](inc_(mse_n))[exon_(mse_n)](inc_(mse_n+1))
+					# (x1, y1)[y1, x2](x2, y2)[y2, x3]...[x(mse_n-1), y(mse_n)](x(mse_n), y(mse_n))[y(mse_n), x(mse_n+1)](x(mse_n+1), y(mse_n+1))
+					# inc1: (x1, y1)
+					# inc2: (x2, y2)
+					# ...
+					# inc(mse_n): (x(mse_n), y(mse_n))
+					# inc(mse_n+1): (x(mse_n+1), y(mse_n+1))
+					# exc: (x1, y(mse_n+1))
+
+					x1_list = intron_end_dict.get(exon_start_in_transcript[idx_list[0]], [])
+					y_mse_n_1_list = intron_start_dict.get(exon_end_in_transcript[idx_list[mse_n - 1]], [])
+					for x1, y_mse_n_1 in itertools.product(x1_list, y_mse_n_1_list):
+
+						all_inclusion_introns = [(x1, exon_start_in_transcript[idx_list[0]])] # inc1 (first intron)
+						for i in range(mse_n - 1): # inc2 to inc(mse_n)
+							all_inclusion_introns += [(exon_end_in_transcript[idx_list[i]], exon_start_in_transcript[idx_list[i + 1]])]
+						all_inclusion_introns += [(exon_end_in_transcript[idx_list[mse_n - 1]], y_mse_n_1)] # inc(mse_n+1)
+						exc = gtf2event.pack(x1, y_mse_n_1)
+
+						# Check if all inclusion introns are and exclusion introns are NOT present in the same transcript
+						if all(gtf2event.pack(s, e) in intron_in_transcript for s, e in all_inclusion_introns) and (exc not in intron_in_transcript) and (exc in intron_set):
+							exonlist = ";".join([f"{chr}:{exon_start_in_transcript[i]}-{exon_end_in_transcript[i]}" for i in idx_list])
+							intronlist = ";".join([f"{chr}:{s}-{e}" for s, e in all_inclusion_introns + [(x1, y_mse_n_1)]])
+							event_l += [[exonlist, intronlist, mse_n, strand, gene, gene_name]]
+
+	return(event_l)
+
+def benchmark(func, *args, repeat = 3):
+	"""
+	Returns the result of func(*args) and the best wall time over repeat runs.
+	"""
+
+	elapsed_l = []
+	for _ in range(repeat):
+		start = time.perf_counter()
+		result = func(*args)
+		elapsed_l.append(time.perf_counter() - start)
+	return(result, min(elapsed_l))
+
+def benchmark_gtf_attributes(gtf_path):
+
+	logger.info("Benchmarking GTF attribute parsing....")
+	gtf_df = read_exons(gtf_path)
+	logger.info(f"Number of exon rows: {gtf_df.shape[0]}")
+	row_wise_df, row_wise_time = benchmark(row_wise_gtf_attributes, gtf_df)
+	column_wise_df, column_wise_time = benchmark(column_wise_gtf_attributes, gtf_df)
+	pd.testing.assert_frame_equal(row_wise_df, column_wise_df)
+	logger.info(f"Row-wise parser: {row_wise_time:.2f} s")
+	logger.info(f"Column-wise parser: {column_wise_time:.2f} s ({row_wise_time / column_wise_time:.1f}x)")
+
+def benchmark_exon_table(gtf_path):
+
+	logger.info("Benchmarking exon table cache....")
+	with tempfile.TemporaryDirectory() as cache_dir:
+		parsed_df, parse_time = benchmark(annotation.exon_table, gtf_path, None, repeat = 1)
+		_, save_time = benchmark(annotation.exon_table, gtf_path, cache_dir, repeat = 1)
+		cached_df, load_time = benchmark(annotation.exon_table, gtf_path, cache_dir)
+		pd.testing.assert_frame_equal(parsed_df, cached_df.astype({column: "object" for column in annotation.STR_COLUMNS}).astype({column: "int32" for column in annotation.INT_COLUMNS}))
+	logger.info(f"Parsing GTF: {parse_time:.2f} s")
+	logger.info(f"Parsing GTF and saving cache: {save_time:.2f} s")
+	logger.info(f"Loading cache: {load_time:.2f} s ({parse_time / load_time:.1f}x)")
+
+def benchmark_mse(gtf_path, min_exon_num = 20):
+
+	logger.info("Benchmarking multiple skipped exon (MSE) search....")
+	gtf_dic = gtf2event.gtf(annotation.exon_table(gtf_path))
+	# Multi-exon genes
+	gtf_dic = {gene: gene_dic for gene, gene_dic in gtf_dic.items() if len(gene_dic["exon_start"]) >= min_exon_num}
+	logger.info(f"Number of genes with at least {min_exon_num} exons: {len(gtf_dic)}")
+	rescan_event_l, rescan_time = benchmark(rescan_mse, gtf_dic, repeat = 1)
+	window_event_l, window_time = benchmark(gtf2event.mse, gtf_dic)
+	assert set(map(tuple, rescan_event_l)) == set(map(tuple, window_event_l))
+	logger.info(f"Rescan search: {rescan_time:.2f} s")
+	logger.info(f"Sliding window search: {window_time:.2f} s ({rescan_time / window_time:.1f}x)")
+
+def main():
+
+	args = get_args()
+	# Set up logging
+	logging.basicConfig(
+		format = "[%(asctime)s] %(levelname)7s %(message)s",
+		level = logging.DEBUG if args.verbose else logging.INFO
+	)
+	logger.debug(args)
+
+	os.makedirs(args.output, exist_ok = True)
+	gtf_path = os.path.join(args.output, f"synthetic_{args.num_genes}.gtf")
+	if not os.path.isfile(gtf_path):
+		logger.info(f"Writing synthetic GTF with {args.num_genes} genes to {gtf_path}....")
+		synthetic_gtf(gtf_path, args.num_genes, args.seed)
+
+	benchmark_gtf_attributes(gtf_path)
+	benchmark_exon_table(gtf_path)
+	benchmark_mse(gtf_path)
+
+if __name__ == "__main__":
+
+	main()
@@ -5,6 +5,7 @@ import logging
 import subprocess
 import yaml
 from src.lib import general
+from src.lib.event_types import EVENT_TYPES_SC, config_event_types
 # Configure logger
 logger = logging.getLogger(__name__)
 # Set version
@@ -60,6 +61,14 @@ def main():
 		logger.info(f"experiment_table: {config['experiment_table']}")
 		logger.info(f"gtf: {config['gtf']}")
 
+	# Event types to analyze, all but RI, which is not analyzed in single cell data, if not given
+	try:
+		event_types = config_event_types(config.get("events"), EVENT_TYPES_SC)
+	except argparse.ArgumentTypeError as e:
+		logger.error(f"Invalid events in configuration file: {e}")
+		sys.exit(1)
+	logger.info(f"events: {','.join(event_types)}")
+
 	# Prepare output directory
 	output_dir = config["workdir"]
 	logger.debug("Making output directory...")
@@ -72,6 +81,7 @@ def main():
 	# Steps
 	experiment_table = config["experiment_table"]
 	gtf = config["gtf"]
+	events = ",".join(event_types)
 	steps = [
 		{
 			"name": "Step 1: gtf2event.py",
@@ -79,7 +89,8 @@ def main():
 				"python", os.path.join(script_dir, "src", "gtf2event.py"),
 				"-i", gtf,
 				"-o", os.path.join(output_dir, "events"),
-				"-p", processors
+				"-p", processors,
+				"--events", events
 			]
 		},
 		{
@@ -102,6 +113,7 @@ def main():
 				"-m", str(config['minimum_reads']),
 				"--onlypsi" if config['only_psi'] else "",
 				"--excel" if config['excel'] else "",
+				"--events", events,
 				os.path.join(output_dir, "junctions", "junctions.bed"),
 				os.path.join(output_dir, "events"),
 				os.path.join(output_dir, "results")
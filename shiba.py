@@ -5,6 +5,7 @@ import logging
 import subprocess
 import yaml
 from src.lib import general
+from src.lib.event_types import config_event_types
 # Configure logger
 logger = logging.getLogger(__name__)
 # Set version
@@ -68,6 +69,14 @@ def main():
         logger.info(f"experiment_table: {config['experiment_table']}")
         logger.info(f"gtf: {config['gtf']}")
 
+    # Event types to analyze, all event types of PSI calculation if not given, checked before any step runs
+    try:
+        event_types = config_event_types(config.get("events"))
+    except argparse.ArgumentTypeError as e:
+        logger.error(f"Invalid events in configuration file: {e}")
+        sys.exit(1)
+    logger.info(f"events: {','.join(event_types)}")
+
     # Prepare output directory
     output_dir = config["workdir"]
     logger.debug("Making output directory...")
@@ -85,6 +94,8 @@ def main():
     # Steps
     experiment_table = config["experiment_table"]
     gtf = config["gtf"]
+    events = ",".join(event_types)
+    ri_event = "RI" in event_types
     steps = [
         {
             "name": "Step 1: bam2gtf.py",
@@ -92,6 +103,8 @@ def main():
                 "python", os.path.join(script_dir, "src", "bam2gtf.py"),
                 "-i", experiment_table,
                 "-r", gtf,
+                "-f" if config.get("fasta") else "",
+                config.get("fasta") or "",
                 "-o", os.path.join(output_dir, "annotation", "assembled_annotation.gtf"),
                 "-p", processors
             ]
@@ -104,7 +117,8 @@ def main():
                 "-r" if config['unannotated'] else "",
                 gtf if config['unannotated'] else "",
                 "-o", os.path.join(output_dir, "events"),
-                "-p", processors
+                "-p", processors,
+                "--events", events
             ]
         },
         {
@@ -112,7 +126,14 @@ def main():
             "command": [
                 "python", os.path.join(script_dir, "src", "bam2junc.py"),
                 "-i", experiment_table,
-                "-r", os.path.join(output_dir, "events", "EVENT_RI.txt"),
+                "-r" if ri_event else "",
+                os.path.join(output_dir, "events", "EVENT_RI.txt") if ri_event else "",
+                "--target-events" if config.get("targeted") else "",
+                os.path.join(output_dir, "events") if config.get("targeted") else "",
+                "-c" if config.get("junction_cache_dir") else "",
+                config.get("junction_cache_dir") or "",
+                "-f" if config.get("fasta") else "",
+                config.get("fasta") or "",
                 "-o", os.path.join(output_dir, "junctions", "junctions.bed"),
                 "-p", processors,
                 "-a", str(config['minimum_anchor_length']),
@@ -137,6 +158,7 @@ def main():
                 "--excel" if config['excel'] else "",
                 "--onlypsi" if config['only_psi'] else "",
                 "--onlypsi-group" if config['only_psi_group'] else "",
+                "--events", events,
                 os.path.join(output_dir, "junctions", "junctions.bed"),
                 os.path.join(output_dir, "events"),
                 os.path.join(output_dir, "results", "splicing")
@@ -174,7 +196,8 @@ def main():
                 "-i", os.path.join(output_dir, "results"),
                 "-e", experiment_table,
                 "-s", command_line,
-                "-o", os.path.join(output_dir, "plots")
+                "-o", os.path.join(output_dir, "plots"),
+                "--events", events
             ]
         }
     ]
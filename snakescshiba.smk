@@ -8,14 +8,21 @@ Usage:
     snakemake -s snakescshiba.smk --configfile config.yaml --cores <int> --use-singularity --singularity-args "--bind $HOME:$HOME"
 '''
 
+import os
+import sys
+
 workdir: config["workdir"]
 container: config["container"]
 base_dir = os.path.dirname(workflow.snakefile)
+sys.path.insert(0, os.path.join(base_dir, "src"))
+from lib.event_types import EVENT_TYPES_SC, config_event_types
+# Event types to analyze, all event types of PSI calculation in single cell data by default
+EVENTS = config_event_types(config.get("events"), EVENT_TYPES_SC)
 
 rule all:
     input:
-        event_all = expand("events/EVENT_{sample}.txt", sample = ["SE", "FIVE", "THREE", "MXE", "MSE", "AFE", "ALE"]),
-        PSI = expand("results/PSI_{sample}.txt", sample = ["SE", "FIVE", "THREE", "MXE", "MSE", "AFE", "ALE"])
+        event_all = expand("events/EVENT_{sample}.txt", sample = EVENTS),
+        PSI = expand("results/PSI_{sample}.txt", sample = EVENTS)
     params:
         version = VERSION
     shell:
@@ -35,7 +42,7 @@ rule gtf2event:
         gtf = config["gtf"]
     output:
         events = directory("events"),
-        events_all = expand("events/EVENT_{sample}.txt", sample = ["SE", "FIVE", "THREE", "MXE", "MSE", "AFE", "ALE"])
+        events_all = expand("events/EVENT_{sample}.txt", sample = EVENTS)
     threads:
         workflow.cores
     benchmark:
@@ -43,13 +50,15 @@ rule gtf2event:
     log:
         "log/gtf2event.log"
     params:
-        base_dir = base_dir
+        base_dir = base_dir,
+        events = ",".join(EVENTS)
     shell:
         """
         python {params.base_dir}/src/gtf2event.py \
         -i {input.gtf} \
         -o {output.events} \
         -p {threads} \
+        --events {params.events} \
         -v \
         >& {log}
         """
@@ -58,7 +67,8 @@ rule sc2junc:
     input:
         config["experiment_table"]
     output:
-        "junctions/junctions.bed"
+        junc = "junctions/junctions.bed",
+        matrix = "junctions/junctions.npz"
     benchmark:
         "benchmark/sc2junc.txt"
     log:
@@ -69,7 +79,7 @@ rule sc2junc:
         """
         python {params.base_dir}/src/sc2junc.py \
         -i {input} \
-        -o {output} \
+        -o {output.junc} \
         -v \
         >& {log}
         """
@@ -77,10 +87,10 @@ rule sc2junc:
 rule scpsi:
     input:
         junc = "junctions/junctions.bed",
-        events_all = expand("events/EVENT_{sample}.txt", sample = ["SE", "FIVE", "THREE", "MXE", "MSE", "AFE", "ALE"])
+        events_all = expand("events/EVENT_{sample}.txt", sample = EVENTS)
     output:
         results = directory("results"),
-        PSI = expand("results/PSI_{sample}.txt", sample = ["SE", "FIVE", "THREE", "MXE", "MSE", "AFE", "ALE"])
+        PSI = expand("results/PSI_{sample}.txt", sample = EVENTS)
     threads:
         1
     benchmark:
@@ -88,7 +98,8 @@ rule scpsi:
     log:
         "log/scpsi.log"
     params:
-        base_dir = base_dir
+        base_dir = base_dir,
+        events = ",".join(EVENTS)
     shell:
         """
         python {params.base_dir}/src/scpsi_snakemake.py \
@@ -100,6 +111,7 @@ rule scpsi:
         -a {config[alternative_group]} \
         --onlypsi {config[only_psi]} \
         --excel {config[excel]} \
+        --events {params.events} \
         -v \
         {input.junc} \
         events \
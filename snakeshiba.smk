@@ -23,9 +23,13 @@ def load_experiment(file):
             experiment_dict[sample] = {"bam": bam, "group": group}
     return experiment_dict
 experiment_dict = load_experiment(config["experiment_table"])
+base_dir = os.path.dirname(workflow.snakefile)
+sys.path.insert(0, os.path.join(base_dir, "src"))
+from lib.event_types import config_event_types
+# Event types to analyze, all event types of PSI calculation by default
+EVENTS = config_event_types(config.get("events"))
 juncfiles_list = []
 
-base_dir = os.path.dirname(workflow.snakefile)
 command = " ".join(args)
 # Replace snakefile path with the absolute path
 command = command.replace(workflow.snakefile, os.path.join(base_dir, workflow.snakefile))
@@ -40,8 +44,8 @@ container: config["container"]
 
 rule all:
     input:
-        event_all = expand("events/EVENT_{sample}.txt", sample = ["SE", "FIVE", "THREE", "MXE", "RI", "MSE", "AFE", "ALE"]),
-        PSI = expand("results/splicing/PSI_{sample}.txt", sample = ["SE", "FIVE", "THREE", "MXE", "RI", "MSE", "AFE", "ALE"]),
+        event_all = expand("events/EVENT_{sample}.txt", sample = EVENTS),
+        PSI = expand("results/splicing/PSI_{sample}.txt", sample = EVENTS),
         summary = "plots/summary.html",
         tpm = "results/expression/TPM.txt",
         cpm = "results/expression/CPM.txt",
@@ -79,11 +83,14 @@ rule bam2gtf:
         "benchmark/bam2gtf/{sample}.txt"
     log:
         "log/bam2gtf/{sample}.log"
+    params:
+        cram_ref = lambda wildcards: "--cram-ref " + config["fasta"] if config.get("fasta") and experiment_dict[wildcards.sample]["bam"].endswith(".cram") else ""
     shell:
         """
         stringtie -p {threads} \
         -G {input.gtf} \
         -o {output} \
+        {params.cram_ref} \
         {input.bam} >& {log}
         """
 
@@ -116,7 +123,7 @@ rule gtf2event:
         gtf = config["gtf"]
     output:
         events = directory("events"),
-        events_all = expand("events/EVENT_{sample}.txt", sample = ["SE", "FIVE", "THREE", "MXE", "RI", "MSE", "AFE", "ALE"])
+        events_all = expand("events/EVENT_{sample}.txt", sample = EVENTS)
     threads:
         workflow.cores
     benchmark:
@@ -124,7 +131,8 @@ rule gtf2event:
     log:
         "log/gtf2event.log"
     params:
-        base_dir = base_dir
+        base_dir = base_dir,
+        events = ",".join(EVENTS)
     shell:
         """
         python {params.base_dir}/src/gtf2event.py \
@@ -132,6 +140,7 @@ rule gtf2event:
         -r {input.gtf} \
         -o {output.events} \
         -p {threads} \
+        --events {params.events} \
         -v \
         >& {log}
         """
@@ -140,74 +149,47 @@ rule bam2junc:
     wildcard_constraints:
         sample = "|".join(experiment_dict)
     input:
+        RI = "events/EVENT_RI.txt" if "RI" in EVENTS else [],
+        events_all = expand("events/EVENT_{sample}.txt", sample = EVENTS) if config.get("targeted") else [],
         bam = lambda wildcards: experiment_dict[wildcards.sample]["bam"]
     output:
         junc = temp("junctions/{sample}.junc")
     threads:
-        1
-    benchmark:
-        "benchmark/bam2junc/{sample}_regtools.txt"
-    log:
-        "log/bam2junc/{sample}_regtools.log"
-    shell:
-        """
-        regtools junctions extract \
-        -a {config[minimum_anchor_length]} \
-        -m {config[minimum_intron_length]} \
-        -M {config[maximum_intron_length]} \
-        -s {config[strand]} \
-        -o {output.junc} \
-        {input.bam} >& {log}
-        """
-
-rule make_RI_saf:
-    input:
-        "events"
-    output:
-        temp("junctions/RI.saf")
-    shell:
-        """
-        cat {input}/EVENT_RI.txt | \
-        cut -f 6,7 | \
-        sed -e 1d | \
-        awk -F'\t' -v OFS='\t' '{{split($1,l,":"); split(l[2],m,"-"); print l[1]":"m[1]"-"m[1]+1,l[1],m[1],m[1]+1,$2; print l[1]":"m[2]-1"-"m[2],l[1],m[2]-1,m[2],$2}}' | \
-        awk '!a[$0]++' > {output}
-        """
-
-rule bam2junc_RI:
-    wildcard_constraints:
-        sample = "|".join(experiment_dict)
-    input:
-        RI = "junctions/RI.saf",
-        bam = lambda wildcards: experiment_dict[wildcards.sample]["bam"]
-    output:
-        junc = temp("junctions/{sample}_exon-intron.junc"),
-        junc_summary = temp("junctions/{sample}_exon-intron.junc.summary")
-    threads:
-        8
+        4
     benchmark:
-        "benchmark/bam2junc/{sample}_featureCounts_RI.txt"
+        "benchmark/bam2junc/{sample}.txt"
     log:
-        "log/bam2junc/{sample}_featureCounts_RI.log"
+        "log/bam2junc/{sample}.log"
     params:
-        base_dir = base_dir
+        base_dir = base_dir,
+        RI = "-r events/EVENT_RI.txt" if "RI" in EVENTS else "",
+        targeted = "--target-events events" if config.get("targeted") else "",
+        cache = "-c " + config["junction_cache_dir"] if config.get("junction_cache_dir") else "",
+        fasta = "-f " + config["fasta"] if config.get("fasta") else ""
     shell:
         """
-        python {params.base_dir}/src/bam2junc_RI_snakemake.py \
+        python {params.base_dir}/src/bam2junc_snakemake.py \
         -b {input.bam} \
-        -r {input.RI} \
+        {params.RI} \
+        {params.targeted} \
+        {params.cache} \
+        {params.fasta} \
         -o {output.junc} \
         -t {threads} \
+        -a {config[minimum_anchor_length]} \
+        -m {config[minimum_intron_length]} \
+        -M {config[maximum_intron_length]} \
+        -s {config[strand]} \
         -v \
         &> {log}
         """
 
 rule merge_junc:
     input:
-        exonexon = expand("junctions/{sample}.junc", sample = experiment_dict),
-        exonintron = expand("junctions/{sample}_exon-intron.junc", sample = experiment_dict)
+        expand("junctions/{sample}.junc", sample = experiment_dict)
     output:
-        "junctions/junctions.bed"
+        junc = "junctions/junctions.bed",
+        matrix = "junctions/junctions.npz"
     benchmark:
         "benchmark/merge_junc.txt"
     log:
@@ -217,9 +199,8 @@ rule merge_junc:
     shell:
         """
         python {params.base_dir}/src/merge_junc_snakemake.py \
-        --exonexon {input.exonexon} \
-        --exonintron {input.exonintron} \
-        --output {output} \
+        --junctions {input} \
+        --output {output.junc} \
         -v \
         >& {log}
         """
@@ -227,10 +208,10 @@ rule merge_junc:
 rule psi:
     input:
         junc = "junctions/junctions.bed",
-        events_all = expand("events/EVENT_{sample}.txt", sample = ["SE", "FIVE", "THREE", "MXE", "RI", "MSE", "AFE", "ALE"])
+        events_all = expand("events/EVENT_{sample}.txt", sample = EVENTS)
     output:
         results = directory("results/splicing"),
-        PSI = expand("results/splicing/PSI_{sample}.txt", sample = ["SE", "FIVE", "THREE", "MXE", "RI", "MSE", "AFE", "ALE"]),
+        PSI = expand("results/splicing/PSI_{sample}.txt", sample = EVENTS),
         PSI_matrix_sample = "results/splicing/PSI_matrix_sample.txt"
     threads:
         1
@@ -239,7 +220,8 @@ rule psi:
     log:
         "log/psi.log"
     params:
-        base_dir = base_dir
+        base_dir = base_dir,
+        events = ",".join(EVENTS)
     shell:
         """
         python {params.base_dir}/src/psi_snakemake.py \
@@ -255,6 +237,7 @@ rule psi:
         --onlypsi False \
         --onlypsi-group False \
         --excel {config[excel]} \
+        --events {params.events} \
         -v \
         {input.junc} \
         events \
@@ -361,7 +344,7 @@ rule pca:
 
 rule plots:
     input:
-        PSI = expand("results/splicing/PSI_{sample}.txt", sample = ["SE", "FIVE", "THREE", "MXE", "RI", "MSE", "AFE", "ALE"]),
+        PSI = expand("results/splicing/PSI_{sample}.txt", sample = EVENTS),
         tpm_pca = "results/pca/tpm_pca.tsv",
         tpm_contribution = "results/pca/tpm_contribution.tsv",
         psi_pca = "results/pca/psi_pca.tsv",
@@ -374,7 +357,8 @@ rule plots:
         "log/plots.log"
     params:
         base_dir = base_dir,
-        command = command
+        command = command,
+        events = ",".join(EVENTS)
     shell:
         """
         python {params.base_dir}/src/plots.py \
@@ -382,6 +366,7 @@ rule plots:
         -e {config[experiment_table]} \
         -s "{params.command}" \
         -o plots \
+        --events {params.events} \
         -v \
         >& {log}
         """
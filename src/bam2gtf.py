@@ -2,7 +2,7 @@ import argparse
 import os
 import sys
 import logging
-from lib import general
+from lib import expression, general
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -13,6 +13,7 @@ def parse_args():
 	)
 	parser.add_argument("-i", "--input", required=True, help="Experiment table")
 	parser.add_argument("-r", "--reference", required=True, help="Reference GTF file")
+	parser.add_argument("-f", "--fasta", help="Reference genome FASTA file to decode CRAM files with (default: the reference in their headers)")
 	parser.add_argument("-o", "--output", required=True, help="Assembled GTF file")
 	parser.add_argument("-p", "--processors", type=int, default=1, help="Number of processors to use (default: 1)")
 	parser.add_argument("-v", "--verbose", action="store_true", help="Verbose output")
@@ -60,26 +61,27 @@ def main():
 
 			sample, bam_file, _group = line.split(maxsplit=2)
 			sample_dir = os.path.dirname(bam_file)
-			bam_index = f"{bam_file}.bai"
+			bam_index = expression.alignment_index(bam_file)
 
 			logger.info(f"Processing sample: {sample}")
-			logger.debug(f"BAM file: {bam_file}")
+			logger.debug(f"BAM/CRAM file: {bam_file}")
 
-			# Check if BAM index exists
-			if not os.path.isfile(bam_index):
-				logger.error(f"BAM index file not found for {bam_file}")
-				logger.error(f"Please create an index file using 'samtools index' for all BAM files.")
+			# Check if BAM or CRAM index exists
+			if bam_index is None:
+				logger.error(f"BAM/CRAM index file not found for {bam_file}")
+				logger.error(f"Please create an index file using 'samtools index' for all BAM/CRAM files.")
 				sys.exit(1)
 			else:
-				logger.debug(f"Found BAM index for {bam_file}")
+				logger.debug(f"Found index {bam_index} for {bam_file}")
 
-			# Run StringTie2 for assembly
+			# Run StringTie2 for assembly, which reads CRAM files with the reference genome
 			sample_gtf = os.path.join(os.path.dirname(assembled_gtf), f"{sample}.assembled.gtf")
 			stringtie_command = [
 				"stringtie",
 				"-p", str(num_processors),
 				"-G", reference_gtf,
-				"-o", sample_gtf,
+				"-o", sample_gtf
+			] + (["--cram-ref", args.fasta] if args.fasta and expression.is_cram(bam_file) else []) + [
 				bam_file
 			]
 			logger.debug(f"StringTie2 command: {stringtie_command}")
@@ -0,0 +1,62 @@
+import argparse
+import logging
+from lib import junction
+# Configure logging
+logger = logging.getLogger(__name__)
+
+def parse_args():
+	## Get arguments from command line
+
+	parser = argparse.ArgumentParser(
+		formatter_class = argparse.ArgumentDefaultsHelpFormatter,
+		description = "bam2junc_snakemake.py"
+	)
+	parser.add_argument('-b', '--bam', type=str, help='Input bam or cram file')
+	parser.add_argument('-f', '--fasta', type=str, help='Reference genome fasta file to decode a cram file with')
+	parser.add_argument('-r', '--RI', type=str, help='Intron retention event file (exon-intron junctions are not counted without it)')
+	parser.add_argument('-o', '--junc', type=str, help='Output junction file')
+	parser.add_argument('-c', '--cache-dir', type=str, help='Directory to cache junction read counts of each bam file, reused while the file and the filters are unchanged')
+	parser.add_argument('--cache-checksum', action='store_true', help='Identify cached bam files by the checksum of their content instead of their path, size and modification time')
+	parser.add_argument('--target-events', type=str, help='Directory of event files: only junctions of these events are counted, reading their regions from the indexed bam file')
+	parser.add_argument('-t', '--threads', type=int, default=1, help='Number of threads')
+	parser.add_argument('-a', '--anchor', type=int, default=8, help='Minimum anchor length')
+	parser.add_argument('-m', '--min_intron', type=int, default=70, help='Minimum intron size')
+	parser.add_argument('-M', '--max_intron', type=int, default=500000, help='Maximum intron size')
+	parser.add_argument('-s', '--strand', type=str, default="XS", choices=["XS", "RF", "FR"], help='Strand specificity')
+	parser.add_argument('-v', '--verbose', action='store_true', help='Increase output verbosity')
+	args = parser.parse_args()
+	return args
+
+def main():
+
+	# Parse arguments
+	args = parse_args()
+	# Set up logging
+	logging.basicConfig(
+		format = "[%(asctime)s] %(levelname)7s %(message)s",
+		level = logging.DEBUG if args.verbose else logging.INFO
+	)
+	logger.debug(args)
+
+	# Count exon-exon junctions and exon-intron boundaries in one pass
+	boundary_df = junction.ri_boundaries(args.RI) if args.RI else None
+	target_df = junction.event_junctions(args.target_events) if args.target_events else None
+	logger.info("Counting junction reads...")
+	if args.cache_dir:
+		junc_df = junction.cached_count_junctions(
+			args.bam, args.cache_dir, args.anchor, args.min_intron, args.max_intron, args.strand,
+			boundary_df = boundary_df, target_df = target_df, checksum = args.cache_checksum, reference_path = args.fasta, threads = args.threads, num_process = args.threads
+		)
+	else:
+		junc_df = junction.count_junctions(
+			args.bam, args.anchor, args.min_intron, args.max_intron, args.strand,
+			threads = args.threads, num_process = args.threads, boundary_df = boundary_df, target_df = target_df, reference_path = args.fasta
+		)
+	junc_df.to_csv(args.junc, sep = "\t", index = False)
+
+	# Finish
+	logger.info("Done.")
+
+if __name__ == "__main__":
+
+	main()
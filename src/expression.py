@@ -34,30 +34,30 @@ def process_samples(experiment_file, reference_gtf, output_dir, processors):
 			if not line or line.startswith("sample"):
 				continue
 			sample, bam_file, _group = line.split(maxsplit=2)
-			bam_index = f"{bam_file}.bai"
+			bam_index = expression.alignment_index(bam_file)
 
 			logger.info(f"Processing sample: {sample}")
 
+			# featureCounts does not read CRAM files
+			if expression.is_cram(bam_file):
+				logger.error(f"CRAM file given for sample {sample}: {bam_file}")
+				logger.error("featureCounts does not read CRAM files. Please convert them to BAM using 'samtools view -b'.")
+				sys.exit(1)
+
 			# Ensure BAM index exists
-			if not os.path.isfile(bam_index):
+			if bam_index is None:
 				logger.error(f"BAM index file not found for sample : {sample}")
 				logger.error("Please create an index file using 'samtools index' for all BAM files.")
 				sys.exit(1)
 			else:
-				logger.debug(f"Found BAM index for {bam_file}")
+				logger.debug(f"Found index {bam_index} for {bam_file}")
 
 			# Check if BAM is paired-end
 			paired_flag = expression.is_paired_end(bam_file)
-			paired_option = ["-p", "-B"] if paired_flag else [""]
 
 			# Run featureCounts
 			counts_file = f"{output_dir}/{sample}_counts.txt"
-			featurecounts_command = [
-				"featureCounts", "-a", reference_gtf, "-o", counts_file, "-T", str(processors),
-				"-t", "exon", "-g", "gene_id"
-			] + paired_option + [bam_file]
-			# Delete empty strings
-			featurecounts_command = list(filter(None, featurecounts_command))
+			featurecounts_command = expression.featurecounts_command(reference_gtf, counts_file, processors, bam_file, paired_flag)
 			return_code = general.execute_command(featurecounts_command, f"{output_dir}/logs/featureCounts.log")
 			if return_code != 0:
 				logger.error(f"FeatureCounts failed for sample {sample}")
@@ -24,17 +24,16 @@ def parse_args():
 
 def bam2junc(bam, gtf, output, threads):
 
+	# featureCounts does not read CRAM files
+	if expression.is_cram(bam):
+		logger.error(f"featureCounts does not read CRAM files: {bam}. Please convert it to BAM using 'samtools view -b'.")
+		sys.exit(1)
+
 	# Check if BAM is paired-end
 	paired_flag = expression.is_paired_end(bam)
-	paired_option = ["-p", "-B"] if paired_flag else [""]
 
 	# Run featureCounts
-	featurecounts_command = [
-		"featureCounts", "-a", gtf, "-o", output, "-T", str(threads),
-		"-t", "exon", "-g", "gene_id"
-	] + paired_option + [bam]
-	# Delete empty strings
-	featurecounts_command = list(filter(None, featurecounts_command))
+	featurecounts_command = expression.featurecounts_command(gtf, output, threads, bam, paired_flag)
 	returncode = general.execute_command(featurecounts_command)
 	if returncode != 0:
 		logger.error(f"Error executing the command. Exiting...")
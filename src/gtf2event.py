@@ -8,8 +8,15 @@ from collections import defaultdict
 import multiprocessing as mp
 import itertools
 import time
+import json
+import resource
 import concurrent.futures
 import logging
+import hashlib
+import pickle
+import tempfile
+from lib import annotation, parallel
+from lib.event_types import event_type_list
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -34,244 +41,196 @@ def get_args():
 	parser.add_argument("-r", "--reference-gtf", type = str, help = "Reference GTF file", required = False)
 	parser.add_argument("-o", "--output", type = str, help = "Output directory", required = True)
 	parser.add_argument("-p", "--num-process", type = int, help = "Number of processors to use", default = 1)
+	parser.add_argument("-c", "--cache-dir", type = str, help = "Directory to cache parsed GTF files", required = False)
+	parser.add_argument("--max-mse-n", type = int, help = "Maximum number of exons skipped in multiple skipped exon (MSE) events", default = 500)
+	parser.add_argument("--max-complex-transcripts", type = int, help = "Maximum number of distinct transcript structures per gene compared in complex (CO, CF and CL) event search (default: no limit)", default = None)
+	parser.add_argument("--events", type = lambda value: event_type_list(value, list(EVENT_DETECTORS.keys())), help = "Comma-separated event types to search, among " + ",".join(EVENT_DETECTORS.keys()) + " (default: all)", default = None)
+	parser.add_argument("--stream", action = "store_true", help = "Read the GTF file and search events one chromosome at a time to reduce memory usage")
+	parser.add_argument("--incremental", action = "store_true", help = "Reuse events of genes unchanged since the last run with the same cache directory")
+	parser.add_argument("--gene-runtime", type = str, help = "Write the runtime of event search for each gene to this file", required = False)
+	parser.add_argument("--profile", action = "store_true", help = "Write a report of the runtime and memory usage of each stage, detector, worker and the slowest genes to profile.json in the output directory")
 	parser.add_argument("-v", "--verbose", action="store_true", help="Verbose output")
 	args = parser.parse_args()
 	return(args)
 
-def gtf(gtf, num_process) -> pd.DataFrame:
+def pack(start, end):
 	"""
-	Reads a GTF file and extracts exon information to create a pandas DataFrame.
+	Packs start and end positions into one 64-bit key, which sorts by start and then by end.
 
 	Args:
-		gtf (str): The path to the GTF file.
+		start (int or np.ndarray): Start positions.
+		end (int or np.ndarray): End positions.
 
 	Returns:
-		Dict: A dictionary containing information about the GTF file.
+		int or np.ndarray: Packed keys.
 	"""
 
-	gtf_df = pd.read_csv(
-		gtf,
-		sep = "\t",
-		usecols = [
-			0, 2, 3, 4, 6, 8
-		],
-		dtype = {
-			0: "str",
-			2: "str",
-			3: "int32",
-			4: "int32",
-			6: "str",
-			8: "str"
-		},
-		comment = "#",
-		header = None
-	)
+	return((start << 32) | end)
 
-	gtf_df = gtf_df[gtf_df[2] == "exon"]
-	gtf_df = gtf_df.reset_index()
-	gtf_df = gtf_df[[0, 3, 4, 6, 8]]
-	gtf_df.columns = ["chr", "start", "end", "strand", "information"]
-	gtf_info = gtf_df.information.values
-	gene_id_dic = {}
-	gene_name_dic = {}
-	gene_id_list_dic = defaultdict(list)
-	gene_name_list_dic = defaultdict(list)
-	gene_id_col = []
-	gene_name_col = []
-	transcript_id_col = []
-
-	for index in range(gtf_df.shape[0]):
-		dic = {}
-		l = gtf_info[index].split(";")[0:-1]
-		for i in l:
-			if '"' in i:
-				key = i.split('"')[0].strip(" ")
-				value = i.split('"')[1]
-			else:
-				key = i.strip(" ").split(" ")[0]
-				value = i.strip(" ").split(" ")[1]
-			dic[key] = value
-		if "ref_gene_id" in dic:
-			gene_id = dic["ref_gene_id"]
-			gene_id_dic[dic["gene_id"]] = dic["ref_gene_id"]
-			gene_id_list_dic[dic["gene_id"]] += [dic["ref_gene_id"]]
-		else:
-			gene_id = dic["gene_id"]
-		if "gene_name" in dic:
-			gene_name = dic["gene_name"]
-			gene_name_dic[dic["gene_id"]] = dic["gene_name"]
-			gene_name_list_dic[dic["gene_id"]] += [dic["gene_name"]]
-		else:
-			if "ref_gene_id" in dic:
-				gene_name = dic["ref_gene_id"]
-			else:
-				gene_name = dic["gene_id"]
-
-		transcript_id = dic["transcript_id"]
-		gene_id_col += [gene_id]
-		gene_name_col += [gene_name]
-		transcript_id_col += [transcript_id]
-
-	gtf_df["gene_id"] = gene_id_col
-	gtf_df["gene_name"] = gene_name_col
-	gtf_df["transcript_id"] = transcript_id_col
-
-	gtf_gene_id = gtf_df.gene_id.values
-	gtf_gene_name = gtf_df.gene_name.values
-	gtf_chr = gtf_df.chr.values
-
-	for index in range(gtf_df.shape[0]):
-		if gtf_gene_id[index] in gene_id_list_dic:
-			l = gene_id_list_dic[gtf_gene_id[index]]
-			c = collections.Counter(l)
-			most_common = c.most_common()[0][0]
-			gtf_df.at[index, "gene_id"] = most_common
-		if gtf_gene_name[index] in gene_name_list_dic:
-			l = gene_name_list_dic[gtf_gene_name[index]]
-			c = collections.Counter(l)
-			most_common = c.most_common()[0][0]
-			gtf_df.at[index, "gene_name"] = most_common
-		if ~(gtf_chr[index].startswith("chr")) and (len(gtf_chr[index]) <= 2):
-			gtf_df.at[index, "chr"] = "chr" + gtf_chr[index]
-
-	gtf_df = gtf_df.sort_values(["gene_id", "transcript_id", "start"])
-	gtf_df = gtf_df.reset_index()
-	gtf_gene_id = gtf_df.gene_id.values
-	gtf_gene_name = gtf_df.gene_name.values
-	gtf_transcript_id = gtf_df.transcript_id.values
-	gtf_chr = gtf_df.chr.values
-	gtf_start = gtf_df.start.values
-	gtf_end = gtf_df.end.values
-	gtf_strand = gtf_df.strand.values
-	gtf_dic = defaultdict(dict)
-	transcript = ""
-	gene = ""
-
-	for index in range(gtf_df.shape[0]):
-		gtf_dic[gtf_gene_id[index]]["gene_name"] = gtf_gene_name[index]
-		gtf_dic[gtf_gene_id[index]]["chr"] = gtf_chr[index]
-		gtf_dic[gtf_gene_id[index]]["strand"] = gtf_strand[index]
-
-		try:
-			gtf_dic[gtf_gene_id[index]]["start"] = np.append(gtf_dic[gtf_gene_id[index]]["start"], gtf_start[index])
-		except:
-			gtf_dic[gtf_gene_id[index]]["start"] = np.array([gtf_start[index]])
-
-		try:
-			gtf_dic[gtf_gene_id[index]]["end"] = np.append(gtf_dic[gtf_gene_id[index]]["end"], gtf_end[index])
-		except:
-			gtf_dic[gtf_gene_id[index]]["end"] = np.array([gtf_end[index]])
-
-		try:
-			gtf_dic[gtf_gene_id[index]]["exon_list"].add(gtf_chr[index] + ":" + str(gtf_start[index]) + "-" + str(gtf_end[index]))
-		except:
-			gtf_dic[gtf_gene_id[index]]["exon_list"] = {gtf_chr[index] + ":" + str(gtf_start[index]) + "-" + str(gtf_end[index])}
-
-		if "start_dic" not in gtf_dic[gtf_gene_id[index]]:
-			gtf_dic[gtf_gene_id[index]]["start_dic"] = {}
-		try:
-			gtf_dic[gtf_gene_id[index]]["start_dic"][str(gtf_start[index])].add(str(gtf_end[index]))
-		except:
-			gtf_dic[gtf_gene_id[index]]["start_dic"][str(gtf_start[index])] = {str(gtf_end[index])}
-
-		if "end_dic" not in gtf_dic[gtf_gene_id[index]]:
-			gtf_dic[gtf_gene_id[index]]["end_dic"] = {}
-		try:
-			gtf_dic[gtf_gene_id[index]]["end_dic"][str(gtf_end[index])].add(str(gtf_start[index]))
-		except:
-			gtf_dic[gtf_gene_id[index]]["end_dic"][str(gtf_end[index])] = {str(gtf_start[index])}
-
-		if "transcript_exon_dic" not in gtf_dic[gtf_gene_id[index]]:
-			gtf_dic[gtf_gene_id[index]]["transcript_exon_dic"] = {}
-		if gtf_transcript_id[index] not in gtf_dic[gtf_gene_id[index]]["transcript_exon_dic"]:
-			gtf_dic[gtf_gene_id[index]]["transcript_exon_dic"][gtf_transcript_id[index]] = set()
-		try:
-			gtf_dic[gtf_gene_id[index]]["transcript_exon_dic"][gtf_transcript_id[index]].add(gtf_chr[index] + ":" + str(gtf_start[index]) + "-" + str(gtf_end[index]))
-		except:
-			gtf_dic[gtf_gene_id[index]]["transcript_exon_dic"][gtf_transcript_id[index]] = {gtf_chr[index] + ":" + str(gtf_start[index]) + "-" + str(gtf_end[index])}
-
-		if gtf_transcript_id[index] == transcript:
-
-			if "intron_start_dic" not in gtf_dic[gtf_gene_id[index]]:
-				gtf_dic[gtf_gene_id[index]]["intron_start_dic"] = {}
-			try:
-				gtf_dic[gtf_gene_id[index]]["intron_start_dic"][str(end)].add(str(gtf_start[index]))
-			except:
-				gtf_dic[gtf_gene_id[index]]["intron_start_dic"][str(end)] = {str(gtf_start[index])}
-
-			if "intron_end_dic" not in gtf_dic[gtf_gene_id[index]]:
-				gtf_dic[gtf_gene_id[index]]["intron_end_dic"] = {}
-			try:
-				gtf_dic[gtf_gene_id[index]]["intron_end_dic"][str(gtf_start[index])].add(str(end))
-			except:
-				gtf_dic[gtf_gene_id[index]]["intron_end_dic"][str(gtf_start[index])] = {str(end)}
-
-			if "intron_list" not in gtf_dic[gtf_gene_id[index]]:
-				gtf_dic[gtf_gene_id[index]]["intron_list"] = set()
-			try:
-				gtf_dic[gtf_gene_id[index]]["intron_list"].add(gtf_chr[index] + ":" + str(end) + "-" + str(gtf_start[index]))
-			except:
-				gtf_dic[gtf_gene_id[index]]["intron_list"] = {gtf_chr[index] + ":" + str(end) + "-" + str(gtf_start[index])}
-
-			if "transcript_intron_dic" not in gtf_dic[gtf_gene_id[index]]:
-				gtf_dic[gtf_gene_id[index]]["transcript_intron_dic"] = {}
-			if gtf_transcript_id[index] not in gtf_dic[gtf_gene_id[index]]["transcript_intron_dic"]:
-				gtf_dic[gtf_gene_id[index]]["transcript_intron_dic"][gtf_transcript_id[index]] = set()
-			try:
-				gtf_dic[gtf_gene_id[index]]["transcript_intron_dic"][gtf_transcript_id[index]].add(gtf_chr[index] + ":" + str(end) + "-" + str(gtf_start[index]))
-			except:
-				gtf_dic[gtf_gene_id[index]]["transcript_intron_dic"][gtf_transcript_id[index]] = {gtf_chr[index] + ":" + str(end) + "-" + str(gtf_start[index])}
-
-		end = gtf_end[index]
-		transcript = gtf_transcript_id[index]
-
-	# Discard genes with only one transcript
-	gtf_dic = {k: v for k, v in gtf_dic.items() if len(v["transcript_exon_dic"]) > 1}
-	# Split gene list into number of processes
-	gene_l_split = np.array_split(list(gtf_dic.keys()), num_process)
-	# Split dictionry into number of processes
-	gtf_dic_split = defaultdict(dict)
-	for i in range(num_process):
-		gtf_dic_split[i] = defaultdict(dict)
-		for gene in gene_l_split[i]:
-			gtf_dic_split[i][gene] = gtf_dic[gene]
-
-	return(gtf_dic_split)
-
-def gtf_exon_set(gtf_path) -> set:
+def unpack(key):
 	"""
-	Reads a GTF file and extracts exon information to create a set of exon coordinates.
+	Unpacks keys made by pack() into start and end positions.
 
 	Args:
-		gtf (str): The path to the GTF file.
+		key (int or np.ndarray): Packed keys.
 
 	Returns:
-		set: A set of exon coordinates in the format "chr:start-end".
+		tuple: Start and end positions.
 	"""
 
-	gtf_df = pd.read_csv(
-		gtf_path,
-		sep = "\t",
-		usecols = [
-			0, 2, 3, 4
-		],
-		dtype = {
-			0: "str",
-			2: "str",
-			3: "int32",
-			4: "int32"
-		},
-		comment = "#",
-		header = None
-	)
+	return(key >> 32, key & 0xFFFFFFFF)
+
+def exon_string(chr, key) -> str:
+	"""
+	Formats a packed key as "chr:start-end".
+
+	Args:
+		chr (str): Chromosome name.
+		key (int): A key made by pack().
+
+	Returns:
+		str: Coordinates in the format "chr:start-end".
+	"""
+
+	start, end = unpack(key)
+	return(f"{chr}:{start}-{end}")
+
+def gtf(gtf_df) -> dict:
+	"""
+	Builds a gene model from an exon table.
+
+	Coordinates are kept as integers. For each gene with more than one transcript, the model holds
+	its unique exons sorted by position (exon_start and exon_end), its unique introns as packed keys (intron),
+	and the exons of each transcript as indices into the unique exons (transcript_exon), of which the i-th
+	transcript in transcript_id spans transcript_offset[i] to transcript_offset[i + 1].
+
+	Args:
+		gtf_df (pd.DataFrame): An exon table returned by annotation.exon_table().
+
+	Returns:
+		Dict: A dictionary of gene ID and its model.
+	"""
+
+	gene_code = pd.factorize(gtf_df["gene_id"])[0]
+	transcript_code = pd.factorize(gtf_df["transcript_id"])[0]
+	start = np.asarray(gtf_df["start"], dtype = "int64")
+	end = np.asarray(gtf_df["end"], dtype = "int64")
+	# Sort by gene, transcript and position, and drop duplicated exons in a transcript
+	order = np.lexsort((end, start, transcript_code, gene_code))
+	gene_code, transcript_code, start, end = gene_code[order], transcript_code[order], start[order], end[order]
+	keep = np.r_[True, (gene_code[1:] != gene_code[:-1]) | (transcript_code[1:] != transcript_code[:-1]) | (start[1:] != start[:-1]) | (end[1:] != end[:-1])]
+	order, gene_code, transcript_code, start, end = order[keep], gene_code[keep], transcript_code[keep], start[keep], end[keep]
+	exon_key = pack(start, end)
+
+	# Rows where a gene or a transcript begins
+	gene_first = np.flatnonzero(np.r_[True, gene_code[1:] != gene_code[:-1]])
+	gene_last = np.r_[gene_first[1:], len(gene_code)]
+	transcript_first = np.flatnonzero(np.r_[True, (gene_code[1:] != gene_code[:-1]) | (transcript_code[1:] != transcript_code[:-1])])
+	transcript_gene = gene_code[transcript_first]
+
+	# Unique exons of each gene
+	exon_order = np.lexsort((exon_key, gene_code))
+	exon_new = np.r_[True, (gene_code[exon_order][1:] != gene_code[exon_order][:-1]) | (exon_key[exon_order][1:] != exon_key[exon_order][:-1])]
+	exon_index = np.empty(len(exon_key), dtype = "int64")
+	exon_index[exon_order] = np.cumsum(exon_new) - 1
+	unique_exon_key = exon_key[exon_order][exon_new]
+	unique_exon_gene = gene_code[exon_order][exon_new]
+	unique_exon_start, unique_exon_end = unpack(unique_exon_key)
+	unique_exon_start = unique_exon_start.astype("int32")
+	unique_exon_end = unique_exon_end.astype("int32")
+	gene_exon_first = np.searchsorted(unique_exon_gene, gene_code[gene_first], side = "left")
+	gene_exon_last = np.searchsorted(unique_exon_gene, gene_code[gene_first], side = "right")
+
+	# Unique introns of each gene, between adjacent exons of a transcript
+	is_intron = np.flatnonzero((gene_code[1:] == gene_code[:-1]) & (transcript_code[1:] == transcript_code[:-1]))
+	intron_key = pack(end[is_intron], start[is_intron + 1])
+	intron_gene = gene_code[is_intron]
+	intron_order = np.lexsort((intron_key, intron_gene))
+	intron_new = np.r_[True, (intron_gene[intron_order][1:] != intron_gene[intron_order][:-1]) | (intron_key[intron_order][1:] != intron_key[intron_order][:-1])] if len(intron_key) > 0 else np.array([], dtype = bool)
+	unique_intron_key = intron_key[intron_order][intron_new]
+	unique_intron_gene = intron_gene[intron_order][intron_new]
+	gene_intron_first = np.searchsorted(unique_intron_gene, gene_code[gene_first], side = "left")
+	gene_intron_last = np.searchsorted(unique_intron_gene, gene_code[gene_first], side = "right")
+
+	gtf_gene_id = np.asarray(gtf_df["gene_id"])[order]
+	gtf_gene_name = np.asarray(gtf_df["gene_name"])[order]
+	gtf_transcript_id = np.asarray(gtf_df["transcript_id"])[order]
+	gtf_chr = np.asarray(gtf_df["chr"])[order]
+	gtf_strand = np.asarray(gtf_df["strand"])[order]
+	gene_transcript_first = np.searchsorted(transcript_gene, gene_code[gene_first], side = "left")
+	gene_transcript_last = np.searchsorted(transcript_gene, gene_code[gene_first], side = "right")
+
+	gtf_dic = {}
+	for i in range(len(gene_first)):
+		# Discard genes with only one transcript
+		if gene_transcript_last[i] - gene_transcript_first[i] < 2:
+			continue
+		first, last = gene_first[i], gene_last[i]
+		transcript_row = transcript_first[gene_transcript_first[i]:gene_transcript_last[i]]
+		gtf_dic[gtf_gene_id[first]] = {
+			"gene_name": gtf_gene_name[last - 1],
+			"chr": gtf_chr[last - 1],
+			"strand": gtf_strand[last - 1],
+			"exon_start": unique_exon_start[gene_exon_first[i]:gene_exon_last[i]],
+			"exon_end": unique_exon_end[gene_exon_first[i]:gene_exon_last[i]],
+			"intron": unique_intron_key[gene_intron_first[i]:gene_intron_last[i]],
+			"transcript_id": gtf_transcript_id[transcript_row].tolist(),
+			"transcript_offset": np.r_[transcript_row, last] - first,
+			"transcript_exon": (exon_index[first:last] - gene_exon_first[i]).astype("int32")
+		}
+
+	return(gtf_dic)
+
+def gene_introns(gene_dic) -> tuple:
+	"""
+	Makes lookups of the introns of a gene.
+
+	Args:
+		gene_dic (dict): The model of a gene made by gtf().
+
+	Returns:
+		tuple: A set of packed intron keys, a dictionary from intron start to intron ends,
+		and a dictionary from intron end to intron starts.
+	"""
+
+	intron_set = set(gene_dic["intron"].tolist())
+	intron_start_dic = defaultdict(list)
+	intron_end_dic = defaultdict(list)
+	for key in intron_set:
+		intron_start, intron_end = unpack(key)
+		intron_start_dic[intron_start].append(intron_end)
+		intron_end_dic[intron_end].append(intron_start)
+	return(intron_set, intron_start_dic, intron_end_dic)
+
+def gene_transcripts(gene_dic) -> dict:
+	"""
+	Makes a dictionary from transcript ID to the indices of its exons sorted by position.
+
+	Args:
+		gene_dic (dict): The model of a gene made by gtf().
+
+	Returns:
+		dict: A dictionary of transcript ID and list of exon indices.
+	"""
+
+	return(dict(zip(gene_dic["transcript_id"], transcript_exons(gene_dic))))
+
+def transcript_exons(gene_dic) -> list:
+	"""
+	Makes lists of the indices of the exons of each transcript sorted by position, in the order of transcript_id.
 
-	gtf_df = gtf_df[gtf_df[2] == "exon"][[0, 3, 4]]
-	gtf_df.columns = ["chr", "start", "end"]
-	gtf_df.loc[(~(gtf_df["chr"].str.startswith("chr")) & (gtf_df["chr"].str.len() <= 2)), "chr"] = "chr" + gtf_df["chr"]
-	gtf_df["exon"] = gtf_df["chr"] + ":" + gtf_df["start"].astype(str) + "-" + gtf_df["end"].astype(str)
-	gtf_exon_set = set(gtf_df["exon"])
+	Transcript IDs are not read, so that the pages of a gene model inherited by forked workers stay shared with the parent process.
 
-	return(gtf_exon_set)
+	Args:
+		gene_dic (dict): The model of a gene made by gtf().
+
+	Returns:
+		list: A list of exon indices for each transcript.
+	"""
+
+	transcript_exon = gene_dic["transcript_exon"].tolist()
+	offset = gene_dic["transcript_offset"].tolist()
+	return([transcript_exon[offset[i]:offset[i + 1]] for i in range(len(offset) - 1)])
 
 def se(gtf_dic) -> list:
 	"""
@@ -288,20 +247,14 @@ def se(gtf_dic) -> list:
 
 	event_l = []
 	for gene in gtf_dic.keys():
-		if "intron_list" not in gtf_dic[gene]:
+		if len(gtf_dic[gene]["intron"]) == 0:
 			continue
 		chr = gtf_dic[gene]["chr"]
 		strand = gtf_dic[gene]["strand"]
 		gene_name = gtf_dic[gene]["gene_name"]
-		gene_start_values = gtf_dic[gene]["start"]
-		gene_end_values = gtf_dic[gene]["end"]
-		intron_list = gtf_dic[gene]["intron_list"]
-		intron_start_dict = gtf_dic[gene]["intron_start_dic"]
-		intron_end_dict = gtf_dic[gene]["intron_end_dic"]
-		exon_list = gtf_dic[gene]["exon_list"]
-		exon_list_unique = np.unique([[i.split(":")[1].split("-")[0], i.split(":")[1].split("-")[1]] for i in exon_list], axis = 0)
-		exon_start = np.array([i[0] for i in exon_list_unique]).astype("int32")
-		exon_end = np.array([i[1] for i in exon_list_unique]).astype("int32")
+		intron_set, intron_start_dict, intron_end_dict = gene_introns(gtf_dic[gene])
+		exon_start = gtf_dic[gene]["exon_start"].tolist()
+		exon_end = gtf_dic[gene]["exon_end"].tolist()
 
 		for index in range(len(exon_start)):
 
@@ -311,27 +264,31 @@ def se(gtf_dic) -> list:
 			# inc2: (x2, y2)
 			# exc: (x1, y2)
 
-			y1 = str(exon_start[index])
-			x2 = str(exon_end[index])
-			x1_list = intron_end_dict.get(y1, set())
-			y2_list = intron_start_dict.get(x2, set())
+			y1 = exon_start[index]
+			x2 = exon_end[index]
+			x1_list = intron_end_dict.get(y1, [])
+			y2_list = intron_start_dict.get(x2, [])
 			x1_y2_iter = itertools.product(x1_list, y2_list)
 			for x1, y2 in x1_y2_iter:
-				exon = chr + ":" + str(y1) + "-" + str(x2)
-				inc1 = chr + ":" + str(x1) + "-" + str(y1)
-				inc2 = chr + ":" + str(x2) + "-" + str(y2)
-				exc = chr + ":" + str(x1) + "-" + str(y2)
-				if exc in intron_list:
+				if pack(x1, y2) in intron_set:
+					exon = f"{chr}:{y1}-{x2}"
+					inc1 = f"{chr}:{x1}-{y1}"
+					inc2 = f"{chr}:{x2}-{y2}"
+					exc = f"{chr}:{x1}-{y2}"
 					event_l += [[exon, inc1, inc2, exc, strand, gene, gene_name]]
 
 	return(event_l)
 
-def mse(gtf_dic) -> list:
+def mse(gtf_dic, max_mse_n = 500) -> list:
 	'''
 	Make multi-skipped exon list.
 
+	Every window of at least two adjacent internal exons of a transcript is an event
+	if an intron of the gene joins the exons flanking the window.
+
 	Args:
 		gtf_dic: A dictionary containing information about the GTF file.
+		max_mse_n (int): Maximum number of exons skipped.
 
 	Returns:
 		list: List of multi-skipped exon events, where each event is represented as a list of the form
@@ -343,74 +300,36 @@ def mse(gtf_dic) -> list:
 
 	event_l = []
 	for gene in gtf_dic.keys():
-		if "intron_list" not in gtf_dic[gene]:
+		if len(gtf_dic[gene]["intron"]) == 0:
 			continue
 		chr = gtf_dic[gene]["chr"]
 		strand = gtf_dic[gene]["strand"]
 		gene_name = gtf_dic[gene]["gene_name"]
-		gene_start_values = gtf_dic[gene]["start"]
-		gene_end_values = gtf_dic[gene]["end"]
-		intron_list = gtf_dic[gene]["intron_list"]
-		intron_start_dict = gtf_dic[gene]["intron_start_dic"]
-		intron_end_dict = gtf_dic[gene]["intron_end_dic"]
-		intron_dic = gtf_dic[gene]["transcript_intron_dic"]
-		exon_dic = gtf_dic[gene]["transcript_exon_dic"]
-		# Sort exons by start position, ascending order
-		exon_dic = {k: sorted(list(v), key = lambda x: int(x.split(":")[1].split("-")[0])) for k, v in exon_dic.items()}
-		# Transcript list sorted by exon number
-		transcript_list = sorted(exon_dic, key = lambda x: len(exon_dic[x]))
-
-		# Identify multi-skipped exon events until five-hundredth exon skipping
-		for mse_n in range(2, 501):
-			# Get transcript with at least mse_n+2 exons
-			transcript_list = [transcript for transcript in exon_dic.keys() if len(exon_dic[transcript]) >= mse_n + 2]
-			if len(transcript_list) == 0:
-				break
-			for transcript in transcript_list:
-				exon_list_in_transcript = exon_dic[transcript]
-				exon_start_in_transcript = np.array([i.split(":")[1].split("-")[0] for i in exon_list_in_transcript]).astype("int32")
-				exon_end_in_transcript = np.array([i.split(":")[1].split("-")[1] for i in exon_list_in_transcript]).astype("int32")
-
-				# Get combinations of n adjuscent index
-				# e.g. (1, 2) when mse_n = 2 and exon number = 3, first and last exons are excluded
-				# e.g. (1, 2), (2, 3) when mse_n = 2 and exon number = 4, first and last exons are excluded
-				# e.g. (1, 2, 3), (2, 3, 4) when mse_n = 3 and exon number = 6, first and last exons are excluded
-				# e.g. (1, 2, 3), (2, 3, 4), (3, 4, 5) when mse_n = 3 and exon number = 7, first and last exons are excluded
-				idx_number_list = [i for i in range(len(exon_list_in_transcript) - mse_n)] # e.g. [0, 1] when mse_n = 2 and exon number = 4
-				idx_list_list = [list(range(i + 1, i + 1 + mse_n)) for i in idx_number_list] # e.g. [[1, 2], [2, 3]] when mse_n = 2 and exon number = 4
-				for idx_list in idx_list_list:
-
-					# (inc_1)[exon_1](inc_2)[exon_2]...[exon_(mse_n-1)](inc_(mse_n))[exon_(mse_n)](inc_(mse_n+1))
-					# (x1, y1)[y1, x2](x2, y2)[y2, x3]...[x(mse_n-1), y(mse_n)](x(mse_n), y(mse_n))[y(mse_n), x(mse_n+1)](x(mse_n+1), y(mse_n+1))
-					# inc1: (x1, y1)
-					# inc2: (x2, y2)
-					# ...
-					# inc(mse_n): (x(mse_n), y(mse_n))
-					# inc(mse_n+1): (x(mse_n+1), y(mse_n+1))
-					# exc: (x1, y(mse_n+1))
-
-					all_exons = [chr + ":" + str(exon_start_in_transcript[i]) + "-" + str(exon_end_in_transcript[i]) for i in idx_list]
-					exonlist = ";".join(all_exons)
-
-					x1_list = intron_end_dict.get(str(exon_start_in_transcript[idx_list[0]]), set())
-					y_mse_n_1_list = intron_start_dict.get(str(exon_end_in_transcript[idx_list[mse_n - 1]]), set())
-					for x1, y_mse_n_1 in itertools.product(x1_list, y_mse_n_1_list):
-
-						all_inclusion_introns = [chr + ":" + str(x1) + "-" + str(exon_start_in_transcript[idx_list[0]])] # inc1 (first intron)
-						for i in range(mse_n - 1): # inc2 to inc(mse_n)
-							all_inclusion_introns += [chr + ":"
-								+ str(exon_end_in_transcript[idx_list[i]])
-								+ "-"
-								+ str(exon_start_in_transcript[idx_list[i + 1]])
-							]
-						all_inclusion_introns += [chr + ":" + str(exon_end_in_transcript[idx_list[mse_n - 1]]) + "-" + str(y_mse_n_1)] # inc(mse_n+1)
-						exc = chr + ":" + str(x1) + "-" + str(y_mse_n_1)
-						all_introns = all_inclusion_introns + [exc]
-						intronlist = ";".join(all_introns)
-
-						# Check if all inclusion introns are and exclusion introns are NOT present in the same transcript
-						if (set(all_inclusion_introns) <= intron_dic[transcript]) and (exc not in intron_dic[transcript]) and (exc in intron_list):
-							event_l += [[exonlist, intronlist, mse_n, strand, gene, gene_name]]
+		intron_set = set(gtf_dic[gene]["intron"].tolist())
+		gene_exon_start = gtf_dic[gene]["exon_start"].tolist()
+		gene_exon_end = gtf_dic[gene]["exon_end"].tolist()
+		# Skipped exons and exclusion introns already found in other transcripts
+		window_set = set()
+
+		for exon_idx in transcript_exons(gtf_dic[gene]):
+			exon_start_in_transcript = [gene_exon_start[i] for i in exon_idx]
+			exon_end_in_transcript = [gene_exon_end[i] for i in exon_idx]
+			exon_num = len(exon_idx)
+
+			# (inc_1)[exon_1](inc_2)[exon_2]...[exon_(mse_n)](inc_(mse_n+1))
+			# Exons i + 1 to j - 1 are skipped by exc: (end of exon i, start of exon j), first and last exons are excluded
+			for i in range(exon_num - 3):
+				for j in range(i + 3, min(exon_num, i + max_mse_n + 2)):
+					exc = pack(exon_end_in_transcript[i], exon_start_in_transcript[j])
+					if exc not in intron_set:
+						continue
+					window = (exc, tuple(exon_idx[i + 1:j]))
+					if window in window_set:
+						continue
+					window_set.add(window)
+					exonlist = ";".join([f"{chr}:{exon_start_in_transcript[k]}-{exon_end_in_transcript[k]}" for k in range(i + 1, j)])
+					intronlist = ";".join([f"{chr}:{exon_end_in_transcript[k]}-{exon_start_in_transcript[k + 1]}" for k in range(i, j)] + [f"{chr}:{exon_end_in_transcript[i]}-{exon_start_in_transcript[j]}"])
+					event_l += [[exonlist, intronlist, j - i - 1, strand, gene, gene_name]]
 
 	return(event_l)
 
@@ -429,22 +348,21 @@ def five(gtf_dic) -> list:
 
 	event_l = []
 	for gene in gtf_dic.keys():
-		if "intron_list" not in gtf_dic[gene]:
+		if len(gtf_dic[gene]["intron"]) == 0:
 			continue
 		chr = gtf_dic[gene]["chr"]
 		strand = gtf_dic[gene]["strand"]
 		gene_name = gtf_dic[gene]["gene_name"]
-		gene_start_values = gtf_dic[gene]["start"]
-		gene_end_values = gtf_dic[gene]["end"]
-		intron_list = gtf_dic[gene]["intron_list"]
-		intron_start_dict = gtf_dic[gene]["intron_start_dic"]
-		intron_end_dict = gtf_dic[gene]["intron_end_dic"]
-		intron_start_set = set(intron_start_dict.keys())
-		intron_end_set = set(intron_end_dict.keys())
+		intron_set, intron_start_dict, intron_end_dict = gene_introns(gtf_dic[gene])
+		exon_dic = defaultdict(list)
 		if strand == "+":
-			exon_dic = gtf_dic[gene]["start_dic"]
+			# Exon ends for each exon start
+			for exon_start, exon_end in zip(gtf_dic[gene]["exon_start"].tolist(), gtf_dic[gene]["exon_end"].tolist()):
+				exon_dic[exon_start].append(exon_end)
 		else:
-			exon_dic = gtf_dic[gene]["end_dic"]
+			# Exon starts for each exon end
+			for exon_start, exon_end in zip(gtf_dic[gene]["exon_start"].tolist(), gtf_dic[gene]["exon_end"].tolist()):
+				exon_dic[exon_end].append(exon_start)
 		five_dic = {}
 		for key in exon_dic.keys():
 			if len(exon_dic[key]) != 1:
@@ -453,50 +371,27 @@ def five(gtf_dic) -> list:
 			alt_list = five_dic[con]
 			i_j_iter = itertools.combinations(alt_list, 2)
 			for i, j in i_j_iter:
-				set_ij = {str(i), str(j)}
 				if strand == "+":
-					if (set_ij & intron_start_set) == set_ij:
-						intron_i = intron_start_dict[str(i)]
-						intron_j = intron_start_dict[str(j)]
-						intron_common = list(set(intron_i) & set(intron_j))
+					if (i in intron_start_dict) and (j in intron_start_dict):
+						intron_common = set(intron_start_dict[i]) & set(intron_start_dict[j])
 						for s in intron_common:
-							if int(j) < int(i):
-								exon_a_end = i
-								exon_b_end = j
-								intron_a_start = i
-								intron_b_start = j
-							else:
-								exon_a_end = j
-								exon_b_end = i
-								intron_a_start = j
-								intron_b_start = i
-
-							exon_a = chr + ":" + str(con) + "-" + str(exon_a_end)
-							exon_b = chr + ":" + str(con) + "-" + str(exon_b_end)
-							intron_a = chr + ":" + str(intron_a_start) + "-" + str(s)
-							intron_b = chr + ":" + str(intron_b_start) + "-" + str(s)
+							exon_a_end = max(i, j)
+							exon_b_end = min(i, j)
+							exon_a = f"{chr}:{con}-{exon_a_end}"
+							exon_b = f"{chr}:{con}-{exon_b_end}"
+							intron_a = f"{chr}:{exon_a_end}-{s}"
+							intron_b = f"{chr}:{exon_b_end}-{s}"
 							event_l += [[exon_a, exon_b, intron_a, intron_b, strand, gene, gene_name]]
 				else:
-					if (set_ij & intron_end_set) == set_ij:
-						intron_i = intron_end_dict[str(i)]
-						intron_j = intron_end_dict[str(j)]
-						intron_common = list(set(intron_i) & set(intron_j))
+					if (i in intron_end_dict) and (j in intron_end_dict):
+						intron_common = set(intron_end_dict[i]) & set(intron_end_dict[j])
 						for s in intron_common:
-							if int(j) < int(i):
-								exon_a_start = j
-								exon_b_start = i
-								intron_a_end = j
-								intron_b_end = i
-							else:
-								exon_a_start = i
-								exon_b_start = j
-								intron_a_end = i
-								intron_b_end = j
-
-							exon_a = chr + ":" + str(exon_a_start) + "-" + str(con)
-							exon_b = chr + ":" + str(exon_b_start) + "-" + str(con)
-							intron_a = chr + ":" + str(s) + "-" + str(intron_a_end)
-							intron_b = chr + ":" + str(s) + "-" + str(intron_b_end)
+							exon_a_start = min(i, j)
+							exon_b_start = max(i, j)
+							exon_a = f"{chr}:{exon_a_start}-{con}"
+							exon_b = f"{chr}:{exon_b_start}-{con}"
+							intron_a = f"{chr}:{s}-{exon_a_start}"
+							intron_b = f"{chr}:{s}-{exon_b_start}"
 							event_l += [[exon_a, exon_b, intron_a, intron_b, strand, gene, gene_name]]
 
 	return(event_l)
@@ -516,22 +411,21 @@ def three(gtf_dic) -> list:
 
 	event_l = []
 	for gene in gtf_dic.keys():
-		if "intron_list" not in gtf_dic[gene]:
+		if len(gtf_dic[gene]["intron"]) == 0:
 			continue
 		chr = gtf_dic[gene]["chr"]
 		strand = gtf_dic[gene]["strand"]
 		gene_name = gtf_dic[gene]["gene_name"]
-		gene_start_values = gtf_dic[gene]["start"]
-		gene_end_values = gtf_dic[gene]["end"]
-		intron_list = gtf_dic[gene]["intron_list"]
-		intron_start_dict = gtf_dic[gene]["intron_start_dic"]
-		intron_end_dict = gtf_dic[gene]["intron_end_dic"]
-		intron_start_set = set(intron_start_dict.keys())
-		intron_end_set = set(intron_end_dict.keys())
+		intron_set, intron_start_dict, intron_end_dict = gene_introns(gtf_dic[gene])
+		exon_dic = defaultdict(list)
 		if strand == "+":
-			exon_dic = gtf_dic[gene]["end_dic"]
+			# Exon starts for each exon end
+			for exon_start, exon_end in zip(gtf_dic[gene]["exon_start"].tolist(), gtf_dic[gene]["exon_end"].tolist()):
+				exon_dic[exon_end].append(exon_start)
 		else:
-			exon_dic = gtf_dic[gene]["start_dic"]
+			# Exon ends for each exon start
+			for exon_start, exon_end in zip(gtf_dic[gene]["exon_start"].tolist(), gtf_dic[gene]["exon_end"].tolist()):
+				exon_dic[exon_start].append(exon_end)
 		three_dic = {}
 		for key in exon_dic.keys():
 			if len(exon_dic[key]) != 1:
@@ -540,50 +434,27 @@ def three(gtf_dic) -> list:
 			alt_list = three_dic[con]
 			i_j_iter = itertools.combinations(alt_list, 2)
 			for i, j in i_j_iter:
-				set_ij = {str(i), str(j)}
 				if strand == "+":
-					if (set_ij & intron_end_set) == set_ij:
-						intron_i = intron_end_dict[str(i)]
-						intron_j = intron_end_dict[str(j)]
-						intron_common = list(set(intron_i) & set(intron_j))
+					if (i in intron_end_dict) and (j in intron_end_dict):
+						intron_common = set(intron_end_dict[i]) & set(intron_end_dict[j])
 						for s in intron_common:
-							if int(j) < int(i):
-								exon_a_start = j
-								exon_b_start = i
-								intron_a_end = j
-								intron_b_end = i
-							else:
-								exon_a_start = i
-								exon_b_start = j
-								intron_a_end = i
-								intron_b_end = j
-
-							exon_a = chr + ":" + str(exon_a_start) + "-" + str(con)
-							exon_b = chr + ":" + str(exon_b_start) + "-" + str(con)
-							intron_a = chr + ":" + str(s) + "-" + str(intron_a_end)
-							intron_b = chr + ":" + str(s) + "-" + str(intron_b_end)
+							exon_a_start = min(i, j)
+							exon_b_start = max(i, j)
+							exon_a = f"{chr}:{exon_a_start}-{con}"
+							exon_b = f"{chr}:{exon_b_start}-{con}"
+							intron_a = f"{chr}:{s}-{exon_a_start}"
+							intron_b = f"{chr}:{s}-{exon_b_start}"
 							event_l += [[exon_a, exon_b, intron_a, intron_b, strand, gene, gene_name]]
 				else:
-					if (set_ij & intron_start_set) == set_ij:
-						intron_i = intron_start_dict[str(i)]
-						intron_j = intron_start_dict[str(j)]
-						intron_common = list(set(intron_i) & set(intron_j))
+					if (i in intron_start_dict) and (j in intron_start_dict):
+						intron_common = set(intron_start_dict[i]) & set(intron_start_dict[j])
 						for s in intron_common:
-							if int(j) < int(i):
-								exon_a_end = i
-								exon_b_end = j
-								intron_a_start = i
-								intron_b_start = j
-							else:
-								exon_a_end = j
-								exon_b_end = i
-								intron_a_start = j
-								intron_b_start = i
-
-							exon_a = chr + ":" + str(con) + "-" + str(exon_a_end)
-							exon_b = chr + ":" + str(con) + "-" + str(exon_b_end)
-							intron_a = chr + ":" + str(intron_a_start) + "-" + str(s)
-							intron_b = chr + ":" + str(intron_b_start) + "-" + str(s)
+							exon_a_end = max(i, j)
+							exon_b_end = min(i, j)
+							exon_a = f"{chr}:{con}-{exon_a_end}"
+							exon_b = f"{chr}:{con}-{exon_b_end}"
+							intron_a = f"{chr}:{exon_a_end}-{s}"
+							intron_b = f"{chr}:{exon_b_end}-{s}"
 							event_l += [[exon_a, exon_b, intron_a, intron_b, strand, gene, gene_name]]
 
 	return(event_l)
@@ -602,20 +473,16 @@ def afe(gtf_dic) -> list:
 
 	event_l = []
 	for gene in gtf_dic.keys():
-		if "intron_list" not in gtf_dic[gene]:
+		if len(gtf_dic[gene]["intron"]) == 0:
 			continue
 		chr = gtf_dic[gene]["chr"]
 		strand = gtf_dic[gene]["strand"]
 		gene_name = gtf_dic[gene]["gene_name"]
-		gene_start_values = gtf_dic[gene]["start"]
-		gene_end_values = gtf_dic[gene]["end"]
-		intron_list = gtf_dic[gene]["intron_list"]
-		intron_start_dict = gtf_dic[gene]["intron_start_dic"]
-		intron_end_dict = gtf_dic[gene]["intron_end_dic"]
-		intron_dic = gtf_dic[gene]["transcript_intron_dic"]
-		exon_dic = gtf_dic[gene]["transcript_exon_dic"]
-		# Sort exons by start position, ascending order
-		exon_dic = {k: sorted(list(v), key = lambda x: int(x.split(":")[1].split("-")[0])) for k, v in exon_dic.items()}
+		intron_set = set(gtf_dic[gene]["intron"].tolist())
+		gene_exon_start = gtf_dic[gene]["exon_start"].tolist()
+		gene_exon_end = gtf_dic[gene]["exon_end"].tolist()
+		# Exons of each transcript sorted by start position, ascending order
+		exon_dic = dict(enumerate(transcript_exons(gtf_dic[gene])))
 		# Transcript list sorted by exon number
 		transcript_list = sorted(exon_dic, key = lambda x: len(exon_dic[x]))
 		# Keep transcripts with at least two exons
@@ -624,21 +491,17 @@ def afe(gtf_dic) -> list:
 			continue
 		for transcript1, transcript2 in itertools.combinations(transcript_list, 2):
 			# Get first exons
-			first_exon_list = [exon_dic[transcript][0] if strand == "+" else exon_dic[transcript][-1] for transcript in [transcript1, transcript2]]
-			first_exon_transcript1 = first_exon_list[0]
-			first_exon_transcript1_start = first_exon_transcript1.split(":")[1].split("-")[0]
-			first_exon_transcript1_end = first_exon_transcript1.split(":")[1].split("-")[1]
-			first_exon_transcript2 = first_exon_list[1]
-			first_exon_transcript2_start = first_exon_transcript2.split(":")[1].split("-")[0]
-			first_exon_transcript2_end = first_exon_transcript2.split(":")[1].split("-")[1]
+			first_exon_transcript1, first_exon_transcript2 = [exon_dic[transcript][0] if strand == "+" else exon_dic[transcript][-1] for transcript in [transcript1, transcript2]]
+			first_exon_transcript1_start = gene_exon_start[first_exon_transcript1]
+			first_exon_transcript1_end = gene_exon_end[first_exon_transcript1]
+			first_exon_transcript2_start = gene_exon_start[first_exon_transcript2]
+			first_exon_transcript2_end = gene_exon_end[first_exon_transcript2]
 			# Get second exons
-			second_exon_list = [exon_dic[transcript][1] if strand == "+" else exon_dic[transcript][-2] for transcript in [transcript1, transcript2]]
-			second_exon_transcript1 = second_exon_list[0]
-			second_exon_transcript1_start = second_exon_transcript1.split(":")[1].split("-")[0]
-			second_exon_transcript1_end = second_exon_transcript1.split(":")[1].split("-")[1]
-			second_exon_transcript2 = second_exon_list[1]
-			second_exon_transcript2_start = second_exon_transcript2.split(":")[1].split("-")[0]
-			second_exon_transcript2_end = second_exon_transcript2.split(":")[1].split("-")[1]
+			second_exon_transcript1, second_exon_transcript2 = [exon_dic[transcript][1] if strand == "+" else exon_dic[transcript][-2] for transcript in [transcript1, transcript2]]
+			second_exon_transcript1_start = gene_exon_start[second_exon_transcript1]
+			second_exon_transcript1_end = gene_exon_end[second_exon_transcript1]
+			second_exon_transcript2_start = gene_exon_start[second_exon_transcript2]
+			second_exon_transcript2_end = gene_exon_end[second_exon_transcript2]
 			if strand == "+":
 				# [exc1](inc1), [exc2](inc2)
 				# [first_exon_distal_start, first_exon_distal_end](x1, y1), [first_exon_proximal_start, first_exon_proximal_end](x2, y2)
@@ -652,28 +515,24 @@ def afe(gtf_dic) -> list:
 					continue
 				# Set distal and proximal first exons
 				if (first_exon_transcript1_start < first_exon_transcript2_start) and (first_exon_transcript1_end < first_exon_transcript2_end):
-					first_exon_distal = first_exon_transcript1
 					first_exon_distal_start = first_exon_transcript1_start
 					first_exon_distal_end = first_exon_transcript1_end
-					first_exon_proximal = first_exon_transcript2
 					first_exon_proximal_start = first_exon_transcript2_start
 					first_exon_proximal_end = first_exon_transcript2_end
 				elif (first_exon_transcript1_start > first_exon_transcript2_start) and (first_exon_transcript1_end > first_exon_transcript2_end):
-					first_exon_distal = first_exon_transcript2
 					first_exon_distal_start = first_exon_transcript2_start
 					first_exon_distal_end = first_exon_transcript2_end
-					first_exon_proximal = first_exon_transcript1
 					first_exon_proximal_start = first_exon_transcript1_start
 					first_exon_proximal_end = first_exon_transcript1_end
 				else:
 					continue
 
 				second_exon_start = second_exon_transcript1_start
-				exon_a = chr + ":" + first_exon_distal_start + "-" + first_exon_distal_end
-				exon_b = chr + ":" + first_exon_proximal_start + "-" + first_exon_proximal_end
-				intron_a = chr + ":" + first_exon_distal_end + "-" + second_exon_start
-				intron_b = chr + ":" + first_exon_proximal_end + "-" + second_exon_start
-				intron_c = chr + ":" + first_exon_distal_end + "-" + first_exon_proximal_start # Intron connecting the distal and proximal first exons
+				exon_a = (first_exon_distal_start, first_exon_distal_end)
+				exon_b = (first_exon_proximal_start, first_exon_proximal_end)
+				intron_a = (first_exon_distal_end, second_exon_start)
+				intron_b = (first_exon_proximal_end, second_exon_start)
+				intron_c = (first_exon_distal_end, first_exon_proximal_start) # Intron connecting the distal and proximal first exons
 
 			else: # strand == "-"
 
@@ -689,33 +548,29 @@ def afe(gtf_dic) -> list:
 					continue
 				# Set distal and proximal first exons
 				if (first_exon_transcript1_start < first_exon_transcript2_start) and (first_exon_transcript1_end < first_exon_transcript2_end):
-					first_exon_distal = first_exon_transcript2
 					first_exon_distal_start = first_exon_transcript2_start
 					first_exon_distal_end = first_exon_transcript2_end
-					first_exon_proximal = first_exon_transcript1
 					first_exon_proximal_start = first_exon_transcript1_start
 					first_exon_proximal_end = first_exon_transcript1_end
 				elif (first_exon_transcript1_start > first_exon_transcript2_start) and (first_exon_transcript1_end > first_exon_transcript2_end):
-					first_exon_distal = first_exon_transcript1
 					first_exon_distal_start = first_exon_transcript1_start
 					first_exon_distal_end = first_exon_transcript1_end
-					first_exon_proximal = first_exon_transcript2
 					first_exon_proximal_start = first_exon_transcript2_start
 					first_exon_proximal_end = first_exon_transcript2_end
 				else:
 					continue
 
 				second_exon_end = second_exon_transcript1_end
-				exon_a = chr + ":" + first_exon_distal_start + "-" + first_exon_distal_end
-				exon_b = chr + ":" + first_exon_proximal_start + "-" + first_exon_proximal_end
-				intron_a = chr + ":" + second_exon_end + "-" + first_exon_distal_start
-				intron_b = chr + ":" + second_exon_end + "-" + first_exon_proximal_start
-				intron_c = chr + ":" + first_exon_proximal_end + "-" + first_exon_distal_start # Intron connecting the distal and proximal first exons
+				exon_a = (first_exon_distal_start, first_exon_distal_end)
+				exon_b = (first_exon_proximal_start, first_exon_proximal_end)
+				intron_a = (second_exon_end, first_exon_distal_start)
+				intron_b = (second_exon_end, first_exon_proximal_start)
+				intron_c = (first_exon_proximal_end, first_exon_distal_start) # Intron connecting the distal and proximal first exons
 
 			# Check if no intron connecting the distal exon and the proximal exon
-			if intron_c in intron_list:
+			if pack(*intron_c) in intron_set:
 				continue
-			event_l += [[exon_a, exon_b, intron_a, intron_b, strand, gene, gene_name]]
+			event_l += [[f"{chr}:{s}-{e}" for s, e in [exon_a, exon_b, intron_a, intron_b]] + [strand, gene, gene_name]]
 
 	return(event_l)
 
@@ -733,20 +588,16 @@ def ale(gtf_dic) -> list:
 
 	event_l = []
 	for gene in gtf_dic.keys():
-		if "intron_list" not in gtf_dic[gene]:
+		if len(gtf_dic[gene]["intron"]) == 0:
 			continue
 		chr = gtf_dic[gene]["chr"]
 		strand = gtf_dic[gene]["strand"]
 		gene_name = gtf_dic[gene]["gene_name"]
-		gene_start_values = gtf_dic[gene]["start"]
-		gene_end_values = gtf_dic[gene]["end"]
-		intron_list = gtf_dic[gene]["intron_list"]
-		intron_start_dict = gtf_dic[gene]["intron_start_dic"]
-		intron_end_dict = gtf_dic[gene]["intron_end_dic"]
-		intron_dic = gtf_dic[gene]["transcript_intron_dic"]
-		exon_dic = gtf_dic[gene]["transcript_exon_dic"]
-		# Sort exons by start position, ascending order
-		exon_dic = {k: sorted(list(v), key = lambda x: int(x.split(":")[1].split("-")[0])) for k, v in exon_dic.items()}
+		intron_set = set(gtf_dic[gene]["intron"].tolist())
+		gene_exon_start = gtf_dic[gene]["exon_start"].tolist()
+		gene_exon_end = gtf_dic[gene]["exon_end"].tolist()
+		# Exons of each transcript sorted by start position, ascending order
+		exon_dic = dict(enumerate(transcript_exons(gtf_dic[gene])))
 		# Transcript list sorted by exon number
 		transcript_list = sorted(exon_dic, key = lambda x: len(exon_dic[x]))
 		# Keep transcripts with at least two exons
@@ -755,21 +606,17 @@ def ale(gtf_dic) -> list:
 			continue
 		for transcript1, transcript2 in itertools.combinations(transcript_list, 2):
 			# Get last exons
-			last_exon_list = [exon_dic[transcript][-1] if strand == "+" else exon_dic[transcript][0] for transcript in [transcript1, transcript2]]
-			last_exon_transcript1 = last_exon_list[0]
-			last_exon_transcript1_start = last_exon_transcript1.split(":")[1].split("-")[0]
-			last_exon_transcript1_end = last_exon_transcript1.split(":")[1].split("-")[1]
-			last_exon_transcript2 = last_exon_list[1]
-			last_exon_transcript2_start = last_exon_transcript2.split(":")[1].split("-")[0]
-			last_exon_transcript2_end = last_exon_transcript2.split(":")[1].split("-")[1]
+			last_exon_transcript1, last_exon_transcript2 = [exon_dic[transcript][-1] if strand == "+" else exon_dic[transcript][0] for transcript in [transcript1, transcript2]]
+			last_exon_transcript1_start = gene_exon_start[last_exon_transcript1]
+			last_exon_transcript1_end = gene_exon_end[last_exon_transcript1]
+			last_exon_transcript2_start = gene_exon_start[last_exon_transcript2]
+			last_exon_transcript2_end = gene_exon_end[last_exon_transcript2]
 			# Get penultimate exons
-			penultimate_exon_list = [exon_dic[transcript][-2] if strand == "+" else exon_dic[transcript][1] for transcript in [transcript1, transcript2]]
-			penultimate_exon_transcript1 = penultimate_exon_list[0]
-			penultimate_exon_transcript1_start = penultimate_exon_transcript1.split(":")[1].split("-")[0]
-			penultimate_exon_transcript1_end = penultimate_exon_transcript1.split(":")[1].split("-")[1]
-			penultimate_exon_transcript2 = penultimate_exon_list[1]
-			penultimate_exon_transcript2_start = penultimate_exon_transcript2.split(":")[1].split("-")[0]
-			penultimate_exon_transcript2_end = penultimate_exon_transcript2.split(":")[1].split("-")[1]
+			penultimate_exon_transcript1, penultimate_exon_transcript2 = [exon_dic[transcript][-2] if strand == "+" else exon_dic[transcript][1] for transcript in [transcript1, transcript2]]
+			penultimate_exon_transcript1_start = gene_exon_start[penultimate_exon_transcript1]
+			penultimate_exon_transcript1_end = gene_exon_end[penultimate_exon_transcript1]
+			penultimate_exon_transcript2_start = gene_exon_start[penultimate_exon_transcript2]
+			penultimate_exon_transcript2_end = gene_exon_end[penultimate_exon_transcript2]
 			if strand == "+":
 				# (inc1)[exc1], (inc2)[exc2]
 				# (x1, y1)[last_exon_proximal_start, last_exon_proximal_end], (x2, y2)[last_exon_distal_start, last_exon_distal_end]
@@ -783,28 +630,24 @@ def ale(gtf_dic) -> list:
 					continue
 				# Set proximal and distal last exons
 				if (last_exon_transcript1_start < last_exon_transcript2_start) and (last_exon_transcript1_end < last_exon_transcript2_end):
-					last_exon_proximal = last_exon_transcript1
 					last_exon_proximal_start = last_exon_transcript1_start
 					last_exon_proximal_end = last_exon_transcript1_end
-					last_exon_distal = last_exon_transcript2
 					last_exon_distal_start = last_exon_transcript2_start
 					last_exon_distal_end = last_exon_transcript2_end
 				elif (last_exon_transcript1_start > last_exon_transcript2_start) and (last_exon_transcript1_end > last_exon_transcript2_end):
-					last_exon_proximal = last_exon_transcript2
 					last_exon_proximal_start = last_exon_transcript2_start
 					last_exon_proximal_end = last_exon_transcript2_end
-					last_exon_distal = last_exon_transcript1
 					last_exon_distal_start = last_exon_transcript1_start
 					last_exon_distal_end = last_exon_transcript1_end
 				else:
 					continue
 
 				penultimate_exon_end = penultimate_exon_transcript1_end
-				exon_a = chr + ":" + last_exon_distal_start + "-" + last_exon_distal_end
-				exon_b = chr + ":" + last_exon_proximal_start + "-" + last_exon_proximal_end
-				intron_a = chr + ":" + penultimate_exon_end + "-" + last_exon_distal_start
-				intron_b = chr + ":" + penultimate_exon_end + "-" + last_exon_proximal_start
-				intron_c = chr + ":" + last_exon_proximal_end + "-" + last_exon_distal_start # Intron connecting the distal and proximal last exons
+				exon_a = (last_exon_distal_start, last_exon_distal_end)
+				exon_b = (last_exon_proximal_start, last_exon_proximal_end)
+				intron_a = (penultimate_exon_end, last_exon_distal_start)
+				intron_b = (penultimate_exon_end, last_exon_proximal_start)
+				intron_c = (last_exon_proximal_end, last_exon_distal_start) # Intron connecting the distal and proximal last exons
 
 			else: # strand == "-"
 
@@ -820,32 +663,28 @@ def ale(gtf_dic) -> list:
 					continue
 				# Set distal and proximal last exons
 				if (last_exon_transcript1_start < last_exon_transcript2_start) and (last_exon_transcript1_end < last_exon_transcript2_end):
-					last_exon_distal = last_exon_transcript1
 					last_exon_distal_start = last_exon_transcript1_start
 					last_exon_distal_end = last_exon_transcript1_end
-					last_exon_proximal = last_exon_transcript2
 					last_exon_proximal_start = last_exon_transcript2_start
 					last_exon_proximal_end = last_exon_transcript2_end
 				elif (last_exon_transcript1_start > last_exon_transcript2_start) and (last_exon_transcript1_end > last_exon_transcript2_end):
-					last_exon_distal = last_exon_transcript2
 					last_exon_distal_start = last_exon_transcript2_start
 					last_exon_distal_end = last_exon_transcript2_end
-					last_exon_proximal = last_exon_transcript1
 					last_exon_proximal_start = last_exon_transcript1_start
 					last_exon_proximal_end = last_exon_transcript1_end
 				else:
 					continue
 				penultimate_exon_start = penultimate_exon_transcript1_start
-				exon_a = chr + ":" + last_exon_distal_start + "-" + last_exon_distal_end
-				exon_b = chr + ":" + last_exon_proximal_start + "-" + last_exon_proximal_end
-				intron_a = chr + ":" + last_exon_distal_end + "-" + penultimate_exon_start
-				intron_b = chr + ":" + last_exon_proximal_end + "-" + penultimate_exon_start
-				intron_c = chr + ":" + last_exon_distal_end + "-" + last_exon_proximal_start # Intron connecting the distal and proximal last exons
+				exon_a = (last_exon_distal_start, last_exon_distal_end)
+				exon_b = (last_exon_proximal_start, last_exon_proximal_end)
+				intron_a = (last_exon_distal_end, penultimate_exon_start)
+				intron_b = (last_exon_proximal_end, penultimate_exon_start)
+				intron_c = (last_exon_distal_end, last_exon_proximal_start) # Intron connecting the distal and proximal last exons
 
 			# Check if no intron connecting the distal exon and the proximal exon
-			if intron_c in intron_list:
+			if pack(*intron_c) in intron_set:
 				continue
-			event_l += [[exon_a, exon_b, intron_a, intron_b, strand, gene, gene_name]]
+			event_l += [[f"{chr}:{s}-{e}" for s, e in [exon_a, exon_b, intron_a, intron_b]] + [strand, gene, gene_name]]
 
 	return(event_l)
 
@@ -853,6 +692,9 @@ def mxe(gtf_dic) -> list:
 	"""
 	Make mutually exclusive exons list.
 
+	Candidate exon pairs are taken from pairs of introns sharing a start, and transcripts are looked up
+	in bitsets of the transcripts containing each intron and each exon.
+
 	Args:
 		gtf_dic: A dictionary containing information about the GTF file.
 
@@ -864,58 +706,71 @@ def mxe(gtf_dic) -> list:
 
 	event_l = []
 	for gene in gtf_dic.keys():
-		if "intron_list" not in gtf_dic[gene]:
+		if len(gtf_dic[gene]["intron"]) == 0:
 			continue
 		chr = gtf_dic[gene]["chr"]
 		strand = gtf_dic[gene]["strand"]
 		gene_name = gtf_dic[gene]["gene_name"]
-		gene_start_values = gtf_dic[gene]["start"]
-		gene_end_values = gtf_dic[gene]["end"]
-		intron_list = gtf_dic[gene]["intron_list"]
-		intron_start_dic = gtf_dic[gene]["intron_start_dic"]
-		intron_end_dic = gtf_dic[gene]["intron_end_dic"]
-		intron_dic = gtf_dic[gene]["transcript_intron_dic"]
-		exon_dic = gtf_dic[gene]["transcript_exon_dic"]
-		exon_list = gtf_dic[gene]["exon_list"]
-		exon_list_unique = np.unique([[i.split(":")[1].split("-")[0], i.split(":")[1].split("-")[1]] for i in exon_list], axis = 0)
-		exon_start = np.array([i[0] for i in exon_list_unique]).astype("int32")
-		exon_end = np.array([i[1] for i in exon_list_unique]).astype("int32")
-		idx1_idx2_iter = itertools.combinations(range(len(exon_start)), 2)
-		for idx1, idx2 in idx1_idx2_iter:
-			retained_intron = chr + ":" + str(exon_start[idx1]) + "-" + str(exon_end[idx2])
+		intron_set, intron_start_dic, intron_end_dic = gene_introns(gtf_dic[gene])
+		exon_start = gtf_dic[gene]["exon_start"].tolist()
+		exon_end = gtf_dic[gene]["exon_end"].tolist()
+		exon_set = set(pack(gtf_dic[gene]["exon_start"].astype("int64"), gtf_dic[gene]["exon_end"].astype("int64")).tolist())
+		# Bitsets of transcripts containing each exon and each intron
+		exon_transcript = [0] * len(exon_start)
+		intron_transcript = defaultdict(int)
+		for transcript_index, exon_idx in enumerate(transcript_exons(gtf_dic[gene])):
+			bit = 1 << transcript_index
+			for i in range(len(exon_idx)):
+				exon_transcript[exon_idx[i]] |= bit
+				if i > 0:
+					intron_transcript[pack(exon_end[exon_idx[i - 1]], exon_start[exon_idx[i]])] |= bit
+		# Exons starting at each position
+		exon_start_dic = defaultdict(list)
+		for idx in range(len(exon_start)):
+			exon_start_dic[exon_start[idx]].append(idx)
+
+		# Both exons follow an intron from the same start (intron_a1_start == intron_b1_start)
+		exon_pair_set = set()
+		for intron_end_list in intron_start_dic.values():
+			idx_list = sorted(idx for intron_end in set(intron_end_list) for idx in exon_start_dic.get(intron_end, []))
+			exon_pair_set.update(itertools.combinations(idx_list, 2))
+
+		for idx1, idx2 in sorted(exon_pair_set):
+			retained_intron = pack(exon_start[idx1], exon_end[idx2])
 			# exon_a is upstream of exon_b
 			# Not retained intron
-			if (exon_end[idx1] < exon_start[idx2]) and (retained_intron not in exon_list) and (str(exon_start[idx1]) in intron_end_dic) and (str(exon_end[idx1]) in intron_start_dic) and (str(exon_start[idx2]) in intron_end_dic) and (str(exon_end[idx2]) in intron_start_dic):
-				intron_a1_start_list = intron_end_dic[str(exon_start[idx1])]
-				intron_a1_end = exon_start[idx1]
-				intron_a2_start = exon_end[idx1]
-				intron_a2_end_list = intron_start_dic[str(exon_end[idx1])]
-				intron_b1_start_list = intron_end_dic[str(exon_start[idx2])]
-				intron_b1_end = exon_start[idx2]
-				intron_b2_start = exon_end[idx2]
-				intron_b2_end_list = intron_start_dic[str(exon_end[idx2])]
-				intron_iter = itertools.product(intron_a1_start_list, intron_a2_end_list, intron_b1_start_list, intron_b2_end_list)
-				for intron_a1_start, intron_a2_end, intron_b1_start, intron_b2_end in intron_iter:
-					exon_a = chr + ":" + str(exon_start[idx1]) + "-" + str(exon_end[idx1])
-					exon_b = chr + ":" + str(exon_start[idx2]) + "-" + str(exon_end[idx2])
-					intron_a1 = chr + ":" + str(intron_a1_start) + "-" + str(intron_a1_end)
-					intron_a2 = chr + ":" + str(intron_a2_start) + "-" + str(intron_a2_end)
-					intron_b1 = chr + ":" + str(intron_b1_start) + "-" + str(intron_b1_end)
-					intron_b2 = chr + ":" + str(intron_b2_start) + "-" + str(intron_b2_end)
-					intron_c = chr + ":" + str(intron_a2_start) + "-" + str(intron_b1_end)
-					intron_d = chr + ":" + str(intron_a1_start) + "-" + str(intron_b2_end)
-					if (int(intron_a1_start) == int(intron_b1_start)) and (int(intron_a1_end) != int(intron_b1_end)) and (int(intron_a2_start) != int(intron_b2_start)) and (int(intron_a2_end) == int(intron_b2_end)) and (intron_c not in intron_list) and (intron_d not in intron_list):
-						key1_key2_iter = itertools.permutations(intron_dic.keys(), 2)
-						for key1, key2 in key1_key2_iter:
-							if (intron_a1 in intron_dic[key1]) and (intron_a2 in intron_dic[key1]) and (intron_b1 in intron_dic[key2]) and (intron_b2 in intron_dic[key2]):
-								# exons not present in the same transcript
-								flag = False
-								for key3 in exon_dic.keys():
-									if (exon_a in exon_dic[key3]) and (exon_b in exon_dic[key3]):
-										flag = True
-										break
-								if flag == False:
-									event_l += [[exon_a, exon_b, intron_a1, intron_a2, intron_b1, intron_b2, strand, gene, gene_name]]
+			if (exon_end[idx1] >= exon_start[idx2]) or (retained_intron in exon_set) or (exon_end[idx1] not in intron_start_dic) or (exon_end[idx2] not in intron_start_dic):
+				continue
+			# exons not present in the same transcript
+			if exon_transcript[idx1] & exon_transcript[idx2]:
+				continue
+			intron_a1_end = exon_start[idx1]
+			intron_a2_start = exon_end[idx1]
+			intron_b1_end = exon_start[idx2]
+			intron_b2_start = exon_end[idx2]
+			if (intron_a1_end == intron_b1_end) or (intron_a2_start == intron_b2_start):
+				continue
+			intron_c = pack(intron_a2_start, intron_b1_end)
+			if intron_c in intron_set:
+				continue
+			intron_1_start_list = sorted(set(intron_end_dic[intron_a1_end]) & set(intron_end_dic[intron_b1_end]))
+			intron_2_end_list = sorted(set(intron_start_dic[intron_a2_start]) & set(intron_start_dic[intron_b2_start]))
+			for intron_1_start, intron_2_end in itertools.product(intron_1_start_list, intron_2_end_list):
+				intron_a1 = pack(intron_1_start, intron_a1_end)
+				intron_a2 = pack(intron_a2_start, intron_2_end)
+				intron_b1 = pack(intron_1_start, intron_b1_end)
+				intron_b2 = pack(intron_b2_start, intron_2_end)
+				intron_d = pack(intron_1_start, intron_2_end)
+				if intron_d in intron_set:
+					continue
+				# Two different transcripts, one containing intron_a1 and intron_a2 and the other containing intron_b1 and intron_b2
+				transcript_a = intron_transcript[intron_a1] & intron_transcript[intron_a2]
+				transcript_b = intron_transcript[intron_b1] & intron_transcript[intron_b2]
+				if (transcript_a == 0) or (transcript_b == 0) or ((transcript_a == transcript_b) and (transcript_a & (transcript_a - 1) == 0)):
+					continue
+				exon_a = f"{chr}:{exon_start[idx1]}-{exon_end[idx1]}"
+				exon_b = f"{chr}:{exon_start[idx2]}-{exon_end[idx2]}"
+				event_l += [[exon_a, exon_b] + [f"{chr}:{s}-{e}" for s, e in map(unpack, [intron_a1, intron_a2, intron_b1, intron_b2])] + [strand, gene, gene_name]]
 
 	return(event_l)
 
@@ -923,6 +778,9 @@ def ri(gtf_dic) -> list:
 	"""
 	Make retained introns list.
 
+	Candidates are taken from each intron of a gene, with the exons ending at its start
+	and the exons starting at its end looked up by position.
+
 	Args:
 		gtf_dic: A dictionary containing information about the GTF file.
 
@@ -934,43 +792,119 @@ def ri(gtf_dic) -> list:
 
 	event_l = []
 	for gene in gtf_dic.keys():
-		if "intron_list" not in gtf_dic[gene]:
+		if len(gtf_dic[gene]["intron"]) == 0:
 			continue
 		chr = gtf_dic[gene]["chr"]
 		strand = gtf_dic[gene]["strand"]
 		gene_name = gtf_dic[gene]["gene_name"]
-		intron_list = gtf_dic[gene]["intron_list"]
-		exon_dic = gtf_dic[gene]["transcript_exon_dic"]
-		exon_list = gtf_dic[gene]["exon_list"]
-		exon_list_unique = np.unique([[i.split(":")[1].split("-")[0], i.split(":")[1].split("-")[1]] for i in exon_list], axis = 0)
-		exon_start = np.array([i[0] for i in exon_list_unique]).astype("int32")
-		exon_end = np.array([i[1] for i in exon_list_unique]).astype("int32")
-		idx1_idx2_iter = itertools.combinations(range(len(exon_start)), 2)
-		for idx1, idx2 in idx1_idx2_iter:
-			# Retained intron
-			retained_intron = chr + ":" + str(exon_end[idx1]) + "-" + str(exon_start[idx2])
-			retained_exon = chr + ":" + str(exon_start[idx1]) + "-" + str(exon_end[idx2])
-			exon_a = chr + ":" + str(exon_start[idx1]) + "-" + str(exon_end[idx1])
-			exon_b = chr + ":" + str(exon_start[idx2]) + "-" + str(exon_end[idx2])
-			exon_c = retained_exon
-			intron_a = chr + ":" + str(exon_end[idx1]) + "-" + str(exon_start[idx2])
-			# exon_a is upstream of exon_b
-			if (exon_end[idx1] < exon_start[idx2]) and (retained_intron in intron_list) and (retained_exon in exon_list):
-				# exons present in the same transcript
-				for exon_key in exon_dic.keys():
-					if (exon_a in exon_dic[exon_key]) and (exon_b in exon_dic[exon_key]):
+		exon_start = gtf_dic[gene]["exon_start"].tolist()
+		exon_end = gtf_dic[gene]["exon_end"].tolist()
+		exon_set = set(pack(gtf_dic[gene]["exon_start"].astype("int64"), gtf_dic[gene]["exon_end"].astype("int64")).tolist())
+		# Exons ending and starting at each position
+		exon_end_dic = defaultdict(list)
+		exon_start_dic = defaultdict(list)
+		for idx in range(len(exon_start)):
+			exon_end_dic[exon_end[idx]].append(idx)
+			exon_start_dic[exon_start[idx]].append(idx)
+		# Bitsets of transcripts containing each exon
+		exon_transcript = [0] * len(exon_start)
+		for transcript_index, exon_idx in enumerate(transcript_exons(gtf_dic[gene])):
+			for idx in exon_idx:
+				exon_transcript[idx] |= 1 << transcript_index
+
+		for retained_intron in gtf_dic[gene]["intron"].tolist():
+			intron_start, intron_end = unpack(retained_intron)
+			if intron_start >= intron_end:
+				continue
+			# exon_a ends at the start of the retained intron and exon_b starts at its end
+			for idx1 in exon_end_dic.get(intron_start, []):
+				for idx2 in exon_start_dic.get(intron_end, []):
+					retained_exon = pack(exon_start[idx1], exon_end[idx2])
+					# exons present in the same transcript
+					if (retained_exon in exon_set) and (exon_transcript[idx1] & exon_transcript[idx2]):
+						exon_a = f"{chr}:{exon_start[idx1]}-{exon_end[idx1]}"
+						exon_b = f"{chr}:{exon_start[idx2]}-{exon_end[idx2]}"
+						exon_c = f"{chr}:{exon_start[idx1]}-{exon_end[idx2]}"
+						intron_a = f"{chr}:{intron_start}-{intron_end}"
 						event_l += [[exon_a, exon_b, exon_c, intron_a, strand, gene, gene_name]]
-						break
 
 	return(event_l)
 
-def complex_events(gtf_dic) -> list:
+def transcript_structures(gene_dic, max_transcripts = None, gene = None) -> list:
+	"""
+	Makes the exon structures of the transcripts of a gene, dropping transcripts with the same exons as an earlier one.
+
+	Args:
+		gene_dic (dict): The model of a gene made by gtf().
+		max_transcripts (int): Maximum number of structures to keep. Structures after the first max_transcripts
+			in the order of transcript IDs are dropped with a warning, so that genes with extreme numbers of
+			transcripts do not stall pairwise searches. No limit if None.
+		gene (str): Gene ID named in the warning.
+
+	Returns:
+		list: List of [transcript ID, exon keys sorted by position, set of exon keys, exon starts, exon ends,
+		(position, transcript ID) of the transcripts with these exons in the order of transcript IDs].
+	"""
+
+	exon_key = pack(gene_dic["exon_start"].astype("int64"), gene_dic["exon_end"].astype("int64")).tolist()
+	exon_start = gene_dic["exon_start"].tolist()
+	exon_end = gene_dic["exon_end"].tolist()
+	structure_l = []
+	structure_dic = {}
+	for position, (transcript, exon_idx) in enumerate(gene_transcripts(gene_dic).items()):
+		structure = tuple(exon_idx)
+		if structure in structure_dic:
+			if structure_dic[structure] is not None:
+				structure_dic[structure][5].append((position, transcript))
+			continue
+		if (max_transcripts is not None) and (len(structure_l) >= max_transcripts):
+			structure_dic[structure] = None
+			continue
+		exon_l = [exon_key[i] for i in exon_idx]
+		structure_dic[structure] = [transcript, exon_l, set(exon_l), [exon_start[i] for i in exon_idx], [exon_end[i] for i in exon_idx], [(position, transcript)]]
+		structure_l.append(structure_dic[structure])
+	if len(structure_dic) > len(structure_l):
+		logger.warning(f"Gene {gene}: {len(structure_dic) - len(structure_l)} of {len(structure_dic)} transcript structures dropped from complex event search (--max-complex-transcripts {max_transcripts}), events of these structures are not reported")
+	return(structure_l)
+
+def complex_forms(structure_1, structure_2, unique_1, unique_2) -> list:
+	"""
+	Makes the included and excluded forms of a complex event between two transcript structures.
+
+	The form with more unique exons is included. With as many unique exons in both forms, the form of the later
+	transcript of a pair is included, and both forms are made if a transcript of each structure comes before a
+	transcript of the other one, as when every pair of transcripts was compared.
+
+	Args:
+		structure_1 (list): A structure made by transcript_structures().
+		structure_2 (list): A later structure made by transcript_structures().
+		unique_1 (list): Exons of structure_1 in the event.
+		unique_2 (list): Exons of structure_2 in the event.
+
+	Returns:
+		list: List of [included exons, excluded exons, included transcript, excluded transcript].
+	"""
+
+	if len(unique_1) > len(unique_2):
+		return([[unique_1, unique_2, structure_1[0], structure_2[0]]])
+	if len(unique_1) < len(unique_2):
+		return([[unique_2, unique_1, structure_2[0], structure_1[0]]])
+	form_l = []
+	for earlier, earlier_unique, later, later_unique in [(structure_1, unique_1, structure_2, unique_2), (structure_2, unique_2, structure_1, unique_1)]:
+		first_position, first_transcript = earlier[5][0]
+		later_transcript = next((transcript for position, transcript in later[5] if position > first_position), None)
+		if later_transcript is not None:
+			form_l.append([later_unique, earlier_unique, later_transcript, first_transcript])
+	return(form_l)
+
+def complex_events(gtf_dic, max_transcripts = None) -> list:
     """
     检测复杂的内部外显子事件(CO)。
     这些是不适合其他类别的复杂事件，涉及内部外显子（不在转录本末端）。
 
     Args:
         gtf_dic: 包含GTF文件信息的字典。
+        max_transcripts: 每个基因比较的转录本结构的最大数量，None 表示不限制。
 
     Returns:
         list: 复杂事件列表，每个事件包含以下信息：
@@ -978,104 +912,89 @@ def complex_events(gtf_dic) -> list:
     """
     event_l = []
     for gene in gtf_dic.keys():
-        if "intron_list" not in gtf_dic[gene]:
+        if len(gtf_dic[gene]["intron"]) == 0:
             continue
         
+        chr = gtf_dic[gene]["chr"]
         strand = gtf_dic[gene]["strand"]
         gene_name = gtf_dic[gene]["gene_name"]
-        exon_dic = gtf_dic[gene]["transcript_exon_dic"]
+        # 每个基因只计算一次转录本结构，结构相同的转录本只保留一个
+        structure_l = transcript_structures(gtf_dic[gene], max_transcripts, gene)
         
         # 比较所有转录本对
-        transcript_list = list(exon_dic.keys())
-        for i in range(len(transcript_list)):
-            for j in range(i+1, len(transcript_list)):
-                tx1 = transcript_list[i]
-                tx2 = transcript_list[j]
-                
-                # 获取每个转录本的外显子
-                tx1_exons = sorted(list(exon_dic[tx1]), key=lambda x: int(x.split(":")[1].split("-")[0]))
-                tx2_exons = sorted(list(exon_dic[tx2]), key=lambda x: int(x.split(":")[1].split("-")[0]))
+        for i in range(len(structure_l)):
+            tx1, tx1_exons, tx1_set, tx1_exon_start, tx1_exon_end = structure_l[i][:5]
+            for j in range(i+1, len(structure_l)):
+                tx2, tx2_exons, tx2_set, tx2_exon_start, tx2_exon_end = structure_l[j][:5]
                 
                 # 跳过没有共享外显子的转录本
-                shared_exons = set(tx1_exons) & set(tx2_exons)
-                if not shared_exons:
+                if tx1_set.isdisjoint(tx2_set):
                     continue
                 
-                # 找出转录本之间的差异区域
-                tx1_unique = list(set(tx1_exons) - set(tx2_exons))
-                tx2_unique = list(set(tx2_exons) - set(tx1_exons))
+                # 找出转录本之间的差异区域（外显子已按位置排序）
+                tx1_unique_idx = [k for k in range(len(tx1_exons)) if tx1_exons[k] not in tx2_set]
+                tx2_unique_idx = [k for k in range(len(tx2_exons)) if tx2_exons[k] not in tx1_set]
                 
                 # 跳过没有差异的情况
-                if not tx1_unique or not tx2_unique:
+                if not tx1_unique_idx or not tx2_unique_idx:
                     continue
                 
-                # 按位置排序
-                tx1_unique = sorted(tx1_unique, key=lambda x: int(x.split(":")[1].split("-")[0]))
-                tx2_unique = sorted(tx2_unique, key=lambda x: int(x.split(":")[1].split("-")[0]))
-                
                 # 检查是否有两侧的共享外显子
-                tx1_start = min([int(x.split(":")[1].split("-")[0]) for x in tx1_unique])
-                tx1_end = max([int(x.split(":")[1].split("-")[1]) for x in tx1_unique])
-                tx2_start = min([int(x.split(":")[1].split("-")[0]) for x in tx2_unique])
-                tx2_end = max([int(x.split(":")[1].split("-")[1]) for x in tx2_unique])
+                tx1_start = tx1_exon_start[tx1_unique_idx[0]]
+                tx1_end = max([tx1_exon_end[k] for k in tx1_unique_idx])
+                tx2_start = tx2_exon_start[tx2_unique_idx[0]]
+                tx2_end = max([tx2_exon_end[k] for k in tx2_unique_idx])
                 
                 # 找到差异区域前后的共享外显子
-                pre_common = []
-                post_common = []
-                
                 min_pos = min(tx1_start, tx2_start)
                 max_pos = max(tx1_end, tx2_end)
                 
-                for exon in shared_exons:
-                    exon_end = int(exon.split(":")[1].split("-")[1])
-                    exon_start = int(exon.split(":")[1].split("-")[0])
-                    
-                    if exon_end < min_pos:
-                        pre_common.append(exon)
-                    elif exon_start > max_pos:
-                        post_common.append(exon)
+                pre_exon = None
+                post_exon = None
+                for k in range(len(tx1_exons)):
+                    if tx1_exons[k] not in tx2_set:
+                        continue
+                    # 结束位置最大的前侧共享外显子
+                    if tx1_exon_end[k] < min_pos:
+                        if (pre_exon is None) or (tx1_exon_end[k] > unpack(pre_exon)[1]):
+                            pre_exon = tx1_exons[k]
+                    # 起始位置最小的后侧共享外显子
+                    elif tx1_exon_start[k] > max_pos:
+                        if (post_exon is None) or (tx1_exon_start[k] < unpack(post_exon)[0]):
+                            post_exon = tx1_exons[k]
                 
                 # 如果两侧都有共享外显子，认为是CO事件
-                if pre_common and post_common:
-                    # 根据外显子数量确定包含和排除形式
-                    if len(tx1_unique) > len(tx2_unique):
-                        included_exons = tx1_unique
-                        excluded_exons = tx2_unique
-                        included_transcript = tx1
-                        excluded_transcript = tx2
-                    else:
-                        included_exons = tx2_unique
-                        excluded_exons = tx1_unique
-                        included_transcript = tx2
-                        excluded_transcript = tx1
+                if (pre_exon is not None) and (post_exon is not None):
+                    tx1_unique = [tx1_exons[k] for k in tx1_unique_idx]
+                    tx2_unique = [tx2_exons[k] for k in tx2_unique_idx]
+                    # 根据外显子数量确定包含和排除形式，数量相同时与比较所有转录本对时相同
+                    for included_exons, excluded_exons, included_transcript, excluded_transcript in complex_forms(structure_l[i], structure_l[j], tx1_unique, tx2_unique):
+                        # 创建事件条目
+                        exonlist_included = ";".join([exon_string(chr, x) for x in included_exons])
+                        exonlist_excluded = ";".join([exon_string(chr, x) for x in excluded_exons])
                         
-                    # 创建事件条目
-                    exonlist_included = ";".join(included_exons)
-                    exonlist_excluded = ";".join(excluded_exons)
-                    pre_exon = max(pre_common, key=lambda x: int(x.split(":")[1].split("-")[1]))
-                    post_exon = min(post_common, key=lambda x: int(x.split(":")[1].split("-")[0]))
-                    
-                    event_l.append([
-                        exonlist_included,
-                        exonlist_excluded,
-                        pre_exon,
-                        post_exon,
-                        strand,
-                        gene,
-                        gene_name,
-                        included_transcript,
-                        excluded_transcript
-                    ])
+                        event_l.append([
+                            exonlist_included,
+                            exonlist_excluded,
+                            exon_string(chr, pre_exon),
+                            exon_string(chr, post_exon),
+                            strand,
+                            gene,
+                            gene_name,
+                            included_transcript,
+                            excluded_transcript
+                        ])
     
     return event_l
 
-def complex_first_events(gtf_dic) -> list:
+def complex_first_events(gtf_dic, max_transcripts = None) -> list:
     """
     检测复杂的第一外显子事件(CF)。
     这些是涉及转录起始位点的复杂事件。
 
     Args:
         gtf_dic: 包含GTF文件信息的字典。
+        max_transcripts: 每个基因比较的转录本结构的最大数量，None 表示不限制。
 
     Returns:
         list: 复杂第一外显子事件列表，每个事件包含以下信息：
@@ -1083,66 +1002,42 @@ def complex_first_events(gtf_dic) -> list:
     """
     event_l = []
     for gene in gtf_dic.keys():
-        if "intron_list" not in gtf_dic[gene]:
+        if len(gtf_dic[gene]["intron"]) == 0:
             continue
         
+        chr = gtf_dic[gene]["chr"]
         strand = gtf_dic[gene]["strand"]
         gene_name = gtf_dic[gene]["gene_name"]
-        exon_dic = gtf_dic[gene]["transcript_exon_dic"]
+        # 每个基因只计算一次转录本结构，并根据链的方向排序外显子
+        structure_l = transcript_structures(gtf_dic[gene], max_transcripts, gene)
+        if strand == "-":
+            for structure in structure_l:
+                structure[1] = structure[1][::-1]
         
         # 比较所有转录本对
-        transcript_list = list(exon_dic.keys())
-        for i in range(len(transcript_list)):
-            for j in range(i+1, len(transcript_list)):
-                tx1 = transcript_list[i]
-                tx2 = transcript_list[j]
-                
-                # 根据链的方向获取排序的外显子
-                if strand == "+":
-                    tx1_exons = sorted(list(exon_dic[tx1]), key=lambda x: int(x.split(":")[1].split("-")[0]))
-                    tx2_exons = sorted(list(exon_dic[tx2]), key=lambda x: int(x.split(":")[1].split("-")[0]))
-                else:  # strand == "-"
-                    tx1_exons = sorted(list(exon_dic[tx1]), key=lambda x: int(x.split(":")[1].split("-")[0]), reverse=True)
-                    tx2_exons = sorted(list(exon_dic[tx2]), key=lambda x: int(x.split(":")[1].split("-")[0]), reverse=True)
-                
-                # 获取第一个外显子
-                tx1_first = tx1_exons[0] if tx1_exons else None
-                tx2_first = tx2_exons[0] if tx2_exons else None
-                
-                # 跳过没有外显子的转录本
-                if not tx1_first or not tx2_first:
-                    continue
+        for i in range(len(structure_l)):
+            tx1, tx1_exons, tx1_set = structure_l[i][:3]
+            for j in range(i+1, len(structure_l)):
+                tx2, tx2_exons, tx2_set = structure_l[j][:3]
                 
                 # 跳过第一个外显子相同的情况
-                if tx1_first == tx2_first:
+                if tx1_exons[0] == tx2_exons[0]:
                     continue
                 
                 # 找到共享外显子
-                shared_exons = set(tx1_exons) & set(tx2_exons)
-                if not shared_exons:
+                if tx1_set.isdisjoint(tx2_set):
                     continue
                 
-                # 找到第一个共享外显子
-                if strand == "+":
-                    shared_sorted = sorted(list(shared_exons), key=lambda x: int(x.split(":")[1].split("-")[0]))
-                else:  # strand == "-"
-                    shared_sorted = sorted(list(shared_exons), key=lambda x: int(x.split(":")[1].split("-")[0]), reverse=True)
-                
-                post_common = shared_sorted[0] if shared_sorted else None
-                if not post_common:
-                    continue
-                
-                # 获取第一个共享外显子之前的唯一外显子
+                # 第一个共享外显子之前的唯一外显子
                 tx1_unique = []
-                tx2_unique = []
-                
                 for exon in tx1_exons:
-                    if exon in shared_exons:
+                    if exon in tx2_set:
                         break
                     tx1_unique.append(exon)
                 
+                tx2_unique = []
                 for exon in tx2_exons:
-                    if exon in shared_exons:
+                    if exon in tx1_set:
                         break
                     tx2_unique.append(exon)
                 
@@ -1150,42 +1045,36 @@ def complex_first_events(gtf_dic) -> list:
                 if not tx1_unique or not tx2_unique:
                     continue
                 
-                # 根据外显子数量确定包含和排除形式
-                if len(tx1_unique) > len(tx2_unique):
-                    included_exons = tx1_unique
-                    excluded_exons = tx2_unique
-                    included_transcript = tx1
-                    excluded_transcript = tx2
-                else:
-                    included_exons = tx2_unique
-                    excluded_exons = tx1_unique
-                    included_transcript = tx2
-                    excluded_transcript = tx1
-                    
-                # 创建事件条目
-                exonlist_included = ";".join(included_exons)
-                exonlist_excluded = ";".join(excluded_exons)
+                # 第一个共享外显子（按链的方向）
+                post_common = tx1_exons[len(tx1_unique)]
                 
-                event_l.append([
-                    exonlist_included,
-                    exonlist_excluded,
-                    post_common,
-                    strand,
-                    gene,
-                    gene_name,
-                    included_transcript,
-                    excluded_transcript
-                ])
+                # 根据外显子数量确定包含和排除形式，数量相同时与比较所有转录本对时相同
+                for included_exons, excluded_exons, included_transcript, excluded_transcript in complex_forms(structure_l[i], structure_l[j], tx1_unique, tx2_unique):
+                    # 创建事件条目
+                    exonlist_included = ";".join([exon_string(chr, x) for x in included_exons])
+                    exonlist_excluded = ";".join([exon_string(chr, x) for x in excluded_exons])
+                    
+                    event_l.append([
+                        exonlist_included,
+                        exonlist_excluded,
+                        exon_string(chr, post_common),
+                        strand,
+                        gene,
+                        gene_name,
+                        included_transcript,
+                        excluded_transcript
+                    ])
     
     return event_l
 
-def complex_last_events(gtf_dic) -> list:
+def complex_last_events(gtf_dic, max_transcripts = None) -> list:
     """
     检测复杂的最后外显子事件(CL)。
     这些是涉及转录终止位点的复杂事件。
 
     Args:
         gtf_dic: 包含GTF文件信息的字典。
+        max_transcripts: 每个基因比较的转录本结构的最大数量，None 表示不限制。
 
     Returns:
         list: 复杂最后外显子事件列表，每个事件包含以下信息：
@@ -1193,108 +1082,570 @@ def complex_last_events(gtf_dic) -> list:
     """
     event_l = []
     for gene in gtf_dic.keys():
-        if "intron_list" not in gtf_dic[gene]:
+        if len(gtf_dic[gene]["intron"]) == 0:
             continue
         
+        chr = gtf_dic[gene]["chr"]
         strand = gtf_dic[gene]["strand"]
         gene_name = gtf_dic[gene]["gene_name"]
-        exon_dic = gtf_dic[gene]["transcript_exon_dic"]
+        # 每个基因只计算一次转录本结构，并根据链的方向排序外显子
+        structure_l = transcript_structures(gtf_dic[gene], max_transcripts, gene)
+        if strand == "-":
+            for structure in structure_l:
+                structure[1] = structure[1][::-1]
         
         # 比较所有转录本对
-        transcript_list = list(exon_dic.keys())
-        for i in range(len(transcript_list)):
-            for j in range(i+1, len(transcript_list)):
-                tx1 = transcript_list[i]
-                tx2 = transcript_list[j]
-                
-                # 根据链的方向获取排序的外显子
-                if strand == "+":
-                    tx1_exons = sorted(list(exon_dic[tx1]), key=lambda x: int(x.split(":")[1].split("-")[0]))
-                    tx2_exons = sorted(list(exon_dic[tx2]), key=lambda x: int(x.split(":")[1].split("-")[0]))
-                else:  # strand == "-"
-                    tx1_exons = sorted(list(exon_dic[tx1]), key=lambda x: int(x.split(":")[1].split("-")[0]), reverse=True)
-                    tx2_exons = sorted(list(exon_dic[tx2]), key=lambda x: int(x.split(":")[1].split("-")[0]), reverse=True)
-                
-                # 获取最后一个外显子
-                tx1_last = tx1_exons[-1] if tx1_exons else None
-                tx2_last = tx2_exons[-1] if tx2_exons else None
-                
-                # 跳过没有外显子的转录本
-                if not tx1_last or not tx2_last:
-                    continue
+        for i in range(len(structure_l)):
+            tx1, tx1_exons, tx1_set = structure_l[i][:3]
+            for j in range(i+1, len(structure_l)):
+                tx2, tx2_exons, tx2_set = structure_l[j][:3]
                 
                 # 跳过最后一个外显子相同的情况
-                if tx1_last == tx2_last:
+                if tx1_exons[-1] == tx2_exons[-1]:
                     continue
                 
                 # 找到共享外显子
-                shared_exons = set(tx1_exons) & set(tx2_exons)
-                if not shared_exons:
+                if tx1_set.isdisjoint(tx2_set):
                     continue
                 
-                # 找到最后一个共享外显子
-                if strand == "+":
-                    shared_sorted = sorted(list(shared_exons), key=lambda x: int(x.split(":")[1].split("-")[0]), reverse=True)
-                else:  # strand == "-"
-                    shared_sorted = sorted(list(shared_exons), key=lambda x: int(x.split(":")[1].split("-")[0]))
+                # 最后一个共享外显子（按链的方向）的位置
+                tx1_last_shared = next(k for k in range(len(tx1_exons) - 1, -1, -1) if tx1_exons[k] in tx2_set)
+                tx2_last_shared = next(k for k in range(len(tx2_exons) - 1, -1, -1) if tx2_exons[k] in tx1_set)
+                pre_common = tx1_exons[tx1_last_shared]
                 
-                pre_common = shared_sorted[0] if shared_sorted else None
-                if not pre_common:
-                    continue
-                
-                # 获取最后一个共享外显子之后的唯一外显子
-                tx1_unique = []
-                tx2_unique = []
-                
-                found_shared = False
-                for exon in reversed(tx1_exons):
-                    if not found_shared and exon in shared_exons:
-                        found_shared = True
-                        continue
-                    if found_shared:
-                        tx1_unique.append(exon)
-                
-                found_shared = False
-                for exon in reversed(tx2_exons):
-                    if not found_shared and exon in shared_exons:
-                        found_shared = True
-                        continue
-                    if found_shared:
-                        tx2_unique.append(exon)
+                # 获取最后一个共享外显子之前的外显子（从后往前）
+                tx1_unique = tx1_exons[:tx1_last_shared][::-1]
+                tx2_unique = tx2_exons[:tx2_last_shared][::-1]
                 
                 # 跳过任一转录本没有唯一外显子的情况
                 if not tx1_unique or not tx2_unique:
                     continue
                 
-                # 根据外显子数量确定包含和排除形式
-                if len(tx1_unique) > len(tx2_unique):
-                    included_exons = tx1_unique
-                    excluded_exons = tx2_unique
-                    included_transcript = tx1
-                    excluded_transcript = tx2
-                else:
-                    included_exons = tx2_unique
-                    excluded_exons = tx1_unique
-                    included_transcript = tx2
-                    excluded_transcript = tx1
+                # 根据外显子数量确定包含和排除形式，数量相同时与比较所有转录本对时相同
+                for included_exons, excluded_exons, included_transcript, excluded_transcript in complex_forms(structure_l[i], structure_l[j], tx1_unique, tx2_unique):
+                    # 创建事件条目
+                    exonlist_included = ";".join([exon_string(chr, x) for x in included_exons])
+                    exonlist_excluded = ";".join([exon_string(chr, x) for x in excluded_exons])
                     
-                # 创建事件条目
-                exonlist_included = ";".join(included_exons)
-                exonlist_excluded = ";".join(excluded_exons)
-                
-                event_l.append([
-                    exonlist_included,
-                    exonlist_excluded,
-                    pre_common,
-                    strand,
-                    gene,
-                    gene_name,
-                    included_transcript,
-                    excluded_transcript
-                ])
+                    event_l.append([
+                        exonlist_included,
+                        exonlist_excluded,
+                        exon_string(chr, pre_common),
+                        strand,
+                        gene,
+                        gene_name,
+                        included_transcript,
+                        excluded_transcript
+                    ])
     
     return event_l
 
+# Event types and their detectors, in the order of the output tables
+EVENT_DETECTORS = {
+	"SE": se,
+	"FIVE": five,
+	"THREE": three,
+	"MXE": mxe,
+	"RI": ri,
+	"MSE": mse,
+	"AFE": afe,
+	"ALE": ale,
+	"CO": complex_events,
+	"CF": complex_first_events,
+	"CL": complex_last_events
+}
+
+def gene_cost(gene_dic) -> int:
+	"""
+	Estimates the cost of searching events in a gene.
+
+	Pairwise exon searches (MXE and RI) grow with the square of the number of exons, and
+	pairwise transcript searches (AFE, ALE and complex events) with the square of the number
+	of transcripts times the number of their exons.
+
+	Args:
+		gene_dic (dict): The model of a gene made by gtf().
+
+	Returns:
+		int: The estimated cost.
+	"""
+
+	exon_num = len(gene_dic["exon_start"])
+	transcript_num = len(gene_dic["transcript_id"])
+	return(exon_num * exon_num + transcript_num * len(gene_dic["transcript_exon"]))
+
+def gene_batches(gtf_dic, num_process, batches_per_process = 16) -> list:
+	"""
+	Splits genes into batches of similar cost, heaviest genes first.
+
+	Genes are sorted by descending cost and packed into batches of about
+	total cost / (num_process * batches_per_process), so that a gene heavier than that forms a batch of its own.
+	Batches are dispatched to workers as they become free, so heavy genes start first and light ones fill the gaps.
+
+	Args:
+		gtf_dic (dict): A dictionary of gene and its model made by gtf().
+		num_process (int): Number of processes to use.
+		batches_per_process (int): Number of batches per process to aim for.
+
+	Returns:
+		list: List of dictionaries of gene and its model.
+	"""
+
+	cost_dic = {gene: gene_cost(gene_dic) for gene, gene_dic in gtf_dic.items()}
+	batch_cost = max(sum(cost_dic.values()) / (num_process * batches_per_process), 1)
+	batch_l = []
+	batch = {}
+	cost = 0
+	for gene in sorted(cost_dic, key = lambda x: cost_dic[x], reverse = True):
+		batch[gene] = gtf_dic[gene]
+		cost += cost_dic[gene]
+		if cost >= batch_cost:
+			batch_l.append(batch)
+			batch = {}
+			cost = 0
+	if len(batch) > 0:
+		batch_l.append(batch)
+	return(batch_l)
+
+# Columns of the runtime of each gene and event type measured by detect_events()
+RUNTIME_COLUMNS = ["gene_id", "event_type", "pid", "runtime", "cpu_time", "event_num", "peak_rss_mb"]
+
+def peak_rss(children = False) -> float:
+	"""
+	Gets the peak resident set size of this process, or of its largest finished child process.
+
+	Args:
+		children (bool): Whether to get the peak of child processes instead of this process.
+
+	Returns:
+		float: The peak resident set size in MB.
+	"""
+
+	max_rss = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+	# Bytes on macOS and kilobytes on Linux
+	return(max_rss / (1024 * 1024) if sys.platform == "darwin" else max_rss / 1024)
+
+def detect_events(gtf_dic, event_types, gene_runtime = False, detector_kwargs = None) -> tuple:
+	"""
+	Runs the detectors of the given event types on a batch of genes.
+
+	Args:
+		gtf_dic (dict): A dictionary of gene and its model made by gtf().
+		event_types (list): Event types to search, keys of EVENT_DETECTORS.
+		gene_runtime (bool): Whether to measure the runtime of each gene and event type.
+		detector_kwargs (dict): A dictionary of event type and keyword arguments of its detector.
+
+	Returns:
+		tuple: A dictionary of event type and list of events returned by its detector,
+		and a list of rows of RUNTIME_COLUMNS for each gene and event type if gene_runtime is True, or an empty list.
+	"""
+
+	detector_kwargs = detector_kwargs if detector_kwargs else {}
+	if not gene_runtime:
+		return({event_type: EVENT_DETECTORS[event_type](gtf_dic, **detector_kwargs.get(event_type, {})) for event_type in event_types}, [])
+
+	event_dic = {event_type: [] for event_type in event_types}
+	runtime_l = []
+	pid = os.getpid()
+	for gene in gtf_dic.keys():
+		for event_type in event_types:
+			start_time = time.perf_counter()
+			start_cpu_time = time.process_time()
+			event_l = EVENT_DETECTORS[event_type]({gene: gtf_dic[gene]}, **detector_kwargs.get(event_type, {}))
+			runtime_l.append([gene, event_type, pid, time.perf_counter() - start_time, time.process_time() - start_cpu_time, len(event_l), peak_rss()])
+			event_dic[event_type] += event_l
+	return(event_dic, runtime_l)
+
+def detect_batch(batch_l, event_types, gene_runtime, detector_kwargs, k) -> tuple:
+	"""
+	Runs detect_events() on one of the gene batches made by gene_batches().
+
+	Args:
+		batch_l (list): Gene batches made by gene_batches().
+		event_types (list): Event types to search, keys of EVENT_DETECTORS.
+		gene_runtime (bool): Whether to measure the runtime of each gene.
+		detector_kwargs (dict): A dictionary of event type and keyword arguments of its detector.
+		k (int): The index of the batch.
+
+	Returns:
+		tuple: The return value of detect_events().
+	"""
+
+	return(detect_events(batch_l[k], event_types, gene_runtime, detector_kwargs))
+
+def search_events(gtf_dic, event_types, num_process, gene_runtime = False, detector_kwargs = None, executor = None) -> tuple:
+	"""
+	Searches events of all given types in batches of genes scheduled by gene_batches(),
+	sending each batch to a worker only once.
+	Workers receive only the index of a batch where fork is available (see parallel.map_shards()).
+
+	Args:
+		gtf_dic (dict): A dictionary of gene and its model made by gtf().
+		event_types (list): Event types to search, keys of EVENT_DETECTORS.
+		num_process (int): Number of processes to use.
+		gene_runtime (bool): Whether to measure the runtime of each gene.
+		detector_kwargs (dict): A dictionary of event type and keyword arguments of its detector.
+		executor (concurrent.futures.Executor): A pool to run workers in, to which each batch is pickled.
+			If None, a pool of num_process processes is forked for this call and inherits the batches without copying them,
+			where fork is available.
+
+	Returns:
+		tuple: A dictionary of event type and list of events from all genes,
+		and a DataFrame of RUNTIME_COLUMNS, exon_num, transcript_num and cost for each gene and event type if gene_runtime is True, or None.
+	"""
+
+	batch_l = gene_batches(gtf_dic, num_process)
+	logger.debug(f"Number of gene batches: {len(batch_l)}")
+	event_output_dic = {event_type: [] for event_type in event_types}
+	runtime_l = []
+	logger.debug("Waiting for event search to complete....")
+	for event_dic, batch_runtime_l in parallel.map_shards(detect_batch, (batch_l, event_types, gene_runtime, detector_kwargs), len(batch_l), num_process, executor):
+		for event_type, event_l in event_dic.items():
+			event_output_dic[event_type] += event_l
+		runtime_l += batch_runtime_l
+
+	if not gene_runtime:
+		return(event_output_dic, None)
+	runtime_df = pd.DataFrame(runtime_l, columns = RUNTIME_COLUMNS)
+	runtime_df["exon_num"] = runtime_df["gene_id"].map(lambda x: len(gtf_dic[x]["exon_start"]))
+	runtime_df["transcript_num"] = runtime_df["gene_id"].map(lambda x: len(gtf_dic[x]["transcript_id"]))
+	runtime_df["cost"] = runtime_df["gene_id"].map(lambda x: gene_cost(gtf_dic[x]))
+	return(event_output_dic, runtime_df)
+
+# Columns of events returned by each detector
+EVENT_COLUMNS = {
+	"SE": ["exon", "intron_a", "intron_b", "intron_c", "strand", "gene_id", "gene_name"],
+	"FIVE": ["exon_a", "exon_b", "intron_a", "intron_b", "strand", "gene_id", "gene_name"],
+	"THREE": ["exon_a", "exon_b", "intron_a", "intron_b", "strand", "gene_id", "gene_name"],
+	"MXE": ["exon_a", "exon_b", "intron_a1", "intron_a2", "intron_b1", "intron_b2", "strand", "gene_id", "gene_name"],
+	"RI": ["exon_a", "exon_b", "exon_c", "intron_a", "strand", "gene_id", "gene_name"],
+	"MSE": ["exon", "intron", "mse_n", "strand", "gene_id", "gene_name"],
+	"AFE": ["exon_a", "exon_b", "intron_a", "intron_b", "strand", "gene_id", "gene_name"],
+	"ALE": ["exon_a", "exon_b", "intron_a", "intron_b", "strand", "gene_id", "gene_name"],
+	"CO": ["included_exons", "excluded_exons", "pre_exon", "post_exon", "strand", "gene_id", "gene_name", "included_transcript", "excluded_transcript"],
+	"CF": ["included_exons", "excluded_exons", "post_exon", "strand", "gene_id", "gene_name", "included_transcript", "excluded_transcript"],
+	"CL": ["included_exons", "excluded_exons", "pre_exon", "strand", "gene_id", "gene_name", "included_transcript", "excluded_transcript"]
+}
+
+# Bump when detectors change their results for the same gene model
+EVENT_CACHE_VERSION = 2
+
+def gene_hash(gene, gene_dic, detector_kwargs = None) -> str:
+	"""
+	Hashes the structure of a gene and the detector options, which together determine its events.
+
+	Args:
+		gene (str): Gene ID.
+		gene_dic (dict): The model of a gene made by gtf().
+		detector_kwargs (dict): A dictionary of event type and keyword arguments of its detector.
+
+	Returns:
+		str: The hexadecimal digest.
+	"""
+
+	sha1 = hashlib.sha1()
+	sha1.update(repr((gene, gene_dic["gene_name"], gene_dic["chr"], gene_dic["strand"], gene_dic["transcript_id"], sorted((detector_kwargs or {}).items()))).encode())
+	for key in ["exon_start", "exon_end", "intron", "transcript_offset", "transcript_exon"]:
+		sha1.update(np.ascontiguousarray(gene_dic[key], dtype = "int64").tobytes())
+	return(sha1.hexdigest())
+
+def load_event_cache(cache_path) -> dict:
+	"""
+	Loads events of each gene saved by save_event_cache().
+
+	Args:
+		cache_path (str): The path to the cache file.
+
+	Returns:
+		dict: A dictionary of gene hash and dictionary of event type and list of events. Empty if there is no readable cache.
+	"""
+
+	if not os.path.isfile(cache_path):
+		return({})
+	try:
+		with open(cache_path, "rb") as f:
+			return(pickle.load(f))
+	except (OSError, pickle.UnpicklingError, EOFError) as e:
+		logger.warning(f"Failed to load event cache {cache_path}: {e}")
+		return({})
+
+def save_event_cache(cache_path, event_cache) -> None:
+	"""
+	Saves events of each gene, writing a temporary file first so that concurrent runs never read a partial cache.
+
+	Args:
+		cache_path (str): The path to the cache file.
+		event_cache (dict): A dictionary of gene hash and dictionary of event type and list of events.
+	"""
+
+	os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok = True)
+	fd, tmp_path = tempfile.mkstemp(dir = os.path.dirname(os.path.abspath(cache_path)), prefix = ".tmp_")
+	try:
+		with os.fdopen(fd, "wb") as f:
+			pickle.dump(event_cache, f, protocol = pickle.HIGHEST_PROTOCOL)
+		os.replace(tmp_path, cache_path)
+	except OSError as e:
+		logger.warning(f"Failed to save event cache {cache_path}: {e}")
+		if os.path.exists(tmp_path):
+			os.remove(tmp_path)
+
+def incremental_search_events(gtf_dic, event_types, num_process, event_cache, new_event_cache, gene_runtime = False, detector_kwargs = None, executor = None) -> tuple:
+	"""
+	Searches events like search_events(), reusing the cached events of genes whose structure has not changed since the last run.
+
+	Genes are matched by gene_hash(), so only new or changed genes are searched.
+
+	Args:
+		gtf_dic (dict): A dictionary of gene and its model made by gtf().
+		event_types (list): Event types to search, keys of EVENT_DETECTORS.
+		num_process (int): Number of processes to use.
+		event_cache (dict): Events of each gene loaded by load_event_cache().
+		new_event_cache (dict): Events of each gene of gtf_dic are added to this dictionary, to be saved by save_event_cache().
+		gene_runtime (bool): Whether to measure the runtime of each searched gene.
+		detector_kwargs (dict): A dictionary of event type and keyword arguments of its detector.
+		executor (concurrent.futures.Executor): A pool to run workers in, or None.
+
+	Returns:
+		tuple: The same as search_events().
+	"""
+
+	hash_dic = {gene: gene_hash(gene, gene_dic, detector_kwargs) for gene, gene_dic in gtf_dic.items()}
+	changed_gtf_dic = {gene: gtf_dic[gene] for gene in gtf_dic.keys() if not set(event_types) <= set(event_cache.get(hash_dic[gene], {}))}
+	logger.info(f"Reusing events of {len(gtf_dic) - len(changed_gtf_dic)} unchanged genes, searching {len(changed_gtf_dic)} new or changed genes....")
+	changed_event_dic, runtime_df = search_events(changed_gtf_dic, event_types, num_process, gene_runtime, detector_kwargs, executor)
+
+	# Events of searched genes by gene
+	gene_event_dic = {hash_dic[gene]: {event_type: [] for event_type in event_types} for gene in changed_gtf_dic.keys()}
+	gene_hash_dic = {gene: hash_dic[gene] for gene in changed_gtf_dic.keys()}
+	for event_type, event_l in changed_event_dic.items():
+		gene_index = EVENT_COLUMNS[event_type].index("gene_id")
+		for event in event_l:
+			gene_event_dic[gene_hash_dic[event[gene_index]]][event_type].append(event)
+
+	event_output_dic = {event_type: [] for event_type in event_types}
+	for gene in gtf_dic.keys():
+		gene_events = gene_event_dic[hash_dic[gene]] if gene in changed_gtf_dic else event_cache[hash_dic[gene]]
+		# Cached events of other event types are kept for runs with other --events
+		new_event_cache[hash_dic[gene]] = {**event_cache.get(hash_dic[gene], {}), **gene_events}
+		for event_type in event_types:
+			event_output_dic[event_type] += gene_events[event_type]
+	return(event_output_dic, runtime_df)
+
+def split_coordinates(coordinates) -> tuple:
+	"""
+	Splits coordinates in the format "chr:start-end" into their parts.
+
+	Args:
+		coordinates (pd.Series): Coordinates in the format "chr:start-end".
+
+	Returns:
+		tuple: Series of chromosome, "start-end", start and end as strings.
+	"""
+
+	# Plain string slicing is much faster than the .str accessor, and makes no tuples for the garbage collector to track
+	coordinate_l = coordinates.tolist()
+	colon_l = [x.find(":") for x in coordinate_l]
+	chr_l = [x[:i] for x, i in zip(coordinate_l, colon_l)]
+	position_l = [x[i + 1:] for x, i in zip(coordinate_l, colon_l)]
+	dash_l = [x.find("-") for x in position_l]
+	start_l = [x[:i] for x, i in zip(position_l, dash_l)]
+	end_l = [x[i + 1:] for x, i in zip(position_l, dash_l)]
+	return(tuple(pd.Series(l, index = coordinates.index, dtype = "object") for l in [chr_l, position_l, start_l, end_l]))
+
+def event_pos_id(event_type, event_df) -> pd.Series:
+	"""
+	Makes the positional ID of each event from its coordinates.
+
+	Args:
+		event_type (str): Event type, a key of EVENT_DETECTORS.
+		event_df (pd.DataFrame): Events with the columns in EVENT_COLUMNS.
+
+	Returns:
+		pd.Series: Positional IDs, e.g. SE@chr1@200-300@100-400.
+	"""
+
+	if event_type == "SE":
+		chr, exon, _, _ = split_coordinates(event_df["exon"])
+		_, intron_c, _, _ = split_coordinates(event_df["intron_c"])
+		return("SE@" + chr + "@" + exon + "@" + intron_c)
+	elif event_type in ["FIVE", "THREE", "AFE", "ALE"]:
+		chr, intron_a, _, _ = split_coordinates(event_df["intron_a"])
+		_, intron_b, _, _ = split_coordinates(event_df["intron_b"])
+		return(event_type + "@" + chr + "@" + intron_a + "@" + intron_b)
+	elif event_type == "MXE":
+		chr, _, intron_a1_start, _ = split_coordinates(event_df["intron_a1"])
+		_, exon_a, _, _ = split_coordinates(event_df["exon_a"])
+		_, exon_b, _, _ = split_coordinates(event_df["exon_b"])
+		_, _, _, intron_b2_end = split_coordinates(event_df["intron_b2"])
+		return("MXE@" + chr + "@" + intron_a1_start + "@" + exon_a + "@" + exon_b + "@" + intron_b2_end)
+	elif event_type == "RI":
+		chr, intron_a, _, _ = split_coordinates(event_df["intron_a"])
+		return("RI@" + chr + "@" + intron_a)
+	elif event_type == "MSE":
+		# pos_id = chromosome@exon_start-exon_end;exon_start-exon_end@exclusionintron_start-exclusionintron_end
+		chr, _, _, _ = split_coordinates(event_df["exon"])
+		exon = event_df["exon"].str.replace(r"[^;]*:", "", regex = True)
+		_, exc, _, _ = split_coordinates(event_df["intron"].str.rpartition(";")[2])
+		return("MSE@" + chr + "@" + exon + "@" + exc)
+	elif event_type == "CO":
+		chr, pre_exon, _, _ = split_coordinates(event_df["pre_exon"])
+		_, post_exon, _, _ = split_coordinates(event_df["post_exon"])
+		return("CO@" + chr + "@" + pre_exon + "@" + post_exon)
+	elif event_type == "CF":
+		chr, post_exon, _, _ = split_coordinates(event_df["post_exon"])
+		return("CF@" + chr + "@" + post_exon)
+	elif event_type == "CL":
+		chr, pre_exon, _, _ = split_coordinates(event_df["pre_exon"])
+		return("CL@" + chr + "@" + pre_exon)
+
+def event_label(event_type, event_df, ref_intron_set, ref_exon_set) -> pd.Series:
+	"""
+	Labels events whose introns (and the spanning exon of retained introns) are all in a reference as annotated.
+
+	Args:
+		event_type (str): Event type, a key of EVENT_DETECTORS.
+		event_df (pd.DataFrame): Events with the columns in EVENT_COLUMNS.
+		ref_intron_set (set): Intron coordinates of the reference GTF in the format "chr:start-end", or None.
+		ref_exon_set (set): Exon coordinates of the reference GTF in the format "chr:start-end", or None.
+
+	Returns:
+		pd.Series: "annotated" or "unannotated" for each event.
+	"""
+
+	if ref_intron_set is None:
+		return(pd.Series("annotated", index = event_df.index))
+	if event_type in ["CO", "CF", "CL"]:
+		# Complex events are unannotated by default
+		return(pd.Series("unannotated", index = event_df.index))
+
+	# Membership in the reference sets is tested with set lookups, as Series.isin() would hash the whole reference for every column
+	if event_type == "MSE":
+		annotated = np.array([ref_intron_set.issuperset(x.split(";")) for x in event_df["intron"].tolist()], dtype = bool)
+	else:
+		intron_columns = [column for column in EVENT_COLUMNS[event_type] if column.startswith("intron")]
+		annotated = np.logical_and.reduce([np.array([x in ref_intron_set for x in event_df[column].tolist()], dtype = bool) for column in intron_columns])
+		if event_type == "RI":
+			annotated &= np.array([x in ref_exon_set for x in event_df["exon_c"].tolist()], dtype = bool)
+	return(pd.Series(np.where(annotated, "annotated", "unannotated"), index = event_df.index))
+
+def event_table(event_type, event_l, ref_intron_set = None, ref_exon_set = None) -> pd.DataFrame:
+	"""
+	Makes the output table of one event type with event_id, pos_id and label columns.
+
+	Events with the same pos_id are reduced to the first one after sorting, and event IDs are numbered in that order.
+	Events are put in a canonical order before the stable sort, so that the table does not depend on the order
+	in which workers return events. Complex events are put in the order of their gene and transcript pair, so that
+	of events with the same pos_id and included exons, the one of the first pair of transcripts is kept, as when
+	every pair of transcripts was compared.
+
+	Args:
+		event_type (str): Event type, a key of EVENT_DETECTORS.
+		event_l (list): Events returned by the detector of event_type.
+		ref_intron_set (set): Intron coordinates of the reference GTF, or None to label all events as annotated.
+		ref_exon_set (set): Exon coordinates of the reference GTF, or None.
+
+	Returns:
+		pd.DataFrame: The event table.
+	"""
+
+	columns = EVENT_COLUMNS[event_type]
+	if event_type == "MSE":
+		output_columns = ["event_id", "pos_id", "mse_n", "exon", "intron", "strand", "gene_id", "gene_name", "label"]
+	else:
+		output_columns = ["event_id", "pos_id"] + columns + ["label"]
+	if len(event_l) == 0:
+		return(pd.DataFrame(columns = output_columns))
+
+	if event_type in ["CO", "CF", "CL"]:
+		gene_idx, included_idx, excluded_idx = [columns.index(column) for column in ["gene_id", "included_transcript", "excluded_transcript"]]
+		event_l = sorted(event_l, key = lambda event: (event[gene_idx], min(event[included_idx], event[excluded_idx]), max(event[included_idx], event[excluded_idx]), event))
+	else:
+		event_l = sorted(event_l)
+	event_df = pd.DataFrame(event_l, columns = columns)
+	event_df["pos_id"] = event_pos_id(event_type, event_df)
+	if event_type in ["AFE", "ALE"]:
+		# Introns without chromosome
+		_, intron_a, _, _ = split_coordinates(event_df["intron_a"])
+		_, intron_b, _, _ = split_coordinates(event_df["intron_b"])
+		event_df["intron_for_posid"] = intron_a + ";" + intron_b
+		sort_columns = ["exon_a", "exon_b"]
+		duplicate_column = "intron_for_posid"
+	else:
+		sort_columns = [columns[0]]
+		duplicate_column = "pos_id"
+	event_df = event_df.sort_values(sort_columns, kind = "mergesort")
+	event_df = event_df.drop_duplicates(subset = duplicate_column, keep = "first")
+	event_df = event_df.reset_index(drop = True)
+	event_df["event_id"] = event_type + "_" + (event_df.index + 1).astype(str)
+	event_df["label"] = event_label(event_type, event_df, ref_intron_set, ref_exon_set)
+
+	return(event_df[output_columns])
+
+def profile_stage(stage_l, stage, start_time, **info) -> None:
+	"""
+	Records the wall time of a stage of main() and the peak memory usage at its end.
+
+	Args:
+		stage_l (list): A list of stages, to which the stage is added.
+		stage (str): Name of the stage.
+		start_time (float): time.perf_counter() at the start of the stage.
+		**info: Other items to record, such as the number of genes. Items of None are skipped.
+	"""
+
+	stage_l.append({
+		"stage": stage,
+		**{key: value for key, value in info.items() if value is not None},
+		"wall_time": time.perf_counter() - start_time,
+		"peak_rss_mb": peak_rss(),
+		"peak_worker_rss_mb": peak_rss(children = True)
+	})
+
+def profile_report(runtime_df, stage_l, gene_n = 20) -> dict:
+	"""
+	Summarizes the runtime of event search by event type, worker and gene.
+
+	Args:
+		runtime_df (pd.DataFrame): Runtime of each gene and event type returned by search_events().
+		stage_l (list): Stages recorded by profile_stage().
+		gene_n (int): Number of the slowest genes to report for each event type.
+
+	Returns:
+		dict: A report with the wall time and peak memory usage of each stage, the wall time, CPU time and number of events
+		of each detector and worker, the slowest genes of each detector, and the number of events of each gene.
+		Numbers of events are counted before duplicated events are removed, and genes without events are not listed.
+	"""
+
+	detector_df = runtime_df.groupby("event_type", sort = False).agg(
+		wall_time = ("runtime", "sum"),
+		cpu_time = ("cpu_time", "sum"),
+		event_num = ("event_num", "sum"),
+		gene_num = ("gene_id", "size")
+	)
+	worker_df = runtime_df.groupby("pid").agg(
+		wall_time = ("runtime", "sum"),
+		cpu_time = ("cpu_time", "sum"),
+		event_num = ("event_num", "sum"),
+		gene_num = ("gene_id", "nunique"),
+		peak_rss_mb = ("peak_rss_mb", "max")
+	)
+	slowest_gene_dic = {}
+	for event_type, event_type_df in runtime_df.groupby("event_type", sort = False):
+		event_type_df = event_type_df.sort_values("runtime", ascending = False, kind = "mergesort").head(gene_n)
+		slowest_gene_dic[event_type] = event_type_df[["gene_id", "runtime", "cpu_time", "event_num", "exon_num", "transcript_num", "cost"]].to_dict("records")
+	gene_event_df = runtime_df[runtime_df["event_num"] > 0]
+	gene_event_dic = defaultdict(dict)
+	for gene, event_type, event_num in zip(gene_event_df["gene_id"].tolist(), gene_event_df["event_type"].tolist(), gene_event_df["event_num"].tolist()):
+		gene_event_dic[gene][event_type] = event_num
+
+	report = {
+		"stages": stage_l,
+		"detectors": detector_df.to_dict("index"),
+		"workers": worker_df.reset_index().to_dict("records"),
+		"slowest_genes": slowest_gene_dic,
+		"gene_events": gene_event_dic
+	}
+	return(report)
+
 def main():
 	## Main
 
@@ -1310,448 +1661,111 @@ def main():
 	reference_gtf_path = args.reference_gtf
 	num_process = args.num_process
 	output_dir = args.output
+	cache_dir = args.cache_dir
+	gene_runtime_path = args.gene_runtime
+	max_mse_n = args.max_mse_n
+	max_complex_transcripts = args.max_complex_transcripts
+	incremental = args.incremental
+	stream = args.stream
+	profile = args.profile
+	# Runtime of each gene and event type is measured for both --gene-runtime and --profile
+	measure_runtime = (gene_runtime_path is not None) or profile
+	stage_l = []
 
 	logger.info("Starting event search...")
 	logger.debug(args)
-	logger.info(f"Loading {gtf_path}....")
-	gtf_dic_split = gtf(gtf_path, num_process)
+	if incremental and (cache_dir is None):
+		logger.error("--incremental requires a cache directory given with -c/--cache-dir")
+		sys.exit(1)
 
 	if reference_gtf_path:
 		logger.info(f"Loading {reference_gtf_path}....")
-		gtf_ref_exon_set = gtf_exon_set(reference_gtf_path)
+		start_time = time.perf_counter()
+		gtf_ref_exon_set, gtf_ref_intron_set = annotation.reference_sets(reference_gtf_path, cache_dir)
 		logger.debug("Size of exon set in reference GTF: " + str(len(gtf_ref_exon_set)))
-		gtf_ref_dic = gtf(reference_gtf_path, 1)
-		# Only intron_list is needed
-		gtf_ref_intron_set_dict = {k: v["intron_list"] for k, v in gtf_ref_dic[0].items() if "intron_list" in v}
-		gtf_ref_intron_set = set()
-		for k in gtf_ref_intron_set_dict:
-			gtf_ref_intron_set |= gtf_ref_intron_set_dict[k]
 		logger.debug("Size of intron set in reference GTF: " + str(len(gtf_ref_intron_set)))
+		profile_stage(stage_l, "reference", start_time)
 
 	#################################### Event search #########################################
 
-	output_df_dict = {}
-
-	#################################### Skipped exon (SE) ####################################
-
-	logger.info("Searching skipped exon (SE)....")
-	with concurrent.futures.ProcessPoolExecutor(max_workers=num_process) as executor:
-		futures = [executor.submit(se, gtf_dic_split[i]) for i in range(num_process)]
-	output_l = []
-	logger.debug("Waiting for skipped exon search to complete....")
-	for future in concurrent.futures.as_completed(futures):
-		output_l += future.result()
-	output_df = pd.DataFrame(
-		output_l,
-		columns = ["exon", "intron_a", "intron_b", "intron_c", "strand", "gene_id", "gene_name"]
-	)
-
-	logger.debug("Creating event_id....")
-	output_df["pos_id"] = \
-		"SE@" + \
-		output_df["exon"].str.split(":", expand = True)[0].astype(str) + "@" + \
-		output_df["exon"].str.split(":", expand = True)[1].str.split("-", expand = True)[0].astype(str) + "-" + output_df["exon"].str.split(":", expand = True)[1].str.split("-", expand = True)[1].astype(str) + "@" + \
-		output_df["intron_c"].str.split(":", expand = True)[1].str.split("-", expand = True)[0].astype(str) + "-" + output_df["intron_c"].str.split(":", expand = True)[1].str.split("-", expand = True)[1].astype(str)
-	output_df = output_df.sort_values("exon")
-	output_df = output_df.drop_duplicates(subset = "pos_id", keep = "first")
-	output_df = output_df.reset_index()
-	output_df["event_id_num"] = output_df.index + 1
-	output_df["event_id"] = "SE_" + output_df["event_id_num"].astype(str)
-	output_df = output_df[["event_id", "pos_id", "exon", "intron_a", "intron_b", "intron_c", "strand", "gene_id", "gene_name"]]
-
-	logger.debug("Creating label....")
-	if reference_gtf_path:
-		output_df["label"] = output_df.apply(lambda x: "annotated" if (x["intron_a"] in gtf_ref_intron_set) and (x["intron_b"] in gtf_ref_intron_set) and (x["intron_c"] in gtf_ref_intron_set) else "unannotated", axis = 1)
-	else:
-		output_df["label"] = "annotated"
-	output_df_dict["SE"] = output_df
-	del output_df
-
-	logger.info("Skipped exon search completed.")
-
-	#################################### Alternative Five prime ss (FIVE) ####################################
-
-	logger.info("Searching alternative five prime ss (FIVE)....")
-	with concurrent.futures.ProcessPoolExecutor(max_workers=num_process) as executor:
-		futures = [executor.submit(five, gtf_dic_split[i]) for i in range(num_process)]
-	output_l = []
-	logger.debug("Waiting for alternative five prime ss search to complete....")
-	for future in concurrent.futures.as_completed(futures):
-		output_l += future.result()
-	output_df = pd.DataFrame(
-		output_l,
-		columns = ["exon_a", "exon_b", "intron_a", "intron_b", "strand", "gene_id", "gene_name"]
-	)
-
-	logger.debug("Creating event_id....")
-	output_df["pos_id"] = \
-		"FIVE@" + \
-		output_df["intron_a"].str.split(":", expand = True)[0].astype(str) + "@" + \
-		output_df["intron_a"].str.split(":", expand = True)[1].str.split("-", expand = True)[0].astype(str) + "-" + output_df["intron_a"].str.split(":", expand = True)[1].str.split("-", expand = True)[1].astype(str) + "@" + \
-		output_df["intron_b"].str.split(":", expand = True)[1].str.split("-", expand = True)[0].astype(str) + "-" + output_df["intron_b"].str.split(":", expand = True)[1].str.split("-", expand = True)[1].astype(str)
-	output_df = output_df.sort_values("exon_a")
-	output_df = output_df.drop_duplicates(subset = "pos_id", keep = "first")
-	output_df = output_df.reset_index()
-	output_df["event_id_num"] = output_df.index + 1
-	output_df["event_id"] = "FIVE_" + output_df["event_id_num"].astype(str)
-	output_df = output_df[["event_id", "pos_id", "exon_a", "exon_b", "intron_a", "intron_b", "strand", "gene_id", "gene_name"]]
-
-	logger.debug("Creating label....")
-	if reference_gtf_path:
-		output_df["label"] = output_df.apply(lambda x: "annotated" if (x["intron_a"] in gtf_ref_intron_set) and (x["intron_b"] in gtf_ref_intron_set) else "unannotated", axis = 1)
+	# Only the selected detectors are run and their event tables written
+	event_types = args.events if args.events else list(EVENT_DETECTORS.keys())
+	detector_kwargs = {
+		"MSE": {"max_mse_n": max_mse_n},
+		"CO": {"max_transcripts": max_complex_transcripts},
+		"CF": {"max_transcripts": max_complex_transcripts},
+		"CL": {"max_transcripts": max_complex_transcripts}
+	}
+	if incremental:
+		event_cache_path = os.path.join(cache_dir, f"events.v{EVENT_CACHE_VERSION}.pkl")
+		event_cache = load_event_cache(event_cache_path)
+		new_event_cache = {}
+	start_time = time.perf_counter()
+	if stream:
+		# One chromosome at a time, so that only the gene model of one chromosome is in memory
+		logger.info(f"Streaming {gtf_path} by chromosome....")
+		gtf_df_iter = annotation.iter_exon_tables(gtf_path, cache_dir)
 	else:
-		output_df["label"] = "annotated"
-	output_df_dict["FIVE"] = output_df
-	del output_df
-
-	logger.info("Alternative five prime ss search completed.")
-
-	#################################### Alternative three prime ss (THREE) ####################################
-
-	logger.info("Searching alternative three prime ss (THREE)....")
-	with concurrent.futures.ProcessPoolExecutor(max_workers=num_process) as executor:
-		futures = [executor.submit(three, gtf_dic_split[i]) for i in range(num_process)]
-	output_l = []
-	logger.debug("Waiting for alternative three prime ss search to complete....")
-	for future in concurrent.futures.as_completed(futures):
-		output_l += future.result()
-	output_df = pd.DataFrame(
-		output_l,
-		columns = ["exon_a", "exon_b", "intron_a", "intron_b", "strand", "gene_id", "gene_name"]
-	)
-
-	logger.debug("Creating event_id....")
-	output_df["pos_id"] = \
-		"THREE@" + \
-		output_df["intron_a"].str.split(":", expand = True)[0].astype(str) + "@" + \
-		output_df["intron_a"].str.split(":", expand = True)[1].str.split("-", expand = True)[0].astype(str) + "-" + output_df["intron_a"].str.split(":", expand = True)[1].str.split("-", expand = True)[1].astype(str) + "@" + \
-		output_df["intron_b"].str.split(":", expand = True)[1].str.split("-", expand = True)[0].astype(str) + "-" + output_df["intron_b"].str.split(":", expand = True)[1].str.split("-", expand = True)[1].astype(str)
-	output_df = output_df.sort_values("exon_a")
-	output_df = output_df.drop_duplicates(subset = "pos_id", keep = "first")
-	output_df = output_df.reset_index()
-	output_df["event_id_num"] = output_df.index + 1
-	output_df["event_id"] = "THREE_" + output_df["event_id_num"].astype(str)
-	output_df = output_df[["event_id", "pos_id", "exon_a", "exon_b", "intron_a", "intron_b", "strand", "gene_id", "gene_name"]]
-
-	logger.debug("Creating label....")
-	if reference_gtf_path:
-		output_df["label"] = output_df.apply(lambda x: "annotated" if (x["intron_a"] in gtf_ref_intron_set) and (x["intron_b"] in gtf_ref_intron_set) else "unannotated", axis = 1)
-	else:
-		output_df["label"] = "annotated"
-	output_df_dict["THREE"] = output_df
-	del output_df
-
-	logger.info("Alternative three prime ss search completed.")
-
-	#################################### Mutually exclusive exon (MXE) ####################################
-
-	logger.info("Searching mutually exclusive exons (MXE)....")
-	with concurrent.futures.ProcessPoolExecutor(max_workers=num_process) as executor:
-		futures = [executor.submit(mxe, gtf_dic_split[i]) for i in range(num_process)]
-	output_l = []
-	logger.debug("Waiting for mutually exclusive exon search to complete....")
-	for future in concurrent.futures.as_completed(futures):
-		output_l += future.result()
-	output_df = pd.DataFrame(
-		output_l,
-		columns = ["exon_a", "exon_b", "intron_a1", "intron_a2", "intron_b1", "intron_b2", "strand", "gene_id", "gene_name"]
-	)
-
-	logger.debug("Creating event_id....")
-	output_df["pos_id"] = \
-		"MXE@" + \
-		output_df["intron_a1"].str.split(":", expand = True)[0].astype(str) + "@" + \
-		output_df["intron_a1"].str.split(":", expand = True)[1].str.split("-", expand = True)[0].astype(str) + "@" + \
-		output_df["exon_a"].str.split(":", expand = True)[1].str.split("-", expand = True)[0].astype(str) + "-" + output_df["exon_a"].str.split(":", expand = True)[1].str.split("-", expand = True)[1].astype(str) + "@" + \
-		output_df["exon_b"].str.split(":", expand = True)[1].str.split("-", expand = True)[0].astype(str) + "-" + output_df["exon_b"].str.split(":", expand = True)[1].str.split("-", expand = True)[1].astype(str) + "@" + \
-		output_df["intron_b2"].str.split(":", expand = True)[1].str.split("-", expand = True)[1].astype(str)
-	output_df = output_df.sort_values("exon_a")
-	output_df = output_df.drop_duplicates(subset = "pos_id", keep = "first")
-	output_df = output_df.reset_index()
-	output_df["event_id_num"] = output_df.index + 1
-	output_df["event_id"] = "MXE_" + output_df["event_id_num"].astype(str)
-	output_df = output_df[["event_id", "pos_id", "exon_a", "exon_b", "intron_a1", "intron_a2", "intron_b1", "intron_b2", "strand", "gene_id", "gene_name"]]
-
-	logger.debug("Creating label....")
-	if reference_gtf_path:
-		output_df["label"] = output_df.apply(lambda x: "annotated" if (x["intron_a1"] in gtf_ref_intron_set) and (x["intron_a2"] in gtf_ref_intron_set) and (x["intron_b1"] in gtf_ref_intron_set) and (x["intron_b2"] in gtf_ref_intron_set) else "unannotated", axis = 1)
-	else:
-		output_df["label"] = "annotated"
-	output_df_dict["MXE"] = output_df
-	del output_df
-
-	logger.info("Mutually exclusive exon search completed.")
-
-	#################################### Retained intron (RI) ####################################
-
-	logger.info("Searching retained intron (RI)....")
-	with concurrent.futures.ProcessPoolExecutor(max_workers=num_process) as executor:
-		futures = [executor.submit(ri, gtf_dic_split[i]) for i in range(num_process)]
-	output_l = []
-	logger.debug("Waiting for retained intron search to complete....")
-	for future in concurrent.futures.as_completed(futures):
-		output_l += future.result()
-	output_df = pd.DataFrame(
-		output_l,
-		columns = ["exon_a", "exon_b", "exon_c", "intron_a", "strand", "gene_id", "gene_name"]
-	)
-
-	logger.debug("Creating event_id....")
-	output_df["pos_id"] = \
-		"RI@" + \
-		output_df["intron_a"].str.replace(":", "@")
-	output_df = output_df.sort_values("exon_a")
-	output_df = output_df.drop_duplicates(subset = "pos_id", keep = "first")
-	output_df = output_df.reset_index()
-	output_df["event_id_num"] = output_df.index + 1
-	output_df["event_id"] = "RI_" + output_df["event_id_num"].astype(str)
-	output_df = output_df[["event_id", "pos_id", "exon_a", "exon_b", "exon_c", "intron_a", "strand", "gene_id", "gene_name"]]
-
-	logger.debug("Creating label....")
-	if reference_gtf_path:
-		output_df["label"] = output_df.apply(lambda x: "annotated" if (x["intron_a"] in gtf_ref_intron_set) and (x["exon_c"] in gtf_ref_exon_set) else "unannotated", axis = 1)
-	else:
-		output_df["label"] = "annotated"
-	output_df_dict["RI"] = output_df
-	del output_df
-
-	logger.info("Retained intron search completed.")
-
-	#################################### Multiple skipped exons (MSE) ####################################
-
-	logger.info("Searching multiple skipped exons (MSE)....")
-	with concurrent.futures.ProcessPoolExecutor(max_workers=num_process) as executor:
-		futures = [executor.submit(mse, gtf_dic_split[i]) for i in range(num_process)]
-	output_l = []
-	logger.debug("Waiting for multiple skipped exons search to complete....")
-	for future in concurrent.futures.as_completed(futures):
-		output_l += future.result()
-	output_df = pd.DataFrame(
-		output_l,
-		columns = ["exon", "intron", "mse_n", "strand", "gene_id", "gene_name"]
-	)
-
-	logger.debug("Creating event_id....")
-	# pos_id = chromosome@exon_start-exon_end;exon_start-exon_end@exclusionintron_start-exclusionintron_end
-	output_df["chr"] = output_df["exon"].str.split(":", expand = True)[0]
-	output_df["exon_for_posid"] = output_df.apply(lambda x: x["exon"].replace(x["chr"] + ":", ""), axis = 1)
-	output_df["exc"] = output_df["intron"].apply(lambda x: x.split(";")[-1])
-	output_df["pos_id"] = \
-		"MSE@" + \
-		output_df["chr"] + "@" + \
-		output_df["exon_for_posid"] + "@" + \
-		output_df["exc"].str.split(":", expand = True)[1].str.split("-", expand = True)[0].astype(str) + "-" + output_df["exc"].str.split(":", expand = True)[1].str.split("-", expand = True)[1].astype(str)
-	output_df = output_df.sort_values("exon")
-	output_df = output_df.drop_duplicates(subset = "pos_id", keep = "first")
-	output_df = output_df.reset_index()
-	output_df["event_id_num"] = output_df.index + 1
-	output_df["event_id"] = "MSE_" + output_df["event_id_num"].astype(str)
-	output_df = output_df[["event_id", "pos_id", "mse_n", "exon", "intron", "strand", "gene_id", "gene_name"]]
-
-	logger.debug("Creating label....")
-	# Check if the intron is annotated
-	if reference_gtf_path:
-		output_df["label"] = output_df["intron"].apply(lambda x: "annotated" if set(x.split(";")) <= gtf_ref_intron_set else "unannotated")
-	else:
-		output_df["label"] = "annotated"
-	output_df_dict["MSE"] = output_df
-	del output_df
-
-	logger.info("Multiple skipped exons search completed.")
-
-	#################################### Alternative first exons (AFE) ####################################
-
-	logger.info("Searching alternative first exons (AFE)....")
-	with concurrent.futures.ProcessPoolExecutor(max_workers=num_process) as executor:
-		futures = [executor.submit(afe, gtf_dic_split[i]) for i in range(num_process)]
-	output_l = []
-	logger.debug("Waiting for alternative first exons search to complete....")
-	for future in concurrent.futures.as_completed(futures):
-		output_l += future.result()
-	output_df = pd.DataFrame(
-		output_l,
-		columns = ["exon_a", "exon_b", "intron_a", "intron_b", "strand", "gene_id", "gene_name"]
-	)
-
-	logger.debug("Creating event_id....")
-	output_df["pos_id"] = \
-		"AFE@" + \
-		output_df["intron_a"].str.split(":", expand = True)[0].astype(str) + "@" + \
-		output_df["intron_a"].str.split(":", expand = True)[1].str.split("-", expand = True)[0].astype(str) + "-" + output_df["intron_a"].str.split(":", expand = True)[1].str.split("-", expand = True)[1].astype(str) + "@" + \
-		output_df["intron_b"].str.split(":", expand = True)[1].str.split("-", expand = True)[0].astype(str) + "-" + output_df["intron_b"].str.split(":", expand = True)[1].str.split("-", expand = True)[1].astype(str)
-	output_df["chr"] = output_df["exon_a"].str.split(":", expand = True)[0]
-	output_df["intron_for_posid"] = output_df.apply(lambda x: x["intron_a"].replace(x["chr"] + ":", "") + ";" + x["intron_b"].replace(x["chr"] + ":", ""), axis = 1)
-	output_df = output_df.sort_values(["exon_a", "exon_b"], ascending = [True, True])
-	output_df = output_df.drop_duplicates(subset = "intron_for_posid", keep = "first")
-	output_df = output_df.reset_index()
-	output_df["event_id_num"] = output_df.index + 1
-	output_df["event_id"] = "AFE_" + output_df["event_id_num"].astype(str)
-	output_df = output_df[["event_id", "pos_id", "exon_a", "exon_b", "intron_a", "intron_b", "strand", "gene_id", "gene_name"]]
-
-	logger.debug("Creating label....")
-	# Check if the intron is annotated
-	if reference_gtf_path:
-		output_df["label"] = output_df.apply(lambda x: "annotated" if (x["intron_a"] in gtf_ref_intron_set) and (x["intron_b"] in gtf_ref_intron_set) else "unannotated", axis = 1)
-	else:
-		output_df["label"] = "annotated"
-	output_df_dict["AFE"] = output_df
-	del output_df
-
-	logger.info("Alternative first exons search completed.")
-
-	################################### Alternative last exons (ALE) ###################################
-
-	logger.info("Searching alternative last exons (ALE)....")
-	with concurrent.futures.ProcessPoolExecutor(max_workers=num_process) as executor:
-		futures = [executor.submit(ale, gtf_dic_split[i]) for i in range(num_process)]
-	output_l = []
-	logger.debug("Waiting for alternative last exons search to complete....")
-	for future in concurrent.futures.as_completed(futures):
-		output_l += future.result()
-	output_df = pd.DataFrame(
-		output_l,
-		columns = ["exon_a", "exon_b", "intron_a", "intron_b", "strand", "gene_id", "gene_name"]
-	)
-
-	logger.debug("Creating event_id....")
-	output_df["pos_id"] = \
-		"ALE@" + \
-		output_df["intron_a"].str.split(":", expand = True)[0].astype(str) + "@" + \
-		output_df["intron_a"].str.split(":", expand = True)[1].str.split("-", expand = True)[0].astype(str) + "-" + output_df["intron_a"].str.split(":", expand = True)[1].str.split("-", expand = True)[1].astype(str) + "@" + \
-		output_df["intron_b"].str.split(":", expand = True)[1].str.split("-", expand = True)[0].astype(str) + "-" + output_df["intron_b"].str.split(":", expand = True)[1].str.split("-", expand = True)[1].astype(str)
-	output_df["chr"] = output_df["exon_a"].str.split(":", expand = True)[0]
-	output_df["intron_for_posid"] = output_df.apply(lambda x: x["intron_a"].replace(x["chr"] + ":", "") + ";" + x["intron_b"].replace(x["chr"] + ":", ""), axis = 1)
-	output_df = output_df.sort_values(["exon_a", "exon_b"], ascending = [True, True])
-	output_df = output_df.drop_duplicates(subset = "intron_for_posid", keep = "first")
-	output_df = output_df.reset_index()
-	output_df["event_id_num"] = output_df.index + 1
-	output_df["event_id"] = "ALE_" + output_df["event_id_num"].astype(str)
-	output_df = output_df[["event_id", "pos_id", "exon_a", "exon_b", "intron_a", "intron_b", "strand", "gene_id", "gene_name"]]
-
-	logger.debug("Creating label....")
-	# Check if the intron is annotated
-	if reference_gtf_path:
-		output_df["label"] = output_df.apply(lambda x: "annotated" if (x["intron_a"] in gtf_ref_intron_set) and (x["intron_b"] in gtf_ref_intron_set) else "unannotated", axis = 1)
-	else:
-		output_df["label"] = "annotated"
-	output_df_dict["ALE"] = output_df
-	del output_df
-
-	logger.info("Alternative last exons search completed.")
-
-	#################################### Complex events (CO) ####################################
-
-	logger.info("Searching complex events (CO)....")
-	with concurrent.futures.ProcessPoolExecutor(max_workers=num_process) as executor:
-		futures = [executor.submit(complex_events, gtf_dic_split[i]) for i in range(num_process)]
-	output_l = []
-	logger.debug("Waiting for complex events search to complete....")
-	for future in concurrent.futures.as_completed(futures):
-		output_l += future.result()
-	output_df = pd.DataFrame(
-		output_l,
-		columns = ["included_exons", "excluded_exons", "pre_exon", "post_exon", "strand", "gene_id", "gene_name", "included_transcript", "excluded_transcript"]
-	)
-
-	logger.debug("Creating event_id....")
-	output_df["pos_id"] = \
-		"CO@" + \
-		output_df["pre_exon"].str.split(":", expand = True)[0].astype(str) + "@" + \
-		output_df["pre_exon"].str.split(":", expand = True)[1].str.split("-", expand = True)[0].astype(str) + "-" + output_df["pre_exon"].str.split(":", expand = True)[1].str.split("-", expand = True)[1].astype(str) + "@" + \
-		output_df["post_exon"].str.split(":", expand = True)[1].str.split("-", expand = True)[0].astype(str) + "-" + output_df["post_exon"].str.split(":", expand = True)[1].str.split("-", expand = True)[1].astype(str)
-	output_df = output_df.sort_values("included_exons")
-	output_df = output_df.drop_duplicates(subset = "pos_id", keep = "first")
-	output_df = output_df.reset_index()
-	output_df["event_id_num"] = output_df.index + 1
-	output_df["event_id"] = "CO_" + output_df["event_id_num"].astype(str)
-	output_df = output_df[["event_id", "pos_id", "included_exons", "excluded_exons", "pre_exon", "post_exon", "strand", "gene_id", "gene_name", "included_transcript", "excluded_transcript"]]
-
-	logger.debug("Creating label....")
-	if reference_gtf_path:
-		output_df["label"] = "unannotated"  # 复杂事件默认为未注释
-	else:
-		output_df["label"] = "annotated"
-	output_df_dict["CO"] = output_df
-	del output_df
-
-	logger.info("Complex events search completed.")
-
-	#################################### Complex first events (CF) ####################################
-
-	logger.info("Searching complex first events (CF)....")
-	with concurrent.futures.ProcessPoolExecutor(max_workers=num_process) as executor:
-		futures = [executor.submit(complex_first_events, gtf_dic_split[i]) for i in range(num_process)]
-	output_l = []
-	logger.debug("Waiting for complex first events search to complete....")
-	for future in concurrent.futures.as_completed(futures):
-		output_l += future.result()
-	output_df = pd.DataFrame(
-		output_l,
-		columns = ["included_exons", "excluded_exons", "post_exon", "strand", "gene_id", "gene_name", "included_transcript", "excluded_transcript"]
-	)
-
-	logger.debug("Creating event_id....")
-	output_df["pos_id"] = \
-		"CF@" + \
-		output_df["post_exon"].str.split(":", expand = True)[0].astype(str) + "@" + \
-		output_df["post_exon"].str.split(":", expand = True)[1].str.split("-", expand = True)[0].astype(str) + "-" + output_df["post_exon"].str.split(":", expand = True)[1].str.split("-", expand = True)[1].astype(str)
-	output_df = output_df.sort_values("included_exons")
-	output_df = output_df.drop_duplicates(subset = "pos_id", keep = "first")
-	output_df = output_df.reset_index()
-	output_df["event_id_num"] = output_df.index + 1
-	output_df["event_id"] = "CF_" + output_df["event_id_num"].astype(str)
-	output_df = output_df[["event_id", "pos_id", "included_exons", "excluded_exons", "post_exon", "strand", "gene_id", "gene_name", "included_transcript", "excluded_transcript"]]
-
-	logger.debug("Creating label....")
-	if reference_gtf_path:
-		output_df["label"] = "unannotated"  # 复杂事件默认为未注释
-	else:
-		output_df["label"] = "annotated"
-	output_df_dict["CF"] = output_df
-	del output_df
-
-	logger.info("Complex first events search completed.")
-
-	#################################### Complex last events (CL) ####################################
-
-	logger.info("Searching complex last events (CL)....")
-	with concurrent.futures.ProcessPoolExecutor(max_workers=num_process) as executor:
-		futures = [executor.submit(complex_last_events, gtf_dic_split[i]) for i in range(num_process)]
-	output_l = []
-	logger.debug("Waiting for complex last events search to complete....")
-	for future in concurrent.futures.as_completed(futures):
-		output_l += future.result()
-	output_df = pd.DataFrame(
-		output_l,
-		columns = ["included_exons", "excluded_exons", "pre_exon", "strand", "gene_id", "gene_name", "included_transcript", "excluded_transcript"]
-	)
-
-	logger.debug("Creating event_id....")
-	output_df["pos_id"] = \
-		"CL@" + \
-		output_df["pre_exon"].str.split(":", expand = True)[0].astype(str) + "@" + \
-		output_df["pre_exon"].str.split(":", expand = True)[1].str.split("-", expand = True)[0].astype(str) + "-" + output_df["pre_exon"].str.split(":", expand = True)[1].str.split("-", expand = True)[1].astype(str)
-	output_df = output_df.sort_values("included_exons")
-	output_df = output_df.drop_duplicates(subset = "pos_id", keep = "first")
-	output_df = output_df.reset_index()
-	output_df["event_id_num"] = output_df.index + 1
-	output_df["event_id"] = "CL_" + output_df["event_id_num"].astype(str)
-	output_df = output_df[["event_id", "pos_id", "included_exons", "excluded_exons", "pre_exon", "strand", "gene_id", "gene_name", "included_transcript", "excluded_transcript"]]
-
-	logger.debug("Creating label....")
-	if reference_gtf_path:
-		output_df["label"] = "unannotated"  # 复杂事件默认为未注释
-	else:
-		output_df["label"] = "annotated"
-	output_df_dict["CL"] = output_df
-	del output_df
-
-	logger.info("Complex last events search completed.")
+		logger.info(f"Loading {gtf_path}....")
+		gtf_df_iter = iter([annotation.exon_table(gtf_path, cache_dir)])
+
+	event_output_dic = {event_type: [] for event_type in event_types}
+	runtime_df_l = []
+	# A pool forked for each part of the gene model inherits it, otherwise one pool is reused and the model is pickled to it
+	executor = None if parallel.fork_available() else concurrent.futures.ProcessPoolExecutor(max_workers = num_process)
+	try:
+		for gtf_df in gtf_df_iter:
+			gtf_dic = gtf(gtf_df)
+			chr_l = sorted(set(gene_dic["chr"] for gene_dic in gtf_dic.values())) if stream else None
+			del gtf_df
+			profile_stage(stage_l, "gene_model", start_time, chr = chr_l, gene_num = len(gtf_dic))
+			start_time = time.perf_counter()
+			if stream:
+				logger.debug(f"Searching events in {len(gtf_dic)} genes of {', '.join(chr_l)}....")
+			else:
+				logger.info("Searching " + ", ".join(event_types) + " events....")
+			if incremental:
+				chunk_event_dic, runtime_df = incremental_search_events(gtf_dic, event_types, num_process, event_cache, new_event_cache, measure_runtime, detector_kwargs, executor)
+			else:
+				chunk_event_dic, runtime_df = search_events(gtf_dic, event_types, num_process, measure_runtime, detector_kwargs, executor)
+			del gtf_dic
+			for event_type in event_types:
+				event_output_dic[event_type] += chunk_event_dic[event_type]
+			runtime_df_l.append(runtime_df)
+			profile_stage(stage_l, "event_search", start_time, chr = chr_l)
+			start_time = time.perf_counter()
+	finally:
+		if executor is not None:
+			executor.shutdown()
+
+	if incremental:
+		save_event_cache(event_cache_path, new_event_cache)
+	if gene_runtime_path:
+		logger.info(f"Writing runtime of each gene to {gene_runtime_path}....")
+		os.makedirs(os.path.dirname(os.path.abspath(gene_runtime_path)), exist_ok = True)
+		gene_runtime_df = pd.concat(runtime_df_l).groupby(["gene_id", "exon_num", "transcript_num", "cost"], sort = False)["runtime"].sum().reset_index()
+		gene_runtime_df = gene_runtime_df.sort_values("runtime", ascending = False)
+		gene_runtime_df.to_csv(gene_runtime_path, sep = "\t", index = False)
+
+	logger.info("Creating event tables....")
+	start_time = time.perf_counter()
+	output_df_dict = {}
+	for event_type in event_types:
+		logger.debug(f"Creating table of {event_type}....")
+		output_df_dict[event_type] = event_table(
+			event_type,
+			event_output_dic[event_type],
+			gtf_ref_intron_set if reference_gtf_path else None,
+			gtf_ref_exon_set if reference_gtf_path else None
+		)
+		logger.debug(f"Number of {event_type} events: {output_df_dict[event_type].shape[0]}")
+	profile_stage(stage_l, "event_tables", start_time)
 
 	#################################### Event search end #########################################
 
 	### Export
 	logger.info("Exporting results....")
+	start_time = time.perf_counter()
 	os.makedirs(output_dir, exist_ok = True)
 	for EVENT in output_df_dict.keys():
 		logger.debug(f"Exporting {EVENT}....")
@@ -1762,6 +1776,14 @@ def main():
 			index = False
 		)
 
+	profile_stage(stage_l, "export", start_time)
+
+	if profile:
+		profile_path = os.path.join(output_dir, "profile.json")
+		logger.info(f"Writing profile to {profile_path}....")
+		with open(profile_path, "w") as f:
+			json.dump(profile_report(pd.concat(runtime_df_l), stage_l), f, indent = "\t", default = lambda x: x.item())
+
 	logger.info("Event search completed.")
 
 if __name__ == '__main__':
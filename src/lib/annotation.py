@@ -0,0 +1,394 @@
+import os
+import re
+import shutil
+import hashlib
+import pickle
+import tempfile
+import logging
+import numpy as np
+import pandas as pd
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+"""
+Reads exons of a GTF file into a table sorted by gene, transcript and position, and caches the table on disk.
+"""
+
+# Bump when the layout or the content of the cached exon table changes
+CACHE_VERSION = 1
+# Integer columns of the exon table
+INT_COLUMNS = ["start", "end"]
+# String columns of the exon table, cached as category codes and categories
+STR_COLUMNS = ["chr", "strand", "gene_id", "gene_name", "transcript_id"]
+
+def gtf_attributes(information) -> pd.DataFrame:
+	"""
+	Extracts gene and transcript columns from the attribute column of a GTF file.
+
+	Attributes of all rows are joined into one string and each key is searched in one pass,
+	instead of splitting every row into a dictionary.
+
+	Args:
+		information (pd.Series): The attribute column of a GTF file.
+
+	Returns:
+		pd.DataFrame: A DataFrame with gene_id, gene_name and transcript_id columns, indexed like information.
+	"""
+
+	information_l = information.tolist()
+	text = "\n" + "\n".join(information_l)
+	row_len = np.fromiter(map(len, information_l), dtype = "int64")
+	row_start = np.cumsum(row_len + 1) - row_len
+	# Character offsets equal byte offsets for ASCII text
+	text_bytes = np.frombuffer(text.encode("ascii"), dtype = "uint8") if text.isascii() else None
+
+	def extract(key):
+		# Quoted or unquoted value after every occurrence of the key
+		pattern = re.compile(key + r' (?:"([^"]*)"|([^\s;"]*))')
+		match_l = pattern.findall(text)
+		value = pd.Series(np.nan, index = information.index, dtype = "object")
+		if len(match_l) == 0:
+			return(value)
+		# Match positions from the lengths of the pieces between occurrences, which is much faster than finditer
+		piece_len = np.fromiter(map(len, text.split(key + " ")), dtype = "int64")
+		if (len(piece_len) == len(match_l) + 1) and (text_bytes is not None):
+			match_pos = np.cumsum(piece_len[:-1]) + np.arange(len(match_l), dtype = "int64") * (len(key) + 1)
+			# Skip keys that are suffixes of other keys (e.g. gene_id in ref_gene_id)
+			is_key = np.isin(text_bytes[match_pos - 1], np.frombuffer(b"\n; ", dtype = "uint8"))
+		else:
+			match_pos = np.array([m.start() for m in pattern.finditer(text)], dtype = "int64")
+			is_key = np.array([text[i - 1] in "\n; " for i in match_pos.tolist()], dtype = bool)
+		match_value = np.array([quoted or unquoted for quoted, unquoted in match_l], dtype = "object")[is_key]
+		match_row = np.searchsorted(row_start, match_pos[is_key], side = "right") - 1
+		# The first occurrence in each row
+		match_row, first_idx = np.unique(match_row, return_index = True)
+		value.iloc[match_row] = match_value[first_idx]
+		return(value)
+
+	def most_common(key, value):
+		# The most common value for each key, ties are broken by first appearance
+		count_df = pd.DataFrame({"key": key, "value": value}).dropna().groupby(["key", "value"], sort = False).size().reset_index(name = "count")
+		count_df = count_df.sort_values("count", ascending = False, kind = "mergesort").drop_duplicates("key")
+		return(pd.Series(count_df["value"].values, index = count_df["key"].values))
+
+	gene_id = extract("gene_id")
+	ref_gene_id = extract("ref_gene_id")
+	gene_name = extract("gene_name")
+	transcript_id = extract("transcript_id")
+
+	attribute_df = pd.DataFrame({
+		"gene_id": ref_gene_id.fillna(gene_id),
+		"gene_name": gene_name.fillna(ref_gene_id).fillna(gene_id),
+		"transcript_id": transcript_id
+	})
+	attribute_df["gene_id"] = attribute_df["gene_id"].map(most_common(gene_id, ref_gene_id)).fillna(attribute_df["gene_id"])
+	attribute_df["gene_name"] = attribute_df["gene_name"].map(most_common(gene_id, gene_name)).fillna(attribute_df["gene_name"])
+
+	return(attribute_df)
+
+# Columns of a GTF file read: chromosome, feature, start, end, strand and attributes
+GTF_COLUMNS = [0, 2, 3, 4, 6, 8]
+GTF_DTYPES = {
+	0: "str",
+	2: "str",
+	3: "int32",
+	4: "int32",
+	6: "str",
+	8: "str"
+}
+
+def gtf_exons(gtf_df) -> pd.DataFrame:
+	"""
+	Makes an exon table from the rows of a GTF file.
+
+	Args:
+		gtf_df (pd.DataFrame): Columns 0, 2, 3, 4, 6 and 8 of a GTF file.
+
+	Returns:
+		pd.DataFrame: A DataFrame with chr, start, end, strand, gene_id, gene_name and transcript_id columns,
+			sorted by gene_id, transcript_id and start.
+	"""
+
+	gtf_df = gtf_df[gtf_df[2] == "exon"]
+	gtf_df = gtf_df.reset_index()
+	gtf_df = gtf_df[[0, 3, 4, 6, 8]]
+	gtf_df.columns = ["chr", "start", "end", "strand", "information"]
+	gtf_df = pd.concat([gtf_df, gtf_attributes(gtf_df["information"])], axis = 1)
+	gtf_df.loc[(~(gtf_df["chr"].str.startswith("chr")) & (gtf_df["chr"].str.len() <= 2)), "chr"] = "chr" + gtf_df["chr"]
+
+	gtf_df = gtf_df.sort_values(["gene_id", "transcript_id", "start"])
+	gtf_df = gtf_df.reset_index(drop = True)
+	gtf_df = gtf_df[["chr", "start", "end", "strand", "gene_id", "gene_name", "transcript_id"]]
+
+	return(gtf_df)
+
+def read_gtf(gtf_path) -> pd.DataFrame:
+	"""
+	Reads exons of a GTF file.
+
+	Args:
+		gtf_path (str): The path to the GTF file.
+
+	Returns:
+		pd.DataFrame: An exon table made by gtf_exons().
+	"""
+
+	gtf_df = pd.read_csv(
+		gtf_path,
+		sep = "\t",
+		usecols = GTF_COLUMNS,
+		dtype = GTF_DTYPES,
+		comment = "#",
+		header = None
+	)
+
+	return(gtf_exons(gtf_df))
+
+def iter_gtf(gtf_path, chunk_size = 1000000):
+	"""
+	Reads exons of a GTF file one chromosome at a time.
+
+	The file is read in chunks of rows, and the exon rows of each chromosome are spilled to a temporary file,
+	so that only one chunk and then one chromosome are kept in memory, whether the file is sorted or not.
+
+	Args:
+		gtf_path (str): The path to the GTF file.
+		chunk_size (int): Number of rows to read at a time.
+
+	Yields:
+		pd.DataFrame: An exon table made by gtf_exons() for each chromosome, in the order of first appearance in the file.
+	"""
+
+	reader = pd.read_csv(
+		gtf_path,
+		sep = "\t",
+		usecols = GTF_COLUMNS,
+		dtype = GTF_DTYPES,
+		comment = "#",
+		header = None,
+		chunksize = chunk_size
+	)
+	with tempfile.TemporaryDirectory(prefix = "shiba_gtf_") as tmp_dir:
+		chr_path_dic = {}
+		for chunk in reader:
+			chunk = chunk[chunk[2] == "exon"]
+			for chr, chr_chunk in chunk.groupby(0, sort = False):
+				if chr not in chr_path_dic:
+					chr_path_dic[chr] = os.path.join(tmp_dir, f"{len(chr_path_dic)}.pkl")
+				with open(chr_path_dic[chr], "ab") as f:
+					pickle.dump(chr_chunk, f, protocol = pickle.HIGHEST_PROTOCOL)
+		del reader
+		for chr_path in chr_path_dic.values():
+			chunk_l = []
+			with open(chr_path, "rb") as f:
+				while True:
+					try:
+						chunk_l.append(pickle.load(f))
+					except EOFError:
+						break
+			os.remove(chr_path)
+			yield(gtf_exons(pd.concat(chunk_l)))
+
+def file_hash(path) -> str:
+	"""
+	Computes the SHA-256 digest of the content of a file.
+
+	Args:
+		path (str): The path to the file.
+
+	Returns:
+		str: The hexadecimal digest.
+	"""
+
+	sha256 = hashlib.sha256()
+	with open(path, "rb") as f:
+		for chunk in iter(lambda: f.read(1 << 20), b""):
+			sha256.update(chunk)
+	return(sha256.hexdigest())
+
+def save_exon_table(gtf_df, cache_path) -> None:
+	"""
+	Saves an exon table as .npy files in a directory.
+
+	Integer columns are saved as they are, and string columns are saved as category codes and
+	fixed-width categories so that every file can be memory-mapped without unpickling.
+	The directory is written next to cache_path and renamed at the end, so that concurrent runs never read a partial cache.
+
+	Args:
+		gtf_df (pd.DataFrame): An exon table returned by read_gtf().
+		cache_path (str): The path to the cache directory.
+	"""
+
+	cache_root = os.path.dirname(os.path.abspath(cache_path))
+	os.makedirs(cache_root, exist_ok = True)
+	tmp_path = tempfile.mkdtemp(dir = cache_root, prefix = ".tmp_")
+	try:
+		for column in INT_COLUMNS:
+			np.save(os.path.join(tmp_path, column + ".npy"), gtf_df[column].values.astype("int32"))
+		for column in STR_COLUMNS:
+			codes, categories = pd.factorize(gtf_df[column], sort = True)
+			np.save(os.path.join(tmp_path, column + ".codes.npy"), codes.astype("int32"))
+			np.save(os.path.join(tmp_path, column + ".categories.npy"), np.array(categories, dtype = "str"))
+		os.rename(tmp_path, cache_path)
+	except OSError:
+		# Another run has written the same cache in the meantime
+		shutil.rmtree(tmp_path, ignore_errors = True)
+		if not os.path.isdir(cache_path):
+			raise
+
+def load_exon_table(cache_path) -> pd.DataFrame:
+	"""
+	Loads an exon table saved by save_exon_table().
+
+	Args:
+		cache_path (str): The path to the cache directory.
+
+	Returns:
+		pd.DataFrame: An exon table, in which integer columns are memory-mapped and string columns are categorical.
+	"""
+
+	gtf_dic = {}
+	for column in INT_COLUMNS:
+		gtf_dic[column] = np.load(os.path.join(cache_path, column + ".npy"), mmap_mode = "r")
+	for column in STR_COLUMNS:
+		codes = np.load(os.path.join(cache_path, column + ".codes.npy"), mmap_mode = "r")
+		categories = np.load(os.path.join(cache_path, column + ".categories.npy"), mmap_mode = "r")
+		gtf_dic[column] = pd.Categorical.from_codes(codes, categories = categories.astype("object"))
+	gtf_df = pd.DataFrame(gtf_dic, copy = False)[["chr", "start", "end", "strand", "gene_id", "gene_name", "transcript_id"]]
+	return(gtf_df)
+
+def exon_table(gtf_path, cache_dir = None) -> pd.DataFrame:
+	"""
+	Reads exons of a GTF file, using an on-disk cache keyed on the content of the file.
+
+	Args:
+		gtf_path (str): The path to the GTF file.
+		cache_dir (str): Directory of the cache. No cache is used if None.
+
+	Returns:
+		pd.DataFrame: An exon table as returned by read_gtf().
+	"""
+
+	if cache_dir is None:
+		return(read_gtf(gtf_path))
+
+	cache_path = os.path.join(cache_dir, f"{file_hash(gtf_path)}.v{CACHE_VERSION}")
+	if os.path.isdir(cache_path):
+		logger.debug(f"Loading cached exon table from {cache_path}....")
+		return(load_exon_table(cache_path))
+
+	gtf_df = read_gtf(gtf_path)
+	logger.debug(f"Saving exon table to {cache_path}....")
+	try:
+		save_exon_table(gtf_df, cache_path)
+	except OSError as e:
+		logger.warning(f"Failed to save exon table to {cache_path}: {e}")
+	return(gtf_df)
+
+def reference_coordinates(gtf_df) -> tuple:
+	"""
+	Makes the exon and intron coordinates of an exon table used to label events as annotated.
+
+	Introns are taken between adjacent exons of each transcript, in genes with two or more transcripts as in the gene model of gtf2event.
+	All rows are handled at once with array operations, without building a gene model.
+
+	Args:
+		gtf_df (pd.DataFrame): An exon table returned by exon_table().
+
+	Returns:
+		tuple: Arrays of unique exon and intron coordinates in the format "chr:start-end".
+	"""
+
+	def coordinates(chr, start, end):
+		# Formats unique coordinates only, as exons and introns are shared by many transcripts
+		coordinate_df = pd.DataFrame({"chr": chr, "start": start, "end": end}).drop_duplicates()
+		return(np.array([f"{c}:{s}-{e}" for c, s, e in zip(coordinate_df["chr"].tolist(), coordinate_df["start"].tolist(), coordinate_df["end"].tolist())], dtype = "object"))
+
+	chr = np.asarray(gtf_df["chr"], dtype = "object")
+	start = np.asarray(gtf_df["start"], dtype = "int64")
+	end = np.asarray(gtf_df["end"], dtype = "int64")
+	exon = coordinates(chr, start, end)
+
+	gene_code = pd.factorize(gtf_df["gene_id"])[0]
+	transcript_code = pd.factorize(gtf_df["transcript_id"])[0]
+	order = np.lexsort((end, start, transcript_code, gene_code))
+	chr, gene_code, transcript_code, start, end = chr[order], gene_code[order], transcript_code[order], start[order], end[order]
+	same_gene = gene_code[1:] == gene_code[:-1]
+	same_transcript = same_gene & (transcript_code[1:] == transcript_code[:-1])
+	# Number of transcripts and chromosome (of the last row) of each gene
+	transcript_n = np.bincount(gene_code[np.r_[True, ~same_transcript]], minlength = gene_code.max() + 1 if len(gene_code) > 0 else 0)
+	gene_chr = np.empty(len(transcript_n), dtype = "object")
+	gene_chr[gene_code[np.r_[~same_gene, True]]] = chr[np.r_[~same_gene, True]]
+	# Introns between adjacent distinct exons of transcripts in genes with two or more transcripts
+	is_intron = np.flatnonzero(same_transcript & (transcript_n[gene_code[:-1]] >= 2) & ((start[1:] != start[:-1]) | (end[1:] != end[:-1])))
+	intron = coordinates(gene_chr[gene_code[is_intron]], end[is_intron], start[is_intron + 1])
+
+	return(exon, intron)
+
+def reference_sets(gtf_path, cache_dir = None) -> tuple:
+	"""
+	Reads exon and intron coordinates of a reference GTF file, using an on-disk cache keyed on the content of the file.
+
+	Args:
+		gtf_path (str): The path to the GTF file.
+		cache_dir (str): Directory of the cache. No cache is used if None.
+
+	Returns:
+		tuple: Sets of exon and intron coordinates in the format "chr:start-end".
+	"""
+
+	cache_path = os.path.join(cache_dir, f"{file_hash(gtf_path)}.v{CACHE_VERSION}.reference") if cache_dir else None
+	if (cache_path is not None) and os.path.isdir(cache_path):
+		logger.debug(f"Loading cached reference coordinates from {cache_path}....")
+		exon = np.load(os.path.join(cache_path, "exon.npy"))
+		intron = np.load(os.path.join(cache_path, "intron.npy"))
+		return(set(exon.tolist()), set(intron.tolist()))
+
+	exon, intron = reference_coordinates(exon_table(gtf_path, cache_dir))
+	if cache_path is not None:
+		logger.debug(f"Saving reference coordinates to {cache_path}....")
+		cache_root = os.path.dirname(os.path.abspath(cache_path))
+		tmp_path = tempfile.mkdtemp(dir = cache_root, prefix = ".tmp_")
+		try:
+			np.save(os.path.join(tmp_path, "exon.npy"), np.array(exon, dtype = "str"))
+			np.save(os.path.join(tmp_path, "intron.npy"), np.array(intron, dtype = "str"))
+			os.rename(tmp_path, cache_path)
+		except OSError as e:
+			# Another run has written the same cache in the meantime
+			shutil.rmtree(tmp_path, ignore_errors = True)
+			if not os.path.isdir(cache_path):
+				logger.warning(f"Failed to save reference coordinates to {cache_path}: {e}")
+	return(set(exon.tolist()), set(intron.tolist()))
+
+def iter_exon_tables(gtf_path, cache_dir = None):
+	"""
+	Reads exons of a GTF file one chromosome at a time, from the on-disk cache of exon_table() if there is one.
+
+	A cached table is memory-mapped, so only the rows of one chromosome are copied at a time.
+	Without a cache, the GTF file is streamed by iter_gtf() and no cache is written, as that would need the whole table.
+
+	Args:
+		gtf_path (str): The path to the GTF file.
+		cache_dir (str): Directory of the cache. No cache is used if None.
+
+	Yields:
+		pd.DataFrame: An exon table as returned by read_gtf() for each chromosome.
+	"""
+
+	cache_path = os.path.join(cache_dir, f"{file_hash(gtf_path)}.v{CACHE_VERSION}") if cache_dir else None
+	if (cache_path is None) or (not os.path.isdir(cache_path)):
+		yield from iter_gtf(gtf_path)
+		return
+
+	logger.debug(f"Loading cached exon table from {cache_path}....")
+	gtf_df = load_exon_table(cache_path)
+	chr_code = gtf_df["chr"].cat.codes.values
+	# Rows of each chromosome, keeping the order by gene, transcript and position
+	order = np.argsort(chr_code, kind = "stable")
+	bound = np.r_[0, np.flatnonzero(np.diff(chr_code[order])) + 1, len(order)]
+	for first, last in zip(bound[:-1].tolist(), bound[1:].tolist()):
+		chr_df = gtf_df.iloc[order[first:last]].reset_index(drop = True)
+		for column in STR_COLUMNS:
+			chr_df[column] = chr_df[column].cat.remove_unused_categories()
+		yield(chr_df)
@@ -0,0 +1,52 @@
+import argparse
+
+"""
+Event types analyzed by Shiba and scShiba, and parsing of lists of event types given on the command line or in a
+configuration file. This module only uses the standard library, so that it can be imported by gtf2event.py, the
+pipeline wrappers and the Snakefiles.
+"""
+
+# Event types for which PSI is calculated, in the order of output
+EVENT_TYPES = ["SE", "FIVE", "THREE", "MXE", "RI", "MSE", "AFE", "ALE"]
+# Event types for which PSI is calculated in single cell data
+EVENT_TYPES_SC = ["SE", "FIVE", "THREE", "MXE", "MSE", "AFE", "ALE"]
+
+
+def event_type_list(value, event_types = EVENT_TYPES) -> list:
+    """
+    Parses a comma-separated list of event types given with --events.
+
+    Args:
+    - value (str): Event types separated by commas, e.g. "SE,MXE".
+    - event_types (list): Event types to choose from.
+
+    Returns:
+    - list: The selected event types in the order of event_types.
+    """
+
+    selected_event_types = [event_type.strip() for event_type in value.split(",") if event_type.strip()]
+    unknown_event_types = [event_type for event_type in selected_event_types if event_type not in event_types]
+    if unknown_event_types or not selected_event_types:
+        raise argparse.ArgumentTypeError(f"invalid event types: {value} (choose from {','.join(event_types)})")
+
+    return([event_type for event_type in event_types if event_type in selected_event_types])
+
+
+def config_event_types(value, event_types = EVENT_TYPES) -> list:
+    """
+    Parses the event types of the events field of a configuration file.
+
+    Args:
+    - value (list or str): Event types, e.g. ["SE", "MXE"] or "SE,MXE", or None to select all of event_types.
+    - event_types (list): Event types to choose from.
+
+    Returns:
+    - list: The selected event types in the order of event_types.
+    """
+
+    if not value:
+        return(list(event_types))
+    if not isinstance(value, str):
+        value = ",".join(str(event_type) for event_type in value)
+
+    return(event_type_list(value, event_types))
@@ -1,16 +1,54 @@
+import os
 import pysam
 
-def is_paired_end(bam_file):
+def is_cram(bam_file):
 	"""
-	Determine if a BAM file is paired-end.
+	Determine if an alignment file is a CRAM file, from its extension.
+	"""
+	return bam_file.lower().endswith(".cram")
+
+def alignment_index(bam_file):
+	"""
+	Find the index of a BAM (.bai or .csi) or CRAM (.crai or .csi) file.
+	Returns the path to the index, or None if there is no index.
+	"""
+	for suffix in ([".crai", ".csi"] if is_cram(bam_file) else [".bai", ".csi"]):
+		if os.path.isfile(bam_file + suffix):
+			return bam_file + suffix
+	return None
+
+def open_alignment(bam_file, reference=None, threads=1):
+	"""
+	Open a BAM or CRAM file with pysam.
+	CRAM files are decoded with the reference genome FASTA file, and threads sets the number of htslib decompression threads.
+	"""
+	return pysam.AlignmentFile(bam_file, "rc" if is_cram(bam_file) else "rb", reference_filename=reference, threads=threads)
+
+def is_paired_end(bam_file, reference=None):
+	"""
+	Determine if a BAM or CRAM file is paired-end.
 	Returns True if paired-end, False otherwise.
 	"""
-	with pysam.AlignmentFile(bam_file, "rb") as bam:
+	with open_alignment(bam_file, reference) as bam:
 		for read in bam:
 			if read.is_paired:
 				return True
 		return False
 
+def featurecounts_command(gtf_file, counts_file, threads, bam_file, paired_end):
+	"""
+	Build the featureCounts command counting exon reads of each gene in a BAM file.
+	featureCounts does not read CRAM files, so a ValueError is raised for them.
+	Returns the command as a list of arguments.
+	"""
+	if is_cram(bam_file):
+		raise ValueError(f"featureCounts does not read CRAM files: {bam_file}. Please convert it to BAM using 'samtools view -b'.")
+	paired_option = ["-p", "-B"] if paired_end else []
+	return [
+		"featureCounts", "-a", gtf_file, "-o", counts_file, "-T", str(threads),
+		"-t", "exon", "-g", "gene_id"
+	] + paired_option + [bam_file]
+
 class ExpressionProcessor:
 	def __init__(self, df):
 		self.df = df
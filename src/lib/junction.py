@@ -0,0 +1,620 @@
+import array
+import bisect
+import glob
+import hashlib
+import heapq
+import itertools
+import logging
+import os
+import pickle
+import tempfile
+import pandas as pd
+from lib import annotation, parallel, junction_matrix, expression
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+"""
+Counts exon-exon junction reads of a BAM file from the CIGAR strings of its alignments, as regtools junctions extract does,
+and reads covering exon-intron boundaries of retained introns, as featureCounts does, in one pass.
+"""
+
+# CIGAR operations consuming the reference (M, D, = and X), which extend the anchors of a junction
+ANCHOR_OPS = (0, 2, 7, 8)
+# CIGAR operation of a skipped region (N)
+INTRON_OP = 3
+# Columns of the junction table
+JUNCTION_COLUMNS = ["chr", "start", "end", "count"]
+# Length of the genomic windows counted in parallel
+WINDOW_SIZE = 10000000
+# Bump when the content of cached junction counts changes
+JUNCTION_CACHE_VERSION = 1
+# Length of an exon-intron boundary, its last exon base and first intron base or its last intron base and first exon base
+BOUNDARY_LEN = 2
+
+def chr_name(reference) -> str:
+	"""
+	Adds chr to reference sequence names made of digits or up to two characters (e.g. 1 or X), as in event files.
+	"""
+
+	return(f"chr{reference}" if reference.isdecimal() or len(reference) <= 2 else reference)
+
+def ri_boundaries(ri_event_path) -> pd.DataFrame:
+	"""
+	Reads the exon-intron boundaries of the retained introns of an RI event file.
+
+	Args:
+		ri_event_path (str): Path to EVENT_RI.txt generated by gtf2event.py.
+
+	Returns:
+		pd.DataFrame: A DataFrame with chr, start and end columns of each distinct boundary, in the 1-based coordinates
+		of the IDs of the junction table, i.e. chr:start-(start + 1) at the start and chr:(end - 1)-end at the end of each
+		intron chr:start-end.
+	"""
+
+	intron = pd.read_csv(ri_event_path, sep = "\t", usecols = ["intron_a"], dtype = str)["intron_a"]
+	intron_df = intron.str.extract(r"^(?P<chr>[^:]+):(?P<start>\d+)-(?P<end>\d+)$").astype({"start": int, "end": int})
+	boundary_df = pd.concat([
+		pd.DataFrame({"chr": intron_df["chr"], "start": intron_df["start"], "end": intron_df["start"] + 1}),
+		pd.DataFrame({"chr": intron_df["chr"], "start": intron_df["end"] - 1, "end": intron_df["end"]})
+	])
+	return(boundary_df.drop_duplicates().sort_values(["chr", "start"]).reset_index(drop = True))
+
+def event_junctions(event_dir) -> pd.DataFrame:
+	"""
+	Reads the junctions of the alternative splicing events of an event directory.
+
+	Args:
+		event_dir (str): Directory of EVENT_*.txt files generated by gtf2event.py.
+
+	Returns:
+		pd.DataFrame: A DataFrame with chr, start and end columns of each distinct junction chr:start-end found in the
+		intron columns of the event files, sorted by position.
+	"""
+
+	junction_l = []
+	for event_path in sorted(glob.glob(os.path.join(event_dir, "EVENT_*.txt"))):
+		event_df = pd.read_csv(event_path, sep = "\t", dtype = str)
+		for column in [column for column in event_df.columns if column.startswith("intron")]:
+			# Introns of multiple skipped exon events are separated by semicolons
+			junction_l.append(event_df[column].dropna().str.split(";").explode())
+	junction = pd.concat(junction_l) if junction_l else pd.Series([], dtype = str)
+	junction_df = junction.str.extract(r"^(?P<chr>[^:]+):(?P<start>\d+)-(?P<end>\d+)$").dropna().astype({"start": int, "end": int})
+	return(junction_df.drop_duplicates().sort_values(["chr", "start", "end"]).reset_index(drop = True))
+
+def target_windows(target_df, references) -> list:
+	"""
+	Merges the regions of target junctions into windows to fetch from a BAM file.
+
+	The region of a junction chr:start-end spans its last upstream exon base, its intron and its first downstream exon
+	base, so that every read of the junction or covering a boundary of its intron overlaps it.
+
+	Args:
+		target_df (pd.DataFrame): Junctions with chr, start and end columns, as returned by event_junctions().
+		references (tuple): Names of the reference sequences of the BAM file.
+
+	Returns:
+		list: (reference, start, end, count_start) of each window, in 0-based half-open coordinates, where
+		count_start is the end of the previous window of the reference sequence, so that reads overlapping several
+		windows are counted in the first of them only.
+	"""
+
+	reference_id_dic = {chr_name(reference): reference_id for reference_id, reference in enumerate(references)}
+	region_l = sorted(
+		(reference_id_dic[chr_], start - 1, end)
+		for chr_, start, end in zip(target_df["chr"], target_df["start"], target_df["end"]) if chr_ in reference_id_dic
+	)
+	window_l = []
+	for reference_id, start, end in region_l:
+		if window_l and (window_l[-1][0] == reference_id) and (start <= window_l[-1][2]):
+			window_l[-1][2] = max(window_l[-1][2], end)
+		else:
+			count_start = window_l[-1][2] if window_l and (window_l[-1][0] == reference_id) else 0
+			window_l.append([reference_id, start, end, count_start])
+	return([(references[reference_id], start, end, count_start) for reference_id, start, end, count_start in window_l])
+
+def read_strand(read, strand) -> str:
+	"""
+	Infers the strand of the junctions of a read.
+
+	Args:
+		read (pysam.AlignedSegment): An alignment.
+		strand (str): XS to use the XS tag given by the aligner, RF for first-strand or FR for second-strand libraries.
+
+	Returns:
+		str: +, - or ? if the strand is unknown.
+	"""
+
+	if strand == "XS":
+		return(read.get_tag("XS") if read.has_tag("XS") else "?")
+	# The first read of a first-strand (RF) library is reverse complementary to the transcript
+	antisense = read.is_reverse != (read.is_paired and read.is_read2)
+	if strand == "RF":
+		return("+" if antisense else "-")
+	return("-" if antisense else "+")
+
+def read_junctions(cigar, reference_start) -> list:
+	"""
+	Finds the junctions of an alignment.
+
+	Args:
+		cigar (list): CIGAR operations of the alignment as (operation, length) tuples.
+		reference_start (int): 0-based leftmost reference position of the alignment.
+
+	Returns:
+		list: (thick_start, start, end, thick_end) of each junction, where start and end are the 0-based half-open
+		coordinates of the intron and thick_start and thick_end the ends of the aligned blocks anchoring it.
+	"""
+
+	junction_l = []
+	thick_start = start = reference_start
+	end = thick_end = None
+	for op, length in cigar:
+		if op == INTRON_OP:
+			if end is not None:
+				junction_l.append((thick_start, start, end, thick_end))
+				# The anchor on the right of the previous junction is the anchor on the left of this one
+				thick_start, start = end, thick_end
+			end = thick_end = start + length
+		elif op in ANCHOR_OPS:
+			if end is None:
+				start += length
+			else:
+				thick_end += length
+	if end is not None:
+		junction_l.append((thick_start, start, end, thick_end))
+	return(junction_l)
+
+def add_junctions(junction_dic, reads, anchor, min_intron, max_intron, strand, region_start = 0, boundary_dic = None, boundary_count_dic = None):
+	"""
+	Adds the junctions of alignments, and their reads covering exon-intron boundaries, to dictionaries of counts.
+
+	A boundary is covered by a read if both of its bases are in one aligned block of the read. Reads aligned to multiple
+	loci (NH > 1) are not counted for boundaries, as featureCounts does by default.
+
+	Args:
+		junction_dic (dict): (reference_id, start, end, strand) -> [count, anchored on the left, anchored on the right],
+			updated in place.
+		reads (iterable): Alignments.
+		anchor (int): Minimum anchor length.
+		min_intron (int): Minimum intron length.
+		max_intron (int): Maximum intron length, or 0 for no maximum.
+		strand (str): XS, RF or FR, see read_strand().
+		region_start (int): Alignments starting before this position are skipped, so that an alignment overlapping
+			several windows is counted only in the first of them.
+		boundary_dic (dict): reference_id -> sorted 0-based start positions of boundaries, or None not to count them.
+		boundary_count_dic (dict): (reference_id, start) -> number of reads covering the boundary, updated in place.
+	"""
+
+	for read in reads:
+		if read.is_unmapped or (read.reference_start < region_start):
+			continue
+		cigar = read.cigartuples
+		junction_l = read_junctions(cigar, read.reference_start) if len(cigar) > 1 else []
+
+		boundary_l = boundary_dic.get(read.reference_id) if boundary_dic else None
+		if boundary_l and not (read.has_tag("NH") and read.get_tag("NH") > 1):
+			# Aligned blocks of the read, between its junctions
+			if junction_l:
+				block_l = [(junction_l[0][0], junction_l[0][1])]
+				block_l += [(junction_l[i][2], junction_l[i + 1][1]) for i in range(len(junction_l) - 1)]
+				block_l.append((junction_l[-1][2], junction_l[-1][3]))
+			else:
+				block_l = [(read.reference_start, read.reference_end)]
+			for block_start, block_end in block_l:
+				i = bisect.bisect_left(boundary_l, block_start)
+				while (i < len(boundary_l)) and (boundary_l[i] + BOUNDARY_LEN <= block_end):
+					key = (read.reference_id, boundary_l[i])
+					boundary_count_dic[key] = boundary_count_dic.get(key, 0) + 1
+					i += 1
+
+		if not junction_l:
+			continue
+		read_strand_ = read_strand(read, strand)
+		for thick_start, start, end, thick_end in junction_l:
+			intron_len = end - start
+			if (intron_len < min_intron) or (max_intron and (intron_len > max_intron)):
+				continue
+			key = (read.reference_id, start, end, read_strand_)
+			junction = junction_dic.get(key)
+			if junction is None:
+				junction = junction_dic[key] = [0, False, False]
+			junction[0] += 1
+			junction[1] = junction[1] or (start - thick_start >= anchor)
+			junction[2] = junction[2] or (thick_end - end >= anchor)
+
+def genome_windows(references, lengths, window_size) -> list:
+	"""
+	Splits reference sequences into windows.
+
+	Args:
+		references (tuple): Names of the reference sequences.
+		lengths (tuple): Lengths of the reference sequences.
+		window_size (int): Maximum length of a window.
+
+	Returns:
+		list: (reference, start, end) of each window, in 0-based half-open coordinates.
+	"""
+
+	return([
+		(reference, start, min(start + window_size, length))
+		for reference, length in zip(references, lengths)
+		for start in range(0, length, window_size)
+	])
+
+def count_windows(bam_path, reference_path, window_l, anchor, min_intron, max_intron, strand, boundary_dic, num_shards, k) -> tuple:
+	"""
+	Counts junction and boundary reads in every num_shards-th window, starting at the k-th one.
+
+	Windows are (reference, start, end, count_start) tuples, where reads starting before count_start are skipped.
+
+	Returns:
+		tuple: Junction counts and boundary counts as in add_junctions().
+	"""
+
+	junction_dic = {}
+	boundary_count_dic = {}
+	with expression.open_alignment(bam_path, reference_path) as bam:
+		for reference, start, end, count_start in window_l[k::num_shards]:
+			add_junctions(junction_dic, bam.fetch(reference, start, end), anchor, min_intron, max_intron, strand, count_start, boundary_dic, boundary_count_dic)
+	return(junction_dic, boundary_count_dic)
+
+def window_boundaries(boundary_dic, window_l, references) -> dict:
+	"""
+	Selects the boundaries that reads counted in windows can cover, to send with these windows to another process.
+
+	Args:
+		boundary_dic (dict): reference_id -> sorted 0-based start positions of boundaries, or None.
+		window_l (list): Windows as in count_windows().
+		references (tuple): Names of the reference sequences, in the order of their IDs.
+
+	Returns:
+		dict: Boundaries of boundary_dic on the reference sequences of the windows, from the first count_start of the
+		windows on each of them, or None if boundary_dic is None.
+	"""
+
+	if boundary_dic is None:
+		return(None)
+	count_start_dic = {}
+	for reference, start, end, count_start in window_l:
+		count_start_dic[reference] = min(count_start_dic.get(reference, count_start), count_start)
+	window_boundary_dic = {}
+	for reference_id, boundary_l in boundary_dic.items():
+		if references[reference_id] in count_start_dic:
+			# Reads start at or after count_start, so boundaries before it are not covered
+			window_boundary_dic[reference_id] = boundary_l[bisect.bisect_left(boundary_l, count_start_dic[references[reference_id]]):]
+	return(window_boundary_dic)
+
+def merge_junction_counts(count_l) -> tuple:
+	"""
+	Merges junction and boundary counts of windows, summing reads and combining anchors of each junction.
+
+	Args:
+		count_l (list): Tuples of junction counts and boundary counts as in add_junctions().
+
+	Returns:
+		tuple: The merged junction counts and boundary counts.
+	"""
+
+	junction_dic = {}
+	boundary_count_dic = {}
+	for partial_junction_dic, partial_boundary_count_dic in count_l:
+		for key, partial_junction in partial_junction_dic.items():
+			junction = junction_dic.get(key)
+			if junction is None:
+				junction_dic[key] = partial_junction
+			else:
+				junction[0] += partial_junction[0]
+				junction[1] = junction[1] or partial_junction[1]
+				junction[2] = junction[2] or partial_junction[2]
+		for key, count in partial_boundary_count_dic.items():
+			boundary_count_dic[key] = boundary_count_dic.get(key, 0) + count
+	return(junction_dic, boundary_count_dic)
+
+def count_junctions(bam_path, anchor = 8, min_intron = 70, max_intron = 500000, strand = "XS", threads = 1, num_process = 1, window_size = WINDOW_SIZE, executor = None, boundary_df = None, target_df = None, reference_path = None) -> pd.DataFrame:
+	"""
+	Counts junction reads of a BAM or CRAM file, and optionally reads covering exon-intron boundaries in the same pass.
+
+	A junction is kept if its intron length is within [min_intron, max_intron] (no maximum if 0), and if it is anchored
+	by at least anchor aligned bases on its left in one read and on its right in one read, counting junctions of each
+	strand separately as regtools junctions extract does. Reads of all strands are then summed for each intron.
+
+	With more than one process or an executor, a BAM or CRAM file indexed by a .bai, .crai or .csi file is split into
+	windows counted in a process pool. Each alignment is counted in the window where it starts, and partial counts are
+	merged before filtering, so the result is the same as with one process.
+
+	With target junctions, only the regions of the junctions are fetched from the indexed file, and only these
+	junctions are counted, with the same counts as without targets.
+
+	Args:
+		bam_path (str): Path to the BAM or CRAM file.
+		anchor (int): Minimum anchor length.
+		min_intron (int): Minimum intron length.
+		max_intron (int): Maximum intron length.
+		strand (str): XS, RF or FR, see read_strand().
+		threads (int): Number of threads to decompress the BAM or CRAM file with, if it is read by one process.
+		num_process (int): Number of processes to use.
+		window_size (int): Length of the windows counted by each process.
+		executor (concurrent.futures.Executor): A process pool of num_process workers shared with other BAM files, or None.
+		boundary_df (pd.DataFrame): Exon-intron boundaries to count reads of, as returned by ri_boundaries(), or None.
+		target_df (pd.DataFrame): Junctions to count, as returned by event_junctions(), or None to count all junctions.
+			Boundaries must be those of target junctions.
+		reference_path (str): Reference genome FASTA file to decode a CRAM file with, or None to use the reference in its
+			header (REF_PATH and REF_CACHE of htslib).
+
+	Returns:
+		pd.DataFrame: A DataFrame with chr, start, end and count columns, sorted by position. For junctions, start is the
+		last base of the upstream exon and end the first base of the downstream exon in 1-based coordinates. Every
+		boundary is listed, with its count of reads or 0.
+	"""
+
+	with expression.open_alignment(bam_path, reference_path) as bam:
+		references = bam.references
+		lengths = bam.lengths
+		has_index = bam.has_index()
+	chr_l = [chr_name(reference) for reference in references]
+
+	# Sorted 0-based starts of boundaries on each reference sequence
+	boundary_dic = None
+	if boundary_df is not None:
+		reference_id_dic = {chr_: reference_id for reference_id, chr_ in enumerate(chr_l)}
+		boundary_dic = {
+			reference_id_dic[chr_]: sorted(chr_boundary_df["start"] - 1)
+			for chr_, chr_boundary_df in boundary_df.groupby("chr") if chr_ in reference_id_dic
+		}
+
+	if (target_df is not None) and not has_index:
+		raise ValueError(f"Index of {bam_path} is required to count target junctions")
+	if not has_index:
+		logger.debug(f"No index of {bam_path}, counting its reads in one pass")
+	if (target_df is None) and (((num_process <= 1) and (executor is None)) or not has_index):
+		junction_dic = {}
+		boundary_count_dic = {}
+		with expression.open_alignment(bam_path, reference_path, threads) as bam:
+			add_junctions(junction_dic, bam.fetch(until_eof = True), anchor, min_intron, max_intron, strand, 0, boundary_dic, boundary_count_dic)
+	else:
+		if target_df is None:
+			window_l = [(reference, start, end, start) for reference, start, end in genome_windows(references, lengths, window_size)]
+		else:
+			window_l = target_windows(target_df, references)
+			logger.debug(f"{len(window_l)} regions of {target_df.shape[0]} target junctions in {bam_path}")
+		if (num_process <= 1) and (executor is None):
+			junction_dic, boundary_count_dic = count_windows(bam_path, reference_path, window_l, anchor, min_intron, max_intron, strand, boundary_dic, 1, 0)
+		else:
+			# Several windows per process even out their different numbers of reads
+			num_shards = max(1, min(len(window_l), num_process * 4))
+			# Without fork inheritance, as in a pool shared by BAM files, each shard is sent only its windows and boundaries
+			shard_args = lambda k: (bam_path, reference_path, window_l[k::num_shards], anchor, min_intron, max_intron, strand, window_boundaries(boundary_dic, window_l[k::num_shards], references), 1, 0)
+			junction_dic, boundary_count_dic = merge_junction_counts(
+				parallel.map_shards(count_windows, (bam_path, reference_path, window_l, anchor, min_intron, max_intron, strand, boundary_dic, num_shards), num_shards, num_process, executor, shard_args)
+			)
+
+	junction_l = [
+		(chr_l[key[0]], key[1], key[2] + 1, junction[0])
+		for key, junction in junction_dic.items() if junction[1] and junction[2]
+	]
+	junction_df = pd.DataFrame(junction_l, columns = JUNCTION_COLUMNS)
+	junction_df = junction_df.groupby(["chr", "start", "end"], as_index = False, sort = True)["count"].sum()
+	if target_df is not None:
+		junction_df = junction_df.merge(target_df[["chr", "start", "end"]], on = ["chr", "start", "end"])
+	logger.debug(f"{junction_df.shape[0]} junctions in {bam_path}")
+	if boundary_df is None:
+		return(junction_df)
+
+	boundary_count_df = pd.DataFrame(
+		[(chr_l[key[0]], key[1] + 1, count) for key, count in boundary_count_dic.items()],
+		columns = ["chr", "start", "count"]
+	)
+	boundary_count_df = boundary_df.merge(boundary_count_df, on = ["chr", "start"], how = "left").fillna({"count": 0})
+	boundary_count_df["count"] = boundary_count_df["count"].astype(int)
+	logger.debug(f"{int((boundary_count_df['count'] > 0).sum())} of {boundary_count_df.shape[0]} exon-intron boundaries covered in {bam_path}")
+	junction_df = pd.concat([junction_df, boundary_count_df[JUNCTION_COLUMNS]], ignore_index = True)
+	return(junction_df.sort_values(["chr", "start", "end"]).reset_index(drop = True))
+
+def junction_cache_path(cache_dir, bam_path, anchor, min_intron, max_intron, strand, checksum = False) -> str:
+	"""
+	Returns the path of the cached junction counts of a BAM file, keyed on the identity of the file and the filters.
+
+	Args:
+		cache_dir (str): Directory of the cache.
+		bam_path (str): Path to the BAM file.
+		anchor (int): Minimum anchor length.
+		min_intron (int): Minimum intron length.
+		max_intron (int): Maximum intron length.
+		strand (str): XS, RF or FR, see read_strand().
+		checksum (bool): Identify the BAM file by the SHA-256 digest of its content instead of its path, size and
+			modification time.
+
+	Returns:
+		str: The path to the cache file.
+	"""
+
+	if checksum:
+		bam_id = annotation.file_hash(bam_path)
+	else:
+		bam_stat = os.stat(bam_path)
+		bam_id = f"{os.path.realpath(bam_path)}:{bam_stat.st_size}:{bam_stat.st_mtime_ns}"
+	key = hashlib.sha256(f"{bam_id}\t{anchor}\t{min_intron}\t{max_intron}\t{strand}".encode()).hexdigest()
+	return(os.path.join(cache_dir, f"{key}.v{JUNCTION_CACHE_VERSION}.pkl"))
+
+def load_junction_cache(cache_path) -> dict:
+	"""
+	Loads junction counts saved by save_junction_cache().
+
+	Args:
+		cache_path (str): The path to the cache file.
+
+	Returns:
+		dict: junction, the junction table of all junctions or None, and boundary, the table of counted boundaries. Empty
+		if there is no readable cache.
+	"""
+
+	if not os.path.isfile(cache_path):
+		return({})
+	try:
+		with open(cache_path, "rb") as f:
+			return(pickle.load(f))
+	except Exception as e:
+		logger.warning(f"Failed to load junction cache {cache_path}: {e}")
+		return({})
+
+def save_junction_cache(cache_path, junction_cache) -> None:
+	"""
+	Saves junction counts, writing a temporary file first so that concurrent runs never read a partial cache.
+
+	Args:
+		cache_path (str): The path to the cache file.
+		junction_cache (dict): Junction counts as returned by load_junction_cache().
+	"""
+
+	os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok = True)
+	fd, tmp_path = tempfile.mkstemp(dir = os.path.dirname(os.path.abspath(cache_path)), prefix = ".tmp_")
+	try:
+		with os.fdopen(fd, "wb") as f:
+			pickle.dump(junction_cache, f, protocol = pickle.HIGHEST_PROTOCOL)
+		os.replace(tmp_path, cache_path)
+	except Exception as e:
+		logger.warning(f"Failed to save junction cache {cache_path}: {e}")
+		if os.path.isfile(tmp_path):
+			os.remove(tmp_path)
+
+def cached_count_junctions(bam_path, cache_dir, anchor = 8, min_intron = 70, max_intron = 500000, strand = "XS", boundary_df = None, target_df = None, checksum = False, **kwargs) -> pd.DataFrame:
+	"""
+	Counts junction reads of a BAM file like count_junctions(), reusing counts cached by previous runs.
+
+	Counts of all junctions are cached unless target junctions are given, and counts of boundaries are added to the cache
+	as they are counted. Boundaries missing from the cache, e.g. after events have changed, are counted by fetching their
+	regions only.
+
+	Args:
+		bam_path (str): Path to the BAM file.
+		cache_dir (str): Directory of the cache.
+		anchor (int): Minimum anchor length.
+		min_intron (int): Minimum intron length.
+		max_intron (int): Maximum intron length.
+		strand (str): XS, RF or FR, see read_strand().
+		boundary_df (pd.DataFrame): Exon-intron boundaries to count reads of, as returned by ri_boundaries(), or None.
+		target_df (pd.DataFrame): Junctions to count, as returned by event_junctions(), or None to count all junctions.
+		checksum (bool): Identify the BAM file by its content, see junction_cache_path().
+		**kwargs: Other arguments of count_junctions().
+
+	Returns:
+		pd.DataFrame: The table returned by count_junctions().
+	"""
+
+	cache_path = junction_cache_path(cache_dir, bam_path, anchor, min_intron, max_intron, strand, checksum)
+	junction_cache = load_junction_cache(cache_path)
+	junction_df = junction_cache.get("junction")
+	cached_boundary_df = junction_cache.get("boundary", pd.DataFrame(columns = JUNCTION_COLUMNS).astype({"start": int, "end": int, "count": int}))
+	missing_boundary_df = None
+	if boundary_df is not None:
+		missing_boundary_df = boundary_df.merge(cached_boundary_df[["chr", "start"]], on = ["chr", "start"], how = "left", indicator = True)
+		missing_boundary_df = missing_boundary_df[missing_boundary_df["_merge"] == "left_only"].drop(columns = "_merge").reset_index(drop = True)
+		if missing_boundary_df.shape[0] == 0:
+			missing_boundary_df = None
+
+	if junction_df is None:
+		logger.debug(f"Counting junctions of {bam_path}, not in the cache")
+		count_df = count_junctions(bam_path, anchor, min_intron, max_intron, strand, boundary_df = missing_boundary_df, target_df = target_df, **kwargs)
+		is_boundary = (count_df["end"] - count_df["start"] == BOUNDARY_LEN - 1)
+		new_boundary_df = count_df[is_boundary]
+		if target_df is None:
+			junction_cache["junction"] = count_df[~is_boundary].reset_index(drop = True)
+		junction_df = count_df[~is_boundary]
+	elif missing_boundary_df is not None:
+		logger.debug(f"Counting {missing_boundary_df.shape[0]} exon-intron boundaries of {bam_path}, not in the cache")
+		new_boundary_df = count_junctions(bam_path, anchor, min_intron, max_intron, strand, boundary_df = missing_boundary_df, target_df = missing_boundary_df, **kwargs)
+	else:
+		logger.debug(f"Reusing cached junctions of {bam_path}")
+		new_boundary_df = None
+
+	if (new_boundary_df is not None) and ((new_boundary_df.shape[0] > 0) or ("junction" in junction_cache)):
+		cached_boundary_df = pd.concat([cached_boundary_df, new_boundary_df], ignore_index = True)
+		junction_cache["boundary"] = cached_boundary_df
+		save_junction_cache(cache_path, junction_cache)
+
+	if target_df is not None:
+		junction_df = junction_df.merge(target_df[["chr", "start", "end"]], on = ["chr", "start", "end"])
+	if boundary_df is None:
+		return(junction_df.reset_index(drop = True))
+	junction_df = pd.concat([junction_df, boundary_df.merge(cached_boundary_df, on = ["chr", "start", "end"])[JUNCTION_COLUMNS]], ignore_index = True)
+	return(junction_df.sort_values(["chr", "start", "end"]).reset_index(drop = True))
+
+def read_junction_table(junction_path):
+	"""
+	Reads a junction table written from count_junctions() row by row.
+
+	Args:
+		junction_path (str): Path to a tab-separated file with chr, start, end and count columns.
+
+	Yields:
+		tuple: chr, start, end and count of each row.
+	"""
+
+	with open(junction_path, "r") as junction_file:
+		columns = next(junction_file).rstrip("\n").split("\t")
+		if columns != JUNCTION_COLUMNS:
+			raise ValueError(f"Columns of {junction_path} are not {', '.join(JUNCTION_COLUMNS)}: {', '.join(columns)}")
+		for line in junction_file:
+			chr_, start, end, count = line.rstrip("\n").split("\t")
+			yield (chr_, int(start), int(end), int(count))
+
+def merge_junction_tables(junction_l, sample_l, output_path, matrix_path = None) -> int:
+	"""
+	Merges junction tables of samples into a tab-separated table of counts with a column for each sample.
+
+	The tables, sorted by chr, start and end as returned by count_junctions(), are merged row by row, so that only one
+	row of each table is held in memory.
+
+	Args:
+		junction_l (list): Iterables of (chr, start, end, count) rows of each sample, e.g. from read_junction_table().
+		sample_l (list): Names of the samples.
+		output_path (str): Path to the output file with chr, start, end and ID columns, where ID is chr:start-end, and a
+			column of counts for each sample.
+		matrix_path (str): Path to write the counts to as a sparse junction matrix, see lib/junction_matrix.py, or None.
+
+	Returns:
+		int: Number of junctions written.
+	"""
+
+	def sample_rows(i, rows):
+		previous_key = None
+		for chr_, start, end, count in rows:
+			key = (chr_, start, end)
+			if (previous_key is not None) and (key < previous_key):
+				raise ValueError(f"Junction table of sample {sample_l[i]} is not sorted by position at {chr_}:{start}-{end}")
+			previous_key = key
+			yield (chr_, start, end, i, count)
+
+	# Sparse rows of the junction matrix, in compact arrays of integers
+	chr_index_dic = {}
+	chr_index = array.array("l")
+	start_a = array.array("q")
+	end_a = array.array("q")
+	data = array.array("q")
+	indices = array.array("l")
+	indptr = array.array("q", [0])
+
+	junction_n = 0
+	with open(output_path, "w") as output_file:
+		output_file.write("\t".join(["chr", "start", "end", "ID"] + list(sample_l)) + "\n")
+		merged_rows = heapq.merge(*[sample_rows(i, rows) for i, rows in enumerate(junction_l)])
+		for (chr_, start, end), rows in itertools.groupby(merged_rows, key = lambda row: row[:3]):
+			count_l = [0] * len(sample_l)
+			for row in rows:
+				count_l[row[3]] += row[4]
+			output_file.write(f"{chr_}\t{start}\t{end}\t{chr_}:{start}-{end}\t" + "\t".join(map(str, count_l)) + "\n")
+			junction_n += 1
+			if matrix_path:
+				chr_index.append(chr_index_dic.setdefault(chr_, len(chr_index_dic)))
+				start_a.append(start)
+				end_a.append(end)
+				for i, count in enumerate(count_l):
+					if count:
+						indices.append(i)
+						data.append(count)
+				indptr.append(len(data))
+
+	if matrix_path:
+		junction_matrix.write_junction_matrix(matrix_path, chr_index, list(chr_index_dic), start_a, end_a, data, indices, indptr, sample_l)
+	return(junction_n)
@@ -0,0 +1,106 @@
+import os
+import numpy as np
+import pandas as pd
+
+"""
+Reads and writes junction read counts as a sparse matrix, stored next to the junction table as a compressed npz file.
+
+The file holds the counts of junctions (rows) in samples (columns) in CSR format (data, indices, indptr and shape),
+the interned chromosome names (chr_names) with the index of the chromosome of each junction (chr_index), the start
+and end of each junction and the names of the samples. The ID of a junction is chr:start-end as in the table.
+"""
+
+# Extension of junction matrix files
+MATRIX_EXTENSION = ".npz"
+
+def matrix_path(junction_path) -> str:
+    """
+    Returns the path of the junction matrix written next to a junction table.
+
+    Args:
+    - junction_path (str): Path to the junction table, e.g. junctions.bed.
+
+    Returns:
+    - str: Path to the junction matrix, e.g. junctions.npz.
+    """
+
+    return(os.path.splitext(junction_path)[0] + MATRIX_EXTENSION)
+
+def write_junction_matrix(path, chr_index, chr_names, start, end, data, indices, indptr, samples):
+    """
+    Writes a junction matrix in CSR format.
+
+    Args:
+    - path (str): Path to the output npz file.
+    - chr_index (array-like): Index in chr_names of the chromosome of each junction.
+    - chr_names (list): Chromosome names.
+    - start (array-like): Start of each junction.
+    - end (array-like): End of each junction.
+    - data (array-like): Nonzero counts, row by row.
+    - indices (array-like): Sample index of each nonzero count.
+    - indptr (array-like): Offsets of the counts of each junction in data, with one more element than junctions.
+    - samples (list): Sample names.
+    """
+
+    np.savez_compressed(
+        path,
+        data = np.asarray(data, dtype = np.int64),
+        indices = np.asarray(indices, dtype = np.int32),
+        indptr = np.asarray(indptr, dtype = np.int64),
+        shape = np.array([len(start), len(samples)], dtype = np.int64),
+        chr_names = np.array(chr_names, dtype = str),
+        chr_index = np.asarray(chr_index, dtype = np.int32),
+        start = np.asarray(start, dtype = np.int64),
+        end = np.asarray(end, dtype = np.int64),
+        samples = np.array(samples, dtype = str)
+    )
+
+def write_junction_dataframe(path, junc_df):
+    """
+    Writes a junction table as a junction matrix.
+
+    Args:
+    - path (str): Path to the output npz file.
+    - junc_df (pd.DataFrame): A DataFrame with chr, start, end and ID columns and a column of counts for each sample.
+    """
+
+    chr_index, chr_names = pd.factorize(junc_df["chr"])
+    counts = junc_df.iloc[:, 4:].to_numpy(dtype = np.int64)
+    row, column = np.nonzero(counts)
+    write_junction_matrix(
+        path,
+        chr_index,
+        list(chr_names),
+        junc_df["start"].astype(np.int64),
+        junc_df["end"].astype(np.int64),
+        counts[row, column],
+        column,
+        np.concatenate([[0], np.cumsum(np.bincount(row, minlength = counts.shape[0]))]),
+        list(junc_df.columns[4:])
+    )
+
+def read_junction_matrix(path) -> pd.DataFrame:
+    """
+    Reads a junction matrix into a junction table.
+
+    Args:
+    - path (str): Path to the npz file.
+
+    Returns:
+    - pd.DataFrame: A DataFrame with chr, start, end and ID columns of strings and a column of counts for each sample,
+      as in the junction table.
+    """
+
+    with np.load(path) as matrix:
+        num_junctions, num_samples = matrix["shape"]
+        counts = np.zeros((num_junctions, num_samples), dtype = np.int64)
+        row = np.repeat(np.arange(num_junctions), np.diff(matrix["indptr"]))
+        counts[row, matrix["indices"]] = matrix["data"]
+        chr_ = matrix["chr_names"][matrix["chr_index"]].tolist()
+        start = list(map(str, matrix["start"].tolist()))
+        end = list(map(str, matrix["end"].tolist()))
+        samples = [str(sample) for sample in matrix["samples"]]
+
+    junc_df = pd.DataFrame({"chr": chr_, "start": start, "end": end, "ID": [f"{c}:{s}-{e}" for c, s, e in zip(chr_, start, end)]}, dtype = object)
+    junc_df = pd.concat([junc_df, pd.DataFrame(counts, columns = samples)], axis = 1)
+    return(junc_df)
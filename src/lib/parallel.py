@@ -0,0 +1,66 @@
+import gc
+import sys
+import multiprocessing
+import concurrent.futures
+
+"""
+Runs a function over shards of large read-only data in a process pool.
+"""
+
+# Arguments published to the workers forked by map_shards()
+_shared_args = None
+
+def fork_available() -> bool:
+    """
+    Checks whether workers can be started with fork and inherit published data.
+
+    Returns:
+    - bool: True if the fork start method can be used. It is avoided on macOS, where it is unsafe with system libraries.
+    """
+
+    return(("fork" in multiprocessing.get_all_start_methods()) and (sys.platform != "darwin"))
+
+def _call_shared(func, k):
+    # Runs in a forked worker, which has inherited _shared_args from the parent process
+    return(func(*_shared_args, k))
+
+def map_shards(func, args, num_shards, num_process, executor = None, shard_args = None) -> list:
+    """
+    Runs func(*args, k) for each shard index k in a process pool.
+
+    Where fork is available, args are published in a module global before a new pool is forked, so workers inherit
+    them without copying and only func and k are pickled for each shard. Otherwise, or if an executor is given,
+    args are pickled and sent with every shard, unless shard_args selects the part of them each shard needs.
+
+    Args:
+    - func (function): A module-level function taking args and a shard index.
+    - args (tuple): Arguments of func shared by all shards, which must not be modified.
+    - num_shards (int): Number of shards.
+    - num_process (int): Number of processes to use.
+    - executor (concurrent.futures.Executor): A pool to run shards in instead of forking a new one, or None.
+    - shard_args (function): A function of k returning the arguments of func for shard k, including the shard index,
+      which are pickled instead of args and k when args are not inherited. None to send args with every shard.
+
+    Returns:
+    - list: Results of func for each shard, in the order of shard indices.
+    """
+
+    global _shared_args
+    if executor is not None:
+        futures = [executor.submit(func, *(shard_args(k) if shard_args else args + (k,))) for k in range(num_shards)]
+        return([future.result() for future in futures])
+    if not fork_available():
+        with concurrent.futures.ProcessPoolExecutor(max_workers = num_process) as executor:
+            return(map_shards(func, args, num_shards, num_process, executor, shard_args))
+
+    _shared_args = args
+    # Objects existing before the fork are moved out of reach of the garbage collector, which would otherwise
+    # write to them in every worker and turn the pages shared with the parent process into private copies
+    gc.freeze()
+    try:
+        with concurrent.futures.ProcessPoolExecutor(max_workers = num_process, mp_context = multiprocessing.get_context("fork")) as executor:
+            futures = [executor.submit(_call_shared, func, k) for k in range(num_shards)]
+            return([future.result() for future in futures])
+    finally:
+        gc.unfreeze()
+        _shared_args = None
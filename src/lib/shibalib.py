@@ -1,181 +1,76 @@
 # Modules used in psi.py and scpsi.py
 
+import os
 import warnings
 # warnings.simplefilter('ignore')
 import pandas as pd
 import numpy as np
 import scipy.stats as stats
 import statsmodels.stats.multitest as multitest
-import concurrent.futures
+from lib import parallel, junction_matrix
+from lib.event_types import EVENT_TYPES, EVENT_TYPES_SC, event_type_list
 from styleframe import StyleFrame, Styler, utils
 
-def read_events(event_path) -> dict:
+
+def read_events(event_path, event_types = EVENT_TYPES) -> dict:
     """
     Reads alternative splicing events from text files and returns a dictionary of dataframes.
 
     Args:
     - event_path (str): Path to the directory that contains text files of alternative splicing events.
+    - event_types (list): Event types to read. Files of other event types are not read and need not exist.
 
     Returns:
     - event_df_dict (dict): A dictionary of dataframes containing alternative splicing events.
     """
 
-    event_se_df = pd.read_csv(
-
-        event_path + "/EVENT_SE.txt",
-        sep = "\t",
-        dtype = "str"
-
-    )
-    event_five_df = pd.read_csv(
-
-        event_path + "/EVENT_FIVE.txt",
-        sep = "\t",
-        dtype = "str"
-
-    )
-    event_three_df = pd.read_csv(
-
-        event_path + "/EVENT_THREE.txt",
-        sep = "\t",
-        dtype = "str"
-
-    )
-    event_mxe_df = pd.read_csv(
-
-        event_path + "/EVENT_MXE.txt",
-        sep = "\t",
-        dtype = "str"
-
-    )
-    event_ri_df = pd.read_csv(
-
-        event_path + "/EVENT_RI.txt",
-        sep = "\t",
-        dtype = "str"
-
-    )
-    event_mse_df = pd.read_csv(
-
-        event_path + "/EVENT_MSE.txt",
-        sep = "\t",
-        dtype = "str"
-
-    )
-    event_afe_df = pd.read_csv(
-
-        event_path + "/EVENT_AFE.txt",
-        sep = "\t",
-        dtype = "str"
-
-    )
-    event_ale_df = pd.read_csv(
+    event_df_dict = {}
+    for event_type in event_types:
 
-        event_path + "/EVENT_ALE.txt",
-        sep = "\t",
-        dtype = "str"
+        event_df_dict[event_type] = pd.read_csv(
 
-    )
+            event_path + "/EVENT_" + event_type + ".txt",
+            sep = "\t",
+            dtype = "str"
 
-    event_df_dict = {
-        "SE": event_se_df,
-        "FIVE": event_five_df,
-        "THREE": event_three_df,
-        "MXE": event_mxe_df,
-        "RI": event_ri_df,
-        "MSE": event_mse_df,
-        "AFE": event_afe_df,
-        "ALE": event_ale_df
-    }
+        )
 
     return(event_df_dict)
 
 
-def read_events_sc(event_path) -> dict:
+def read_events_sc(event_path, event_types = EVENT_TYPES_SC) -> dict:
     """
     Reads alternative splicing events from text files and returns a dictionary of dataframes for single cell data.
 
     Args:
     - event_path (str): Path to the directory that contains text files of alternative splicing events.
+    - event_types (list): Event types to read.
 
     Returns:
     - event_df_dict (dict): A dictionary of dataframes containing alternative splicing events.
     """
 
-    event_se_df = pd.read_csv(
-
-        event_path + "/EVENT_SE.txt",
-        sep = "\t",
-        dtype = "str"
-
-    )
-    event_five_df = pd.read_csv(
-
-        event_path + "/EVENT_FIVE.txt",
-        sep = "\t",
-        dtype = "str"
-
-    )
-    event_three_df = pd.read_csv(
-
-        event_path + "/EVENT_THREE.txt",
-        sep = "\t",
-        dtype = "str"
-
-    )
-    event_mxe_df = pd.read_csv(
-
-        event_path + "/EVENT_MXE.txt",
-        sep = "\t",
-        dtype = "str"
-
-    )
-    event_mse_df = pd.read_csv(
-
-        event_path + "/EVENT_MSE.txt",
-        sep = "\t",
-        dtype = "str"
-
-    )
-    event_afe_df = pd.read_csv(
-
-        event_path + "/EVENT_AFE.txt",
-        sep = "\t",
-        dtype = "str"
-
-    )
-    event_ale_df = pd.read_csv(
-
-        event_path + "/EVENT_ALE.txt",
-        sep = "\t",
-        dtype = "str"
-
-    )
-
-    event_df_dict = {
-        "SE": event_se_df,
-        "FIVE": event_five_df,
-        "THREE": event_three_df,
-        "MXE": event_mxe_df,
-        "MSE": event_mse_df,
-        "AFE": event_afe_df,
-        "ALE": event_ale_df
-    }
-
-    return(event_df_dict)
+    return(read_events(event_path, event_types))
 
 
 def read_junctions(junction_path) -> pd.DataFrame:
     """
     Reads junctions from a file specified in the command line arguments.
 
+    The junction matrix written next to the file (e.g. junctions.npz next to junctions.bed) is read instead if it is not
+    older than the file, which avoids parsing the table.
+
     Args:
-    - junction_path (str): Path to the junction file.
+    - junction_path (str): Path to the junction file, or to a junction matrix in npz format.
 
     Returns:
     - pd.DataFrame: A pandas DataFrame containing the junction information.
     """
 
+    matrix_path = junction_matrix.matrix_path(junction_path)
+    if os.path.isfile(matrix_path) and (os.path.getmtime(matrix_path) >= os.path.getmtime(junction_path)):
+        return(junction_matrix.read_junction_matrix(matrix_path))
+
     junc_df = pd.read_csv(
 
         junction_path,
@@ -2126,14 +2021,11 @@ def make_psi_table_sample(sample_list, event_for_analysis_df, junc_dict_all, fun
 
     columns = func_col(sample_list, False)
 
-    with concurrent.futures.ProcessPoolExecutor(max_workers = num_process) as executor:
-
-        futures = [executor.submit(func_psi, junc_dict_all, sample_list, event_for_analysis_df, num_process, minimum_reads, i) for i in range(num_process)]
-
+    # Junctions and events are inherited by forked workers instead of being pickled for each of them
     output_l = []
-    for future in concurrent.futures.as_completed(futures):
+    for output in parallel.map_shards(func_psi, (junc_dict_all, sample_list, event_for_analysis_df, num_process, minimum_reads), num_process, num_process):
 
-        output_l += future.result()
+        output_l += output
 
     psi_table_df = pd.DataFrame(
 
@@ -2165,14 +2057,11 @@ def make_psi_table_group(group_list, event_for_analysis_df, junc_dict_group, fun
 
     columns = func_col(group_list, True)
 
-    with concurrent.futures.ProcessPoolExecutor(max_workers = num_process) as executor:
-
-        futures = [executor.submit(func_psi, junc_dict_group, group_list, event_for_analysis_df, num_process, minimum_reads, i) for i in range(num_process)]
-
+    # Junctions and events are inherited by forked workers instead of being pickled for each of them
     output_l = []
-    for future in concurrent.futures.as_completed(futures):
+    for output in parallel.map_shards(func_psi, (junc_dict_group, group_list, event_for_analysis_df, num_process, minimum_reads), num_process, num_process):
 
-        output_l += future.result()
+        output_l += output
 
     psi_table_df = pd.DataFrame(
 
@@ -2216,14 +2105,10 @@ def diff_event(event_for_analysis_df, psi_table_df, junc_dict_all, group_df, gro
 
             event_for_analysis_df = event_for_analysis_df[event_for_analysis_df["event_id"].isin(output_df["event_id"])]
 
-            with concurrent.futures.ProcessPoolExecutor(max_workers = num_process) as executor:
-
-                futures = [executor.submit(func_ind, junc_dict_all, event_for_analysis_df, sample_list, num_process, i) for i in range(num_process)]
-
             output_l = []
-            for future in concurrent.futures.as_completed(futures):
+            for output in parallel.map_shards(func_ind, (junc_dict_all, event_for_analysis_df, sample_list, num_process), num_process, num_process):
 
-                output_l += future.result()
+                output_l += output
 
             columns_ind = col_ind(sample_list)
             output_ind_df = pd.DataFrame(
@@ -2304,20 +2189,14 @@ class EventCounter:
         }
 
 
-def save_excel(output_path, SE_df, FIVE_df, THREE_df, MXE_df, RI_df, MSE_df, AFE_df, ALE_df):
+def save_excel(output_path, result_df_dict):
     """
     Save excel file.
 
     Args:
     - output_path (str): Output path.
-    - SE_df (pd.DataFrame): DataFrame containing the differential splicing analysis results for SE events.
-    - FIVE_df (pd.DataFrame): DataFrame containing the differential splicing analysis results for FIVE events.
-    - THREE_df (pd.DataFrame): DataFrame containing the differential splicing analysis results for THREE events.
-    - MXE_df (pd.DataFrame): DataFrame containing the differential splicing analysis results for MXE events.
-    - RI_df (pd.DataFrame): DataFrame containing the differential splicing analysis results for RI events.
-    - MSE_df (pd.DataFrame): DataFrame containing the differential splicing events for MSE events.
-    - AFE_df (pd.DataFrame): DataFrame containing the differential splicing events for AFE events.
-    - ALE_df (pd.DataFrame): DataFrame containing the differential splicing events for ALE events.
+    - result_df_dict (dict): A dictionary of event type and DataFrame containing the differential splicing analysis results
+      or PSI values of its events. Each event type is written to a sheet of its name.
 
     """
 
@@ -2331,143 +2210,16 @@ def save_excel(output_path, SE_df, FIVE_df, THREE_df, MXE_df, RI_df, MSE_df, AFE
     )
 
     with StyleFrame.ExcelWriter(output_path + "/results.xlsx") as writer:
-        SE_sf = StyleFrame(SE_df)
-        SE_sf.set_column_width(columns = SE_df.columns, width = 20)
-        SE_sf.apply_column_style(cols_to_style = SE_df.columns, styler_obj = style, style_header = True)
-        SE_sf.to_excel(writer, index = False, columns_and_rows_to_freeze = "B2", sheet_name = "SE")
-
-        FIVE_sf = StyleFrame(FIVE_df)
-        FIVE_sf.set_column_width(columns = FIVE_df.columns, width = 20)
-        FIVE_sf.apply_column_style(cols_to_style = FIVE_df.columns, styler_obj = style, style_header = True)
-        try:
-            FIVE_sf.to_excel(writer, index = False, columns_and_rows_to_freeze = "B2", sheet_name = "FIVE")
-        except:
-            pass
-
-        THREE_sf = StyleFrame(THREE_df)
-        THREE_sf.set_column_width(columns = THREE_df.columns, width = 20)
-        THREE_sf.apply_column_style(cols_to_style = THREE_df.columns, styler_obj = style, style_header = True)
-        try:
-            THREE_sf.to_excel(writer, index = False, columns_and_rows_to_freeze = "B2", sheet_name = "THREE")
-        except:
-            pass
-
-        MXE_sf = StyleFrame(MXE_df)
-        MXE_sf.set_column_width(columns = MXE_df.columns, width = 20)
-        MXE_sf.apply_column_style(cols_to_style = MXE_df.columns, styler_obj = style, style_header = True)
-        try:
-            MXE_sf.to_excel(writer, index = False, columns_and_rows_to_freeze = "B2", sheet_name = "MXE")
-        except:
-            pass
-
-        RI_sf = StyleFrame(RI_df)
-        RI_sf.set_column_width(columns = RI_df.columns, width = 20)
-        RI_sf.apply_column_style(cols_to_style = RI_df.columns, styler_obj = style, style_header = True)
-        try:
-            RI_sf.to_excel(writer, index = False, columns_and_rows_to_freeze = "B2", sheet_name = "RI")
-        except:
-            pass
-
-        MSE_sf = StyleFrame(MSE_df)
-        MSE_sf.set_column_width(columns = MSE_df.columns, width = 20)
-        MSE_sf.apply_column_style(cols_to_style = MSE_df.columns, styler_obj = style, style_header = True)
-        try:
-            MSE_sf.to_excel(writer, index = False, columns_and_rows_to_freeze = "B2", sheet_name = "MSE")
-        except:
-            pass
-
-        AFE_sf = StyleFrame(AFE_df)
-        AFE_sf.set_column_width(columns = AFE_df.columns, width = 20)
-        AFE_sf.apply_column_style(cols_to_style = AFE_df.columns, styler_obj = style, style_header = True)
-        try:
-            AFE_sf.to_excel(writer, index = False, columns_and_rows_to_freeze = "B2", sheet_name = "AFE")
-        except:
-            pass
-
-        ALE_sf = StyleFrame(ALE_df)
-        ALE_sf.set_column_width(columns = ALE_df.columns, width = 20)
-        ALE_sf.apply_column_style(cols_to_style = ALE_df.columns, styler_obj = style, style_header = True)
-        try:
-            ALE_sf.to_excel(writer, index = False, columns_and_rows_to_freeze = "B2", sheet_name = "ALE")
-        except:
-            pass
-
-
-def save_excel_sc(output_path, SE_df, FIVE_df, THREE_df, MXE_df, MSE_df, AFE_df, ALE_df):
-    """
-    Save excel file.
-
-    Args:
-    - output_path (str): Output path.
-    - SE_df (pd.DataFrame): DataFrame containing the differential splicing analysis results for SE events.
-    - FIVE_df (pd.DataFrame): DataFrame containing the differential splicing analysis results for FIVE events.
-    - THREE_df (pd.DataFrame): DataFrame containing the differential splicing analysis results for THREE events.
-    - MXE_df (pd.DataFrame): DataFrame containing the differential splicing analysis results for MXE events.
-    - MSE_df (pd.DataFrame): DataFrame containing the differential splicing events for MSE events.
-    - AFE_df (pd.DataFrame): DataFrame containing the differential splicing events for AFE events.
-    - ALE_df (pd.DataFrame): DataFrame containing the differential splicing events for ALE events.
-
-    """
-
-    # Style
-    style = Styler(
-
-        horizontal_alignment = utils.horizontal_alignments.left,
-        border_type = utils.borders.default_grid,
-        wrap_text = False
-
-    )
-
-    with StyleFrame.ExcelWriter(output_path + "/results.xlsx") as writer:
-        SE_sf = StyleFrame(SE_df)
-        SE_sf.set_column_width(columns = SE_df.columns, width = 20)
-        SE_sf.apply_column_style(cols_to_style = SE_df.columns, styler_obj = style, style_header = True)
-        SE_sf.to_excel(writer, index = False, columns_and_rows_to_freeze = "B2", sheet_name = "SE")
-
-        FIVE_sf = StyleFrame(FIVE_df)
-        FIVE_sf.set_column_width(columns = FIVE_df.columns, width = 20)
-        FIVE_sf.apply_column_style(cols_to_style = FIVE_df.columns, styler_obj = style, style_header = True)
-        try:
-            FIVE_sf.to_excel(writer, index = False, columns_and_rows_to_freeze = "B2", sheet_name = "FIVE")
-        except:
-            pass
-
-        THREE_sf = StyleFrame(THREE_df)
-        THREE_sf.set_column_width(columns = THREE_df.columns, width = 20)
-        THREE_sf.apply_column_style(cols_to_style = THREE_df.columns, styler_obj = style, style_header = True)
-        try:
-            THREE_sf.to_excel(writer, index = False, columns_and_rows_to_freeze = "B2", sheet_name = "THREE")
-        except:
-            pass
-
-        MXE_sf = StyleFrame(MXE_df)
-        MXE_sf.set_column_width(columns = MXE_df.columns, width = 20)
-        MXE_sf.apply_column_style(cols_to_style = MXE_df.columns, styler_obj = style, style_header = True)
-        try:
-            MXE_sf.to_excel(writer, index = False, columns_and_rows_to_freeze = "B2", sheet_name = "MXE")
-        except:
-            pass
-
-        MSE_sf = StyleFrame(MSE_df)
-        MSE_sf.set_column_width(columns = MSE_df.columns, width = 20)
-        MSE_sf.apply_column_style(cols_to_style = MSE_df.columns, styler_obj = style, style_header = True)
-        try:
-            MSE_sf.to_excel(writer, index = False, columns_and_rows_to_freeze = "B2", sheet_name = "MSE")
-        except:
-            pass
+        for i, (event_type, result_df) in enumerate(result_df_dict.items()):
+            result_sf = StyleFrame(result_df)
+            result_sf.set_column_width(columns = result_df.columns, width = 20)
+            result_sf.apply_column_style(cols_to_style = result_df.columns, styler_obj = style, style_header = True)
+            if i == 0:
+                result_sf.to_excel(writer, index = False, columns_and_rows_to_freeze = "B2", sheet_name = event_type)
+                continue
+            try:
+                result_sf.to_excel(writer, index = False, columns_and_rows_to_freeze = "B2", sheet_name = event_type)
+            except:
+                pass
 
-        AFE_sf = StyleFrame(AFE_df)
-        AFE_sf.set_column_width(columns = AFE_df.columns, width = 20)
-        AFE_sf.apply_column_style(cols_to_style = AFE_df.columns, styler_obj = style, style_header = True)
-        try:
-            AFE_sf.to_excel(writer, index = False, columns_and_rows_to_freeze = "B2", sheet_name = "AFE")
-        except:
-            pass
 
-        ALE_sf = StyleFrame(ALE_df)
-        ALE_sf.set_column_width(columns = ALE_df.columns, width = 20)
-        ALE_sf.apply_column_style(cols_to_style = ALE_df.columns, styler_obj = style, style_header = True)
-        try:
-            ALE_sf.to_excel(writer, index = False, columns_and_rows_to_freeze = "B2", sheet_name = "ALE")
-        except:
-            pass
@@ -8,6 +8,7 @@ import numpy as np
 import plotly.express as px
 import html
 import logging
+from lib import shibalib
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -22,6 +23,7 @@ def get_args():
 	parser.add_argument("-e", "--experiment-table", type = str, help = "Experiment table file")
 	parser.add_argument("-s", "--shiba-command", type = str, help = "Shiba command")
 	parser.add_argument("-o", "--output", type = str, help = "Directory for output files")
+	parser.add_argument("--events", type = shibalib.event_type_list, help = "Comma-separated event types whose PSI was calculated (plots of the others are left empty)", default = ",".join(shibalib.EVENT_TYPES))
 	parser.add_argument('-v', '--verbose', action='store_true', help='Verbose output')
 	args = parser.parse_args()
 	return(args)
@@ -129,13 +131,16 @@ def plots_pca(name: str, pca_df: pd.DataFrame, contribution_PC1: str, contributi
 	)
 	fig.write_html(os.path.join(output_dir, "data", "pca_" + name + ".html"), include_plotlyjs = "cdn")
 
-def plots(AS: str, input_dir: str, output_dir: str):
+def plots(AS: str, input_dir: str, output_dir: str, skipped: bool = False):
 
-	# load data
-	df = pd.read_csv(
-		os.path.join(input_dir, "splicing", "PSI_" + AS + ".txt"),
-		sep = "\t"
-	)
+	# load data, if the event type was calculated
+	if skipped:
+		df = pd.DataFrame()
+	else:
+		df = pd.read_csv(
+			os.path.join(input_dir, "splicing", "PSI_" + AS + ".txt"),
+			sep = "\t"
+		)
 	if not df.empty:
 		# Round dPSI and others
 		df["dPSI"] = df["dPSI"].round(2)
@@ -833,9 +838,8 @@ def main():
 	plots_pca("PSI", pca_psi_df, contribution_psi_PC1, contribution_psi_PC2, output_dir)
 	# Splicing events
 	logger.info("Making plots for splicing events....")
-	AS_list = ["SE", "FIVE", "THREE", "MXE", "RI", "MSE", "AFE", "ALE"]
-	for AS in AS_list:
-		plots(AS, input_dir, output_dir)
+	for AS in shibalib.EVENT_TYPES:
+		plots(AS, input_dir, output_dir, skipped = AS not in args.events)
 	# Write summary html
 	logger.info("Writing summary html....")
 	write_summary_html(args.shiba_command, output_dir)
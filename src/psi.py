@@ -33,6 +33,7 @@ def get_args():
     parser.add_argument("--onlypsi", help = "Just calculate PSI for each sample, not perform statistical tests", action = 'store_true')
     parser.add_argument("--onlypsi-group", help = "Just calculate PSI for each group, not perform statistical tests (Overrides --onlypsi when used together)", action = 'store_true')
     parser.add_argument("--excel", help = "Make result files in excel format", action = 'store_true')
+    parser.add_argument("--events", type = shibalib.event_type_list, help = "Comma-separated event types to calculate PSI for", default = ",".join(shibalib.EVENT_TYPES))
     parser.add_argument("-v", "--verbose", action="store_true", help="Verbose output")
 
     args = parser.parse_args()
@@ -69,11 +70,12 @@ def main():
         "onlypsi": args.onlypsi,
         "onlypsi_group": args.onlypsi_group,
         "excel": args.excel,
+        "events": args.events,
     }
 
     # Load event and junction data
     logger.info("Loading event and junction files...")
-    event_df_dict = shibalib.read_events(paths["event"])
+    event_df_dict = shibalib.read_events(paths["event"], params["events"])
     junc_df = shibalib.read_junctions(paths["junction"])
     junc_dict_all = shibalib.junc_dict(junc_df)
     sample_list = shibalib.make_sample_list(junc_df)
@@ -139,7 +141,7 @@ def main():
     }
 
     # Process each event
-    event_results = {event: process_event(event, *functions) for event, functions in event_definitions.items()}
+    event_results = {event: process_event(event, *event_definitions[event]) for event in params["events"]}
 
     # Save PSI matrices
     logger.info("Saving PSI matrices...")
@@ -169,11 +171,9 @@ def main():
     # Save summary file
     logger.info("Saving summary file...")
     if paths["group"] and not params["onlypsi"] and not params["onlypsi_group"]:
-        # Define the event types
-        event_types = ["SE", "FIVE", "THREE", "MXE", "RI", "MSE", "AFE", "ALE"]
         # Collect event counts
         summary_l = []
-        for event in event_types:
+        for event in params["events"]:
             logger.debug(f"Counting events for {event}...")
             event_counter = shibalib.EventCounter(event_results[event]["diff"], params["dPSI"])
             event_counts = event_counter.count_all_events()
@@ -197,15 +197,15 @@ def main():
     # Optionally save to Excel
     if params["excel"]:
         logger.info("Exporting results to Excel...")
-        excel_data = []
+        excel_data = {}
         if params["onlypsi_group"]:
-            excel_data = [result["nodiff_group"] for result in event_results.values() if result["nodiff_group"] is not None]
+            excel_data = {event: result["nodiff_group"] for event, result in event_results.items() if result["nodiff_group"] is not None}
         elif params["onlypsi"]:
-            excel_data = [result["nodiff_sample"] for result in event_results.values() if result["nodiff_sample"] is not None]
+            excel_data = {event: result["nodiff_sample"] for event, result in event_results.items() if result["nodiff_sample"] is not None}
         else:
-            excel_data = [result["diff"] for result in event_results.values() if result["diff"] is not None]
+            excel_data = {event: result["diff"] for event, result in event_results.items() if result["diff"] is not None}
         if excel_data:
-            shibalib.save_excel(paths["output"], *excel_data)
+            shibalib.save_excel(paths["output"], excel_data)
         else:
             logger.warning("No data to export to Excel")
 
@@ -6,6 +6,7 @@ import sys
 import os
 import pandas as pd
 import scanpy as sc
+from lib import junction_matrix
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -201,6 +202,8 @@ def main():
 	# Write output junction file
 	logger.info("Writing output junction file ...")
 	output_df.to_csv(output_path, sep = "\t", index = False)
+	# Sparse junction matrix next to the output junction file, read by scpsi.py instead of parsing the file
+	junction_matrix.write_junction_dataframe(junction_matrix.matrix_path(output_path), output_df)
 
 	logger.info("All processes completed.")
 
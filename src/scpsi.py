@@ -28,6 +28,7 @@ def get_args():
     parser.add_argument("-m", "--minimum-reads", type = int, help = "Minumum value of total reads for each junction for detecting differential events", default = 10)
     parser.add_argument("--onlypsi", help = "Just calculate PSI for each sample, not perform statistical tests", action = 'store_true')
     parser.add_argument("--excel", help = "Make result files in excel format", action = 'store_true')
+    parser.add_argument("--events", type = lambda value: shibalib.event_type_list(value, shibalib.EVENT_TYPES_SC), help = "Comma-separated event types to calculate PSI for", default = ",".join(shibalib.EVENT_TYPES_SC))
     parser.add_argument("-v", "--verbose", action="store_true", help="Verbose output")
     args = parser.parse_args()
     return(args)
@@ -59,11 +60,12 @@ def main():
         "minimum_reads": args.minimum_reads,
         "onlypsi": args.onlypsi,
         "excel": args.excel,
+        "events": args.events,
     }
 
     # Load event and junction data
     logger.info("Loading event and junction files...")
-    event_df_dict = shibalib.read_events(paths["event"])
+    event_df_dict = shibalib.read_events_sc(paths["event"], params["events"])
     junc_df = shibalib.read_junctions(paths["junction"])
     junc_dict_all = shibalib.junc_dict(junc_df)
     sample_list = shibalib.make_sample_list(junc_df)
@@ -129,7 +131,7 @@ def main():
     }
 
     # Process each event
-    event_results = {event: process_event(event, *functions) for event, functions in event_definitions.items()}
+    event_results = {event: process_event(event, *event_definitions[event]) for event in params["events"]}
 
     # Save PSI matrices
     logger.info("Saving PSI matrices...")
@@ -149,11 +151,9 @@ def main():
     # Save summary file
     logger.info("Saving summary file...")
     if not params["onlypsi"]:
-        # Define the event types
-        event_types = ["SE", "FIVE", "THREE", "MXE", "MSE", "AFE", "ALE"]
         # Collect event counts
         summary_l = []
-        for event in event_types:
+        for event in params["events"]:
             logger.debug(f"Counting events for {event}...")
             event_counter = shibalib.EventCounter(event_results[event]["diff"], params["dPSI"])
             event_counts = event_counter.count_all_events()
@@ -177,8 +177,8 @@ def main():
     # Optionally save to Excel
     if params["excel"]:
         logger.info("Exporting results to Excel...")
-        results_to_save = [result["nodiff_sample"] if params["onlypsi"] else result["diff"] for result in event_results.values()]
-        shibalib.save_excel_sc(paths["output"], *results_to_save)
+        results_to_save = {event: result["nodiff_sample"] if params["onlypsi"] else result["diff"] for event, result in event_results.items()}
+        shibalib.save_excel(paths["output"], results_to_save)
 
     logger.info("All processes completed.")
 
@@ -0,0 +1,89 @@
+import unittest
+import pandas as pd
+import os
+import sys
+import tempfile
+# Add parent directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+from lib.annotation import gtf_attributes, exon_table, iter_gtf, reference_coordinates, reference_sets
+
+GTF = """# test
+1\tStringTie\ttranscript\t100\t500\t1000\t+\t.\tgene_id "MSTRG.1"; transcript_id "MSTRG.1.1"; ref_gene_id "ENSG1"; gene_name "Gene1";
+1\tStringTie\texon\t300\t500\t1000\t+\t.\tgene_id "MSTRG.1"; transcript_id "MSTRG.1.1"; ref_gene_id "ENSG1"; gene_name "Gene1"; exon_number "2";
+1\tStringTie\texon\t100\t200\t1000\t+\t.\tgene_id "MSTRG.1"; transcript_id "MSTRG.1.1"; ref_gene_id "ENSG1"; gene_name "Gene1"; exon_number "1";
+1\tStringTie\texon\t100\t200\t1000\t+\t.\tgene_id "MSTRG.1"; transcript_id "MSTRG.1.2"; exon_number "1";
+chr2\tStringTie\texon\t50\t80\t1000\t-\t.\tgene_id "MSTRG.2"; transcript_id "MSTRG.2.1"; exon_number 1;
+"""
+
+class TestAnnotation(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.gtf_path = os.path.join(self.tmp_dir.name, "test.gtf")
+        with open(self.gtf_path, "w") as f:
+            f.write(GTF)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_gtf_attributes(self):
+        information = pd.Series([
+            'gene_id "MSTRG.1"; transcript_id "MSTRG.1.1"; ref_gene_id "ENSG1"; gene_name "Gene1";',
+            'gene_id "MSTRG.1"; transcript_id "MSTRG.1.2";',
+            'gene_id MSTRG.2; transcript_id MSTRG.2.1;'
+        ], index = [3, 5, 7])
+        attribute_df = gtf_attributes(information)
+        expected_df = pd.DataFrame({
+            "gene_id": ["ENSG1", "ENSG1", "MSTRG.2"],
+            "gene_name": ["Gene1", "Gene1", "MSTRG.2"],
+            "transcript_id": ["MSTRG.1.1", "MSTRG.1.2", "MSTRG.2.1"]
+        }, index = [3, 5, 7])
+        pd.testing.assert_frame_equal(attribute_df, expected_df)
+
+    def test_exon_table(self):
+        gtf_df = exon_table(self.gtf_path)
+        self.assertEqual(gtf_df["chr"].tolist(), ["chr1", "chr1", "chr1", "chr2"])
+        self.assertEqual(gtf_df["start"].tolist(), [100, 300, 100, 50])
+        self.assertEqual(gtf_df["gene_id"].tolist(), ["ENSG1", "ENSG1", "ENSG1", "MSTRG.2"])
+        self.assertEqual(gtf_df["transcript_id"].tolist(), ["MSTRG.1.1", "MSTRG.1.1", "MSTRG.1.2", "MSTRG.2.1"])
+
+    def test_exon_table_cache(self):
+        cache_dir = os.path.join(self.tmp_dir.name, "cache")
+        parsed_df = exon_table(self.gtf_path, cache_dir)
+        self.assertEqual(len(os.listdir(cache_dir)), 1)
+        cached_df = exon_table(self.gtf_path, cache_dir)
+        for column in parsed_df.columns:
+            self.assertEqual(parsed_df[column].tolist(), cached_df[column].tolist())
+        # A modified GTF file gets its own cache
+        with open(self.gtf_path, "a") as f:
+            f.write('chr2\tStringTie\texon\t90\t120\t1000\t-\t.\tgene_id "MSTRG.2"; transcript_id "MSTRG.2.2";\n')
+        self.assertEqual(exon_table(self.gtf_path, cache_dir).shape[0], 5)
+        self.assertEqual(len(os.listdir(cache_dir)), 2)
+
+    def test_iter_gtf(self):
+        # Rows of chromosome 1 are split by chr2 and across chunks
+        with open(self.gtf_path, "a") as f:
+            f.write('1\tStringTie\texon\t300\t500\t1000\t+\t.\tgene_id "MSTRG.1"; transcript_id "MSTRG.1.2";\n')
+        chr_df_l = list(iter_gtf(self.gtf_path, chunk_size = 2))
+        self.assertEqual([chr_df["chr"].unique().tolist() for chr_df in chr_df_l], [["chr1"], ["chr2"]])
+        self.assertEqual(chr_df_l[0]["transcript_id"].tolist(), ["MSTRG.1.1", "MSTRG.1.1", "MSTRG.1.2", "MSTRG.1.2"])
+        gtf_df = exon_table(self.gtf_path)
+        pd.testing.assert_frame_equal(
+            pd.concat(chr_df_l)[gtf_df.columns].astype(str).reset_index(drop = True),
+            gtf_df.astype(str).reset_index(drop = True)
+        )
+
+    def test_reference_coordinates(self):
+        exon, intron = reference_coordinates(exon_table(self.gtf_path))
+        self.assertEqual(sorted(exon.tolist()), ["chr1:100-200", "chr1:300-500", "chr2:50-80"])
+        # Genes with one transcript have no introns, as in the gene model of gtf2event
+        self.assertEqual(intron.tolist(), ["chr1:200-300"])
+
+    def test_reference_sets_cache(self):
+        cache_dir = os.path.join(self.tmp_dir.name, "cache")
+        parsed_sets = reference_sets(self.gtf_path, cache_dir)
+        self.assertEqual(len(os.listdir(cache_dir)), 2)
+        self.assertEqual(reference_sets(self.gtf_path, cache_dir), parsed_sets)
+        self.assertEqual(reference_sets(self.gtf_path), parsed_sets)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+import os
+import sys
+import tempfile
+import pysam
+# Add parent directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+import bam2junc
+
+def write_bam(bam_path):
+    header = {"HD": {"VN": "1.6", "SO": "coordinate"}, "SQ": [{"SN": "1", "LN": 10000}]}
+    with pysam.AlignmentFile(bam_path, "wb", header = header) as bam:
+        read = pysam.AlignedSegment(bam.header)
+        read.query_name = "read0"
+        read.reference_id = 0
+        read.reference_start = 100
+        read.cigarstring = "10M100N10M"
+        read.query_sequence = "A" * read.query_length
+        read.set_tag("XS", "+")
+        bam.write(read)
+    pysam.index(bam_path)
+
+def write_experiment(experiment_path, bam_l):
+    with open(experiment_path, "w") as experiment:
+        experiment.write("sample\tbam\tgroup\n")
+        for i, bam_path in enumerate(bam_l):
+            experiment.write(f"S{i}\t{bam_path}\tRef\n")
+
+class TestBam2junc(unittest.TestCase):
+    def test_process_samples(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            bam_path = os.path.join(tmp_dir, "good.bam")
+            write_bam(bam_path)
+            experiment_path = os.path.join(tmp_dir, "experiment.tsv")
+            write_experiment(experiment_path, [bam_path, bam_path])
+            junc_dfs, samples = bam2junc.process_samples(experiment_path, None, "XS", 8, 70, 500000, None, None, None, False, 2)
+            self.assertEqual(samples, ["S0", "S1"])
+            self.assertEqual([junc_df.values.tolist() for junc_df in junc_dfs], [[["chr1", 110, 211, 1]]] * 2)
+            # An empty experiment table has no samples
+            write_experiment(experiment_path, [])
+            self.assertEqual(bam2junc.process_samples(experiment_path, None, "XS", 8, 70, 500000, None, None, None, False, 1), ([], []))
+
+    def test_process_samples_failure(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            bad_bam_path = os.path.join(tmp_dir, "bad.bam")
+            for path in [bad_bam_path, bad_bam_path + ".bai"]:
+                with open(path, "w") as bad_bam:
+                    bad_bam.write("not a BAM file")
+            bam_path = os.path.join(tmp_dir, "good.bam")
+            write_bam(bam_path)
+            experiment_path = os.path.join(tmp_dir, "experiment.tsv")
+            write_experiment(experiment_path, [bad_bam_path, bam_path, bam_path])
+            cache_dir = os.path.join(tmp_dir, "cache")
+            with self.assertRaises(SystemExit):
+                bam2junc.process_samples(experiment_path, None, "XS", 8, 70, 500000, None, None, cache_dir, False, 1)
+            # Samples after the failed one are not counted
+            self.assertFalse(os.path.isdir(cache_dir) and os.listdir(cache_dir))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,29 @@
+import unittest
+import argparse
+import os
+import sys
+# Add parent directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+from lib.event_types import EVENT_TYPES, EVENT_TYPES_SC, event_type_list, config_event_types
+
+class TestEventTypes(unittest.TestCase):
+    def test_event_type_list(self):
+        # Event types are returned in the order of the event types to choose from
+        self.assertEqual(event_type_list("MXE, SE"), ["SE", "MXE"])
+        self.assertEqual(event_type_list("CL,SE", EVENT_TYPES + ["CO", "CF", "CL"]), ["SE", "CL"])
+        for value in ["SE,XX", "CO", ","]:
+            with self.assertRaises(argparse.ArgumentTypeError):
+                event_type_list(value)
+        with self.assertRaises(argparse.ArgumentTypeError):
+            event_type_list("RI", EVENT_TYPES_SC)
+
+    def test_config_event_types(self):
+        self.assertEqual(config_event_types(None), EVENT_TYPES)
+        self.assertEqual(config_event_types(None, EVENT_TYPES_SC), EVENT_TYPES_SC)
+        self.assertEqual(config_event_types(["MXE", "SE"]), ["SE", "MXE"])
+        self.assertEqual(config_event_types("MXE,SE"), ["SE", "MXE"])
+        with self.assertRaises(argparse.ArgumentTypeError):
+            config_event_types(["SE", "CO"])
+
+if __name__ == "__main__":
+    unittest.main()
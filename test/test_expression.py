@@ -2,9 +2,10 @@ import unittest
 import pandas as pd
 import os
 import sys
+import tempfile
 # Add parent directory to path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
-from lib.expression import ExpressionProcessor
+from lib.expression import ExpressionProcessor, alignment_index, featurecounts_command
 
 class TestExpressionProcessor(unittest.TestCase):
     def setUp(self):
@@ -49,5 +50,34 @@ class TestExpressionProcessor(unittest.TestCase):
         ]
         pd.testing.assert_frame_equal(processed_df.set_index("Gene"), expected_df.set_index("Gene"), atol=0.01)
 
+class TestAlignmentFile(unittest.TestCase):
+    def test_alignment_index(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            bam_path = os.path.join(tmp_dir, "test.bam")
+            cram_path = os.path.join(tmp_dir, "test.cram")
+            self.assertIsNone(alignment_index(bam_path))
+            open(bam_path + ".csi", "w").close()
+            self.assertEqual(alignment_index(bam_path), bam_path + ".csi")
+            open(bam_path + ".bai", "w").close()
+            self.assertEqual(alignment_index(bam_path), bam_path + ".bai")
+            # CRAM files are not indexed by .bai files
+            open(cram_path + ".bai", "w").close()
+            self.assertIsNone(alignment_index(cram_path))
+            open(cram_path + ".crai", "w").close()
+            self.assertEqual(alignment_index(cram_path), cram_path + ".crai")
+
+    def test_featurecounts_command(self):
+        self.assertEqual(
+            featurecounts_command("genes.gtf", "S1_counts.txt", 4, "S1.bam", True),
+            ["featureCounts", "-a", "genes.gtf", "-o", "S1_counts.txt", "-T", "4", "-t", "exon", "-g", "gene_id", "-p", "-B", "S1.bam"]
+        )
+        self.assertEqual(
+            featurecounts_command("genes.gtf", "S1_counts.txt", 1, "S1.bam", False),
+            ["featureCounts", "-a", "genes.gtf", "-o", "S1_counts.txt", "-T", "1", "-t", "exon", "-g", "gene_id", "S1.bam"]
+        )
+        # featureCounts does not read CRAM files
+        with self.assertRaises(ValueError):
+            featurecounts_command("genes.gtf", "S1_counts.txt", 1, "S1.cram", False)
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,214 @@
+import unittest
+import numpy as np
+import pandas as pd
+import os
+import sys
+import tempfile
+# Add parent directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+import gtf2event
+
+def exon_table(exon_l):
+    # exon_l: list of (transcript_id, start, end)
+    return pd.DataFrame({
+        "chr": "chr1",
+        "start": [exon[1] for exon in exon_l],
+        "end": [exon[2] for exon in exon_l],
+        "strand": "+",
+        "gene_id": "Gene1",
+        "gene_name": "Gene1",
+        "transcript_id": [exon[0] for exon in exon_l]
+    }).sort_values(["gene_id", "transcript_id", "start"]).reset_index(drop = True)
+
+class TestGtf2event(unittest.TestCase):
+    def test_gtf(self):
+        gtf_dic = gtf2event.gtf(exon_table([
+            ("T1", 100, 200), ("T1", 300, 400), ("T1", 500, 600),
+            ("T2", 100, 200), ("T2", 500, 600),
+            ("T3", 100, 200)
+        ]))
+        gene_dic = gtf_dic["Gene1"]
+        self.assertEqual(gene_dic["exon_start"].tolist(), [100, 300, 500])
+        self.assertEqual(gene_dic["exon_end"].tolist(), [200, 400, 600])
+        self.assertEqual(
+            [gtf2event.unpack(key) for key in gene_dic["intron"].tolist()],
+            [(200, 300), (200, 500), (400, 500)]
+        )
+        self.assertEqual(gtf2event.gene_transcripts(gene_dic), {"T1": [0, 1, 2], "T2": [0, 2], "T3": [0]})
+
+    def test_single_transcript_gene(self):
+        gtf_dic = gtf2event.gtf(exon_table([("T1", 100, 200), ("T1", 300, 400)]))
+        self.assertEqual(len(gtf_dic), 0)
+
+    def test_se(self):
+        gtf_dic = gtf2event.gtf(exon_table([
+            ("T1", 100, 200), ("T1", 300, 400), ("T1", 500, 600),
+            ("T2", 100, 200), ("T2", 500, 600)
+        ]))
+        self.assertEqual(
+            gtf2event.se(gtf_dic),
+            [["chr1:300-400", "chr1:200-300", "chr1:400-500", "chr1:200-500", "+", "Gene1", "Gene1"]]
+        )
+
+    def test_ri_across_digit_length(self):
+        # Exons whose coordinates differ in number of digits are compared as integers
+        gtf_dic = gtf2event.gtf(exon_table([
+            ("T1", 99000, 99500), ("T1", 100500, 101000),
+            ("T2", 99000, 101000)
+        ]))
+        self.assertEqual(
+            gtf2event.ri(gtf_dic),
+            [["chr1:99000-99500", "chr1:100500-101000", "chr1:99000-101000", "chr1:99500-100500", "+", "Gene1", "Gene1"]]
+        )
+
+    def test_mse(self):
+        gtf_dic = gtf2event.gtf(exon_table([
+            ("T1", 100, 200), ("T1", 300, 400), ("T1", 500, 600), ("T1", 700, 800), ("T1", 900, 1000),
+            ("T2", 100, 200), ("T2", 900, 1000)
+        ]))
+        self.assertEqual(
+            gtf2event.mse(gtf_dic),
+            [["chr1:300-400;chr1:500-600;chr1:700-800", "chr1:200-300;chr1:400-500;chr1:600-700;chr1:800-900;chr1:200-900", 3, "+", "Gene1", "Gene1"]]
+        )
+        self.assertEqual(gtf2event.mse(gtf_dic, max_mse_n = 2), [])
+
+    def test_mxe(self):
+        exon_l = [
+            ("T1", 100, 200), ("T1", 300, 400), ("T1", 700, 800),
+            ("T2", 100, 200), ("T2", 500, 600), ("T2", 700, 800)
+        ]
+        self.assertEqual(
+            gtf2event.mxe(gtf2event.gtf(exon_table(exon_l))),
+            [["chr1:300-400", "chr1:500-600", "chr1:200-300", "chr1:400-700", "chr1:200-500", "chr1:600-700", "+", "Gene1", "Gene1"]]
+        )
+        # Exons present in the same transcript are not mutually exclusive
+        exon_l += [("T3", 100, 200), ("T3", 300, 400), ("T3", 500, 600), ("T3", 700, 800)]
+        self.assertEqual(gtf2event.mxe(gtf2event.gtf(exon_table(exon_l))), [])
+
+    def test_transcript_structures(self):
+        gene_dic = gtf2event.gtf(exon_table([
+            ("T1", 100, 200), ("T1", 300, 400),
+            ("T2", 100, 200), ("T2", 300, 400),
+            ("T3", 100, 200), ("T3", 500, 600),
+            ("T4", 150, 200), ("T4", 500, 600)
+        ]))["Gene1"]
+        # T2 has the same exons as T1
+        self.assertEqual([structure[0] for structure in gtf2event.transcript_structures(gene_dic)], ["T1", "T3", "T4"])
+        with self.assertLogs(gtf2event.logger, level = "WARNING") as log:
+            self.assertEqual([structure[0] for structure in gtf2event.transcript_structures(gene_dic, max_transcripts = 2, gene = "Gene1")], ["T1", "T3"])
+        self.assertIn("Gene Gene1: 1 of 3 transcript structures dropped", log.output[0])
+
+    def test_complex_forms(self):
+        # T1 and T3 have the same exons, with T2 between them
+        exon_l = [
+            ("T1", 100, 200), ("T1", 300, 400), ("T1", 500, 600),
+            ("T2", 100, 200), ("T2", 305, 400), ("T2", 500, 600),
+            ("T3", 100, 200), ("T3", 300, 400), ("T3", 500, 600)
+        ]
+        event_l = gtf2event.complex_events(gtf2event.gtf(exon_table(exon_l)))
+        # As many unique exons in both forms: the later transcript of each pair is included, as with every pair compared
+        self.assertEqual(
+            [event[:2] + event[7:] for event in event_l],
+            [["chr1:305-400", "chr1:300-400", "T2", "T1"], ["chr1:300-400", "chr1:305-400", "T3", "T2"]]
+        )
+        # More unique exons are included whatever the order
+        exon_l = [("T1", 100, 200), ("T1", 300, 400), ("T1", 500, 600), ("T2", 100, 200), ("T2", 300, 320), ("T2", 350, 400), ("T2", 500, 600)]
+        event_l = gtf2event.complex_events(gtf2event.gtf(exon_table(exon_l)))
+        self.assertEqual([event[:2] + event[7:] for event in event_l], [["chr1:300-320;chr1:350-400", "chr1:300-400", "T2", "T1"]])
+
+    def test_event_table(self):
+        event_l = [
+            ["chr1:300-400", "chr1:200-300", "chr1:400-500", "chr1:200-500", "+", "Gene1", "Gene1"],
+            ["chr1:300-400", "chr1:200-300", "chr1:400-500", "chr1:200-500", "+", "Gene1", "Gene1"],
+            ["chr1:1300-1400", "chr1:1200-1300", "chr1:1400-1500", "chr1:1200-1500", "+", "Gene2", "Gene2"]
+        ]
+        event_df = gtf2event.event_table("SE", event_l, {"chr1:200-300", "chr1:400-500", "chr1:200-500"}, set())
+        self.assertEqual(event_df["event_id"].tolist(), ["SE_1", "SE_2"])
+        self.assertEqual(event_df["pos_id"].tolist(), ["SE@chr1@1300-1400@1200-1500", "SE@chr1@300-400@200-500"])
+        self.assertEqual(event_df["label"].tolist(), ["unannotated", "annotated"])
+        # The table does not depend on the order of events
+        pd.testing.assert_frame_equal(event_df, gtf2event.event_table("SE", event_l[::-1], {"chr1:200-300", "chr1:400-500", "chr1:200-500"}, set()))
+
+    def test_event_table_complex(self):
+        # Events of the same pos_id and included exons from pairs T1-T3 and T2-T3
+        event_l = [
+            ["chr1:300-400", "chr1:250-400", "chr1:100-200", "chr1:500-600", "+", "Gene1", "Gene1", "T3", "T2"],
+            ["chr1:300-400", "chr1:310-400", "chr1:100-200", "chr1:500-600", "+", "Gene1", "Gene1", "T3", "T1"]
+        ]
+        event_df = gtf2event.event_table("CO", event_l)
+        # The event of the first pair of transcripts is kept
+        self.assertEqual(event_df[["excluded_exons", "included_transcript", "excluded_transcript"]].values.tolist(), [["chr1:310-400", "T3", "T1"]])
+        pd.testing.assert_frame_equal(event_df, gtf2event.event_table("CO", event_l[::-1]))
+
+    def test_event_table_mse(self):
+        event_l = [["chr1:300-400;chr1:500-600", "chr1:200-300;chr1:400-500;chr1:600-700;chr1:200-700", 2, "+", "Gene1", "Gene1"]]
+        event_df = gtf2event.event_table("MSE", event_l, {"chr1:200-300", "chr1:400-500", "chr1:600-700", "chr1:200-700"}, set())
+        self.assertEqual(list(event_df.columns), ["event_id", "pos_id", "mse_n", "exon", "intron", "strand", "gene_id", "gene_name", "label"])
+        self.assertEqual(event_df["pos_id"].tolist(), ["MSE@chr1@300-400;500-600@200-700"])
+        self.assertEqual(event_df["label"].tolist(), ["annotated"])
+
+    def test_event_table_empty(self):
+        event_df = gtf2event.event_table("MXE", [])
+        self.assertEqual(event_df.shape[0], 0)
+        self.assertEqual(list(event_df.columns), ["event_id", "pos_id", "exon_a", "exon_b", "intron_a1", "intron_a2", "intron_b1", "intron_b2", "strand", "gene_id", "gene_name", "label"])
+
+    def test_detect_events(self):
+        gtf_dic = gtf2event.gtf(exon_table([
+            ("T1", 100, 200), ("T1", 300, 400), ("T1", 500, 600),
+            ("T2", 100, 200), ("T2", 500, 600)
+        ]))
+        event_dic, runtime_l = gtf2event.detect_events(gtf_dic, ["SE", "RI"])
+        self.assertEqual(list(event_dic.keys()), ["SE", "RI"])
+        self.assertEqual(event_dic["SE"], gtf2event.se(gtf_dic))
+        self.assertEqual(event_dic["RI"], [])
+        self.assertEqual(runtime_l, [])
+        event_dic, runtime_l = gtf2event.detect_events(gtf_dic, ["SE", "RI"], gene_runtime = True)
+        self.assertEqual(event_dic["SE"], gtf2event.se(gtf_dic))
+        runtime_df = pd.DataFrame(runtime_l, columns = gtf2event.RUNTIME_COLUMNS)
+        self.assertEqual(runtime_df[["gene_id", "event_type", "event_num"]].values.tolist(), [["Gene1", "SE", 1], ["Gene1", "RI", 0]])
+
+    def test_profile_report(self):
+        gtf_dic = gtf2event.gtf(exon_table([
+            ("T1", 100, 200), ("T1", 300, 400), ("T1", 500, 600),
+            ("T2", 100, 200), ("T2", 500, 600)
+        ]))
+        _, runtime_df = gtf2event.search_events(gtf_dic, ["SE", "RI"], 1, gene_runtime = True)
+        report = gtf2event.profile_report(runtime_df, [], gene_n = 1)
+        self.assertEqual(list(report["detectors"].keys()), ["SE", "RI"])
+        self.assertEqual(report["detectors"]["SE"]["event_num"], 1)
+        self.assertEqual([gene["gene_id"] for gene in report["slowest_genes"]["RI"]], ["Gene1"])
+        # Only event types with events are listed for each gene
+        self.assertEqual(report["gene_events"], {"Gene1": {"SE": 1}})
+        self.assertEqual(len(report["workers"]), 1)
+
+    def test_gene_batches(self):
+        gtf_dic = {
+            f"Gene{i}": {"exon_start": np.zeros(n), "transcript_id": ["T1", "T2"], "transcript_exon": np.zeros(n)}
+            for i, n in enumerate([2, 100, 3, 50])
+        }
+        batch_l = gtf2event.gene_batches(gtf_dic, 2, batches_per_process = 2)
+        # Heaviest genes first, every gene in exactly one batch
+        self.assertEqual(list(batch_l[0].keys())[0], "Gene1")
+        self.assertEqual(sorted(gene for batch in batch_l for gene in batch), ["Gene0", "Gene1", "Gene2", "Gene3"])
+
+    def test_incremental_search_events(self):
+        exon_l = [
+            ("T1", 100, 200), ("T1", 300, 400), ("T1", 500, 600),
+            ("T2", 100, 200), ("T2", 500, 600)
+        ]
+        gtf_dic = gtf2event.gtf(exon_table(exon_l))
+        changed_gtf_dic = gtf2event.gtf(exon_table(exon_l + [("T3", 100, 200), ("T3", 300, 450), ("T3", 500, 600)]))
+        self.assertEqual(gtf2event.gene_hash("Gene1", gtf_dic["Gene1"]), gtf2event.gene_hash("Gene1", gtf2event.gtf(exon_table(exon_l))["Gene1"]))
+        self.assertNotEqual(gtf2event.gene_hash("Gene1", gtf_dic["Gene1"]), gtf2event.gene_hash("Gene1", changed_gtf_dic["Gene1"]))
+        self.assertNotEqual(gtf2event.gene_hash("Gene1", gtf_dic["Gene1"]), gtf2event.gene_hash("Gene1", gtf_dic["Gene1"], {"MSE": {"max_mse_n": 2}}))
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache_path = os.path.join(cache_dir, "events.pkl")
+            for test_gtf_dic in [gtf_dic, gtf_dic, changed_gtf_dic]:
+                new_event_cache = {}
+                event_dic, _ = gtf2event.incremental_search_events(test_gtf_dic, ["SE", "THREE"], 1, gtf2event.load_event_cache(cache_path), new_event_cache)
+                gtf2event.save_event_cache(cache_path, new_event_cache)
+                self.assertEqual(event_dic, gtf2event.search_events(test_gtf_dic, ["SE", "THREE"], 1)[0])
+            self.assertEqual(list(gtf2event.load_event_cache(cache_path).keys()), [gtf2event.gene_hash("Gene1", changed_gtf_dic["Gene1"])])
+
+if __name__ == "__main__":
+    unittest.main()
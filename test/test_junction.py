@@ -0,0 +1,250 @@
+import unittest
+import concurrent.futures
+import os
+import sys
+import tempfile
+import pysam
+import pandas as pd
+# Add parent directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+from lib.junction import read_junctions, ri_boundaries, event_junctions, target_windows, genome_windows, count_junctions, window_boundaries, cached_count_junctions, junction_cache_path, read_junction_table, merge_junction_tables
+
+def write_bam(bam_path, read_l):
+    # read_l: list of (reference_id, reference_start, cigar string, XS tag[, NH tag])
+    header = {"HD": {"VN": "1.6", "SO": "coordinate"}, "SQ": [{"SN": "1", "LN": 10000}, {"SN": "chrX", "LN": 10000}]}
+    with pysam.AlignmentFile(bam_path, "wb", header = header) as bam:
+        for i, (reference_id, reference_start, cigar, xs, *nh) in enumerate(sorted(read_l)):
+            read = pysam.AlignedSegment(bam.header)
+            read.query_name = f"read{i}"
+            read.reference_id = reference_id
+            read.reference_start = reference_start
+            read.cigarstring = cigar
+            read.query_sequence = "A" * read.query_length
+            read.mapping_quality = 60
+            if xs:
+                read.set_tag("XS", xs)
+            if nh:
+                read.set_tag("NH", nh[0])
+            bam.write(read)
+    pysam.index(bam_path)
+
+def write_cram(cram_path, bam_path, fasta_path):
+    # Converts a BAM file written by write_bam() to a CRAM file, with a reference genome of Ns
+    with open(fasta_path, "w") as fasta:
+        for name in ["1", "chrX"]:
+            fasta.write(f">{name}\n" + ("N" * 100 + "\n") * 100)
+    pysam.faidx(fasta_path)
+    with pysam.AlignmentFile(bam_path, "rb") as bam, pysam.AlignmentFile(cram_path, "wc", template = bam, reference_filename = fasta_path) as cram:
+        for read in bam:
+            cram.write(read)
+    pysam.index(cram_path)
+
+class TestJunction(unittest.TestCase):
+    def test_read_junctions(self):
+        # 10M100N20M200N5M: the 20 bases between the introns anchor both junctions
+        self.assertEqual(
+            read_junctions([(0, 10), (3, 100), (0, 20), (3, 200), (0, 5)], 100),
+            [(100, 110, 210, 230), (210, 230, 430, 435)]
+        )
+        # Soft clips and insertions do not consume the reference, deletions do
+        self.assertEqual(read_junctions([(4, 5), (0, 10), (1, 2), (2, 3), (3, 100), (0, 10)], 100), [(100, 113, 213, 223)])
+        self.assertEqual(read_junctions([(0, 50)], 100), [])
+
+    def test_count_junctions(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            bam_path = os.path.join(tmp_dir, "test.bam")
+            write_bam(bam_path, [
+                (0, 100, "10M100N20M200N5M", "+"),
+                # The same intron on the other strand is summed
+                (0, 100, "10M100N10M", "-"),
+                # Anchored by 5 bases on the left only, but by another read on the left
+                (0, 105, "5M100N10M", "+"),
+                # Intron shorter than the minimum
+                (0, 1000, "10M50N10M", "+"),
+                # Anchored by 5 bases on the left only
+                (1, 2000, "5M300N10M", None)
+            ])
+            junction_df = count_junctions(bam_path, anchor = 8, min_intron = 70, max_intron = 500000)
+            self.assertEqual(junction_df.values.tolist(), [["chr1", 110, 211, 3]])
+            junction_df = count_junctions(bam_path, anchor = 5, min_intron = 70, max_intron = 500000, threads = 2)
+            self.assertEqual(junction_df.values.tolist(), [["chr1", 110, 211, 3], ["chr1", 230, 431, 1], ["chrX", 2005, 2306, 1]])
+            junction_df = count_junctions(bam_path, anchor = 5, min_intron = 50, max_intron = 150)
+            self.assertEqual(junction_df.values.tolist(), [["chr1", 110, 211, 3], ["chr1", 1010, 1061, 1]])
+            # Windows split the reads of each junction and the introns of the first read, which is counted once
+            for window_size in [105, 220, 10000]:
+                for anchor in [5, 8]:
+                    pd.testing.assert_frame_equal(
+                        count_junctions(bam_path, anchor = anchor, num_process = 2, window_size = window_size),
+                        count_junctions(bam_path, anchor = anchor)
+                    )
+
+    def test_count_cram_junctions(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            bam_path = os.path.join(tmp_dir, "test.bam")
+            write_bam(bam_path, [
+                (0, 100, "10M100N20M200N5M", "+"),
+                (0, 105, "110M", None),
+                (1, 2000, "5M300N10M", None)
+            ])
+            cram_path = os.path.join(tmp_dir, "test.cram")
+            fasta_path = os.path.join(tmp_dir, "genome.fa")
+            write_cram(cram_path, bam_path, fasta_path)
+            boundary_df = pd.DataFrame({"chr": ["chr1"], "start": [110], "end": [111]})
+            junction_df = count_junctions(bam_path, anchor = 5, boundary_df = boundary_df)
+            for num_process in [1, 2]:
+                pd.testing.assert_frame_equal(
+                    count_junctions(cram_path, anchor = 5, num_process = num_process, boundary_df = boundary_df, reference_path = fasta_path),
+                    junction_df
+                )
+
+    def test_ri_boundaries(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            ri_event_path = os.path.join(tmp_dir, "EVENT_RI.txt")
+            pd.DataFrame({
+                "event_id": ["RI_1", "RI_2"],
+                "intron_a": ["chr1:110-211", "chr1:110-211"],
+                "strand": ["+", "-"]
+            }).to_csv(ri_event_path, sep = "\t", index = False)
+            self.assertEqual(ri_boundaries(ri_event_path).values.tolist(), [["chr1", 110, 111], ["chr1", 210, 211]])
+
+    def test_count_boundaries(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            bam_path = os.path.join(tmp_dir, "test.bam")
+            write_bam(bam_path, [
+                # Spliced read, which covers no boundary of the intron chr1:110-211
+                (0, 100, "10M100N20M", "+"),
+                # Unspliced reads covering both boundaries, one of them with a deletion
+                (0, 105, "110M", None),
+                (0, 105, "50M10D50M", None),
+                # Ends on the first base of the 5' boundary
+                (0, 50, "60M", None),
+                # Aligned to multiple loci
+                (0, 105, "110M", None, 2),
+                # Other intron
+                (1, 300, "50M", None)
+            ])
+            boundary_df = pd.DataFrame({"chr": ["chr1", "chr1", "chrX"], "start": [110, 210, 1000], "end": [111, 211, 1001]})
+            junction_df = count_junctions(bam_path, anchor = 8, boundary_df = boundary_df)
+            self.assertEqual(
+                junction_df.values.tolist(),
+                [["chr1", 110, 111, 2], ["chr1", 110, 211, 1], ["chr1", 210, 211, 2], ["chrX", 1000, 1001, 0]]
+            )
+            for window_size in [105, 10000]:
+                pd.testing.assert_frame_equal(
+                    count_junctions(bam_path, anchor = 8, num_process = 2, window_size = window_size, boundary_df = boundary_df),
+                    junction_df
+                )
+            # Shards sent to a shared pool with only their windows and boundaries
+            with concurrent.futures.ProcessPoolExecutor(max_workers = 2) as executor:
+                pd.testing.assert_frame_equal(
+                    count_junctions(bam_path, anchor = 8, num_process = 2, window_size = 105, executor = executor, boundary_df = boundary_df),
+                    junction_df
+                )
+
+    def test_window_boundaries(self):
+        boundary_dic = {0: [109, 209, 500], 1: [999]}
+        self.assertEqual(window_boundaries(boundary_dic, [("chr1", 150, 210, 150), ("chr1", 420, 525, 420)], ("chr1", "chrX")), {0: [209, 500]})
+        self.assertIsNone(window_boundaries(None, [("chr1", 0, 105, 0)], ("chr1", "chrX")))
+
+    def test_event_junctions(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            pd.DataFrame({
+                "event_id": ["SE_1"], "exon": ["chr1:300-400"],
+                "intron_a": ["chr1:200-300"], "intron_b": ["chr1:400-500"], "intron_c": ["chr1:200-500"]
+            }).to_csv(os.path.join(tmp_dir, "EVENT_SE.txt"), sep = "\t", index = False)
+            pd.DataFrame({
+                "event_id": ["MSE_1"], "exon": ["chr1:300-400;chr1:600-700"], "intron": ["chr1:200-300;chr1:400-600;chr1:700-800;chr1:200-800"]
+            }).to_csv(os.path.join(tmp_dir, "EVENT_MSE.txt"), sep = "\t", index = False)
+            self.assertEqual(
+                event_junctions(tmp_dir).values.tolist(),
+                [["chr1", 200, 300], ["chr1", 200, 500], ["chr1", 200, 800], ["chr1", 400, 500], ["chr1", 400, 600], ["chr1", 700, 800]]
+            )
+
+    def test_target_windows(self):
+        target_df = pd.DataFrame({"chr": ["chr1", "chr1", "chr1", "chrX", "chr3"], "start": [500, 110, 150, 2005, 10], "end": [600, 211, 300, 2306, 20]})
+        # Overlapping regions are merged, and reads overlapping several regions are counted in the first one
+        self.assertEqual(
+            target_windows(target_df, ("1", "chrX")),
+            [("1", 109, 300, 0), ("1", 499, 600, 300), ("chrX", 2004, 2306, 0)]
+        )
+
+    def test_count_target_junctions(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            bam_path = os.path.join(tmp_dir, "test.bam")
+            write_bam(bam_path, [
+                # Spans the regions of both target junctions
+                (0, 100, "10M100N20M200N5M", "+"),
+                (0, 100, "10M100N10M", "-"),
+                (0, 105, "110M", None),
+                (0, 1000, "10M100N10M", "+"),
+                (1, 2000, "10M300N10M", None)
+            ])
+            target_df = pd.DataFrame({"chr": ["chr1", "chr1", "chrX"], "start": [110, 230, 5000], "end": [211, 431, 5100]})
+            boundary_df = pd.DataFrame({"chr": ["chr1", "chr1"], "start": [110, 210], "end": [111, 211]})
+            junction_df = count_junctions(bam_path, anchor = 5, boundary_df = boundary_df, target_df = target_df)
+            self.assertEqual(
+                junction_df.values.tolist(),
+                [["chr1", 110, 111, 1], ["chr1", 110, 211, 2], ["chr1", 210, 211, 1], ["chr1", 230, 431, 1]]
+            )
+            pd.testing.assert_frame_equal(
+                count_junctions(bam_path, anchor = 5, boundary_df = boundary_df, target_df = target_df, num_process = 2),
+                junction_df
+            )
+
+    def test_cached_count_junctions(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            bam_path = os.path.join(tmp_dir, "test.bam")
+            write_bam(bam_path, [
+                (0, 100, "10M100N20M200N5M", "+"),
+                (0, 105, "110M", None),
+                (0, 300, "50M", None)
+            ])
+            cache_dir = os.path.join(tmp_dir, "cache")
+            boundary_df = pd.DataFrame({"chr": ["chr1"], "start": [110], "end": [111]})
+            junction_df = cached_count_junctions(bam_path, cache_dir, anchor = 5, boundary_df = boundary_df)
+            pd.testing.assert_frame_equal(junction_df, count_junctions(bam_path, anchor = 5, boundary_df = boundary_df))
+            self.assertTrue(os.path.isfile(junction_cache_path(cache_dir, bam_path, 5, 70, 500000, "XS")))
+            # Other filters are cached separately
+            self.assertNotEqual(junction_cache_path(cache_dir, bam_path, 8, 70, 500000, "XS"), junction_cache_path(cache_dir, bam_path, 5, 70, 500000, "XS"))
+            # New boundaries are counted and added to cached counts
+            boundary_df = pd.DataFrame({"chr": ["chr1", "chr1", "chr1"], "start": [110, 210, 320], "end": [111, 211, 321]})
+            for _ in range(2):
+                pd.testing.assert_frame_equal(
+                    cached_count_junctions(bam_path, cache_dir, anchor = 5, boundary_df = boundary_df),
+                    count_junctions(bam_path, anchor = 5, boundary_df = boundary_df)
+                )
+            target_df = pd.DataFrame({"chr": ["chr1"], "start": [230], "end": [431]})
+            pd.testing.assert_frame_equal(
+                cached_count_junctions(bam_path, cache_dir, anchor = 5, target_df = target_df),
+                count_junctions(bam_path, anchor = 5, target_df = target_df)
+            )
+
+    def test_merge_junction_tables(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            junction_path = os.path.join(tmp_dir, "S1.junc")
+            pd.DataFrame({"chr": ["chr1", "chr2"], "start": [110, 5], "end": [211, 106], "count": [2, 4]}).to_csv(junction_path, sep = "\t", index = False)
+            output_path = os.path.join(tmp_dir, "junctions.bed")
+            junction_n = merge_junction_tables([
+                [("chr1", 110, 211, 3), ("chr1", 1010, 1061, 1), ("chr10", 5, 106, 1)],
+                read_junction_table(junction_path)
+            ], ["S2", "S1"], output_path)
+            self.assertEqual(junction_n, 4)
+            merged_df = pd.read_csv(output_path, sep = "\t")
+            self.assertEqual(list(merged_df.columns), ["chr", "start", "end", "ID", "S2", "S1"])
+            self.assertEqual(merged_df.values.tolist(), [
+                ["chr1", 110, 211, "chr1:110-211", 3, 2],
+                ["chr1", 1010, 1061, "chr1:1010-1061", 1, 0],
+                ["chr10", 5, 106, "chr10:5-106", 1, 0],
+                ["chr2", 5, 106, "chr2:5-106", 0, 4]
+            ])
+            with self.assertRaises(ValueError):
+                merge_junction_tables([[("chr1", 1010, 1061, 1), ("chr1", 110, 211, 3)]], ["S1"], output_path)
+
+    def test_genome_windows(self):
+        self.assertEqual(
+            genome_windows(("1", "2"), (250, 100), 100),
+            [("1", 0, 100), ("1", 100, 200), ("1", 200, 250), ("2", 0, 100)]
+        )
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import unittest
+import os
+import sys
+import tempfile
+import pandas as pd
+# Add parent directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+from lib.junction_matrix import matrix_path, write_junction_dataframe, read_junction_matrix
+from lib.junction import merge_junction_tables
+
+class TestJunctionMatrix(unittest.TestCase):
+    def test_matrix_path(self):
+        self.assertEqual(matrix_path("out/junctions/junctions.bed"), "out/junctions/junctions.npz")
+
+    def test_write_junction_dataframe(self):
+        junc_df = pd.DataFrame({
+            "chr": ["chr1", "chr1", "chr2"],
+            "start": ["110", "1010", "5"],
+            "end": ["211", "1061", "106"],
+            "ID": ["chr1:110-211", "chr1:1010-1061", "chr2:5-106"],
+            "S1": [3, 0, 0],
+            "S2": [2, 0, 7]
+        })
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "junctions.npz")
+            write_junction_dataframe(path, junc_df)
+            pd.testing.assert_frame_equal(read_junction_matrix(path), junc_df)
+            write_junction_dataframe(path, junc_df.iloc[:0])
+            self.assertEqual(read_junction_matrix(path).shape, (0, 6))
+
+    def test_merge_junction_tables(self):
+        # The matrix written while merging tables holds the same counts as the merged table
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output_path = os.path.join(tmp_dir, "junctions.bed")
+            merge_junction_tables([
+                [("chr1", 110, 211, 3), ("chr10", 5, 106, 1)],
+                [("chr1", 110, 211, 2), ("chr2", 5, 106, 4)]
+            ], ["S1", "S2"], output_path, matrix_path(output_path))
+            junc_df = pd.read_csv(output_path, sep = "\t", dtype = {"chr": str, "start": str, "end": str})
+            pd.testing.assert_frame_equal(read_junction_matrix(matrix_path(output_path)), junc_df)
+
+if __name__ == "__main__":
+    unittest.main()
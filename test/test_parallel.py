@@ -0,0 +1,27 @@
+import unittest
+import concurrent.futures
+import os
+import sys
+# Add parent directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+from lib import parallel
+
+def shard_sum(value_l, offset, k):
+    return(sum(value_l[k::2]) + offset)
+
+class TestParallel(unittest.TestCase):
+    def test_map_shards(self):
+        value_l = list(range(10))
+        # Results are in the order of shard indices
+        self.assertEqual(parallel.map_shards(shard_sum, (value_l, 100), 2, 2), [120, 125])
+        # Published arguments are released after the call
+        self.assertIsNone(parallel._shared_args)
+
+    def test_map_shards_executor(self):
+        with concurrent.futures.ProcessPoolExecutor(max_workers = 2) as executor:
+            self.assertEqual(parallel.map_shards(shard_sum, (list(range(10)), 0), 2, 2, executor), [20, 25])
+            # Shards are sent the arguments made by shard_args instead
+            self.assertEqual(parallel.map_shards(shard_sum, (list(range(10)), 0), 2, 2, executor, lambda k: ([k + 1], 100, 0)), [101, 102])
+
+if __name__ == "__main__":
+    unittest.main()